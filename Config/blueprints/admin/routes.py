@@ -4,6 +4,8 @@ from . import admin_bp
 from Config.models import User, Product, Order, Category
 from Config.decorators import admin_required
 from Config.db import db
+from Config.services.analytics_service import analytics_service
+from Config.services.order_listing_service import order_listing_service
 import json
 import csv
 import io
@@ -172,21 +174,19 @@ def low_stock_products_data():
 def pending_orders_data():
     """Devolver datos de pedidos pendientes en formato JSON"""
     try:
-        pending_orders = Order.query.filter_by(status='pending').order_by(Order.created_at.desc()).all()
-
-        orders_data = []
-        for order in pending_orders:
-            orders_data.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'user_name': order.user.name if order.user else None,
-                'total_amount': float(order.total_amount),
-                'total_amount_cop': int(round(order.total_amount)) if order.total_amount is not None else 0,
-                'status': order.status,
-                'created_at': order.created_at.isoformat() if order.created_at else None
-            })
+        options = order_listing_service.parse_request_args(request.args, fields='compact')
+        options['statuses'] = ['pending']
+        result = order_listing_service.list_orders(**options)
+        status_counts = order_listing_service.status_counts()
 
-        return jsonify({'orders': orders_data, 'success': True})
+        return jsonify({
+            'orders': result['orders'],
+            'pagination': result['pagination'],
+            'status_counts': status_counts,
+            'success': True
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
         print(f"Error en pending_orders_data: {e}")
         return jsonify({'error': str(e), 'success': False}), 500
@@ -197,21 +197,19 @@ def pending_orders_data():
 def completed_orders_data():
     """Devolver datos de pedidos completados en formato JSON"""
     try:
-        completed_orders = Order.query.filter(Order.status.in_(['shipped', 'delivered'])).order_by(Order.updated_at.desc()).all()
-
-        orders_data = []
-        for order in completed_orders:
-            orders_data.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'user_name': order.user.name if order.user else None,
-                'total_amount': float(order.total_amount),
-                'total_amount_cop': int(round(order.total_amount)) if order.total_amount is not None else 0,
-                'status': order.status,
-                'updated_at': order.updated_at.isoformat() if order.updated_at else None
-            })
+        options = order_listing_service.parse_request_args(request.args, fields='compact', sort='updated_at')
+        options['statuses'] = ['shipped', 'delivered']
+        result = order_listing_service.list_orders(**options)
+        status_counts = order_listing_service.status_counts()
 
-        return jsonify({'orders': orders_data, 'success': True})
+        return jsonify({
+            'orders': result['orders'],
+            'pagination': result['pagination'],
+            'status_counts': status_counts,
+            'success': True
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
         print(f"Error en completed_orders_data: {e}")
         return jsonify({'error': str(e), 'success': False}), 500
@@ -770,13 +768,22 @@ def delete_category(category_id):
 def orders_data():
     """Devolver datos de todos los pedidos en formato JSON"""
     try:
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-        orders_data = []
-
-        for order in orders:
-            orders_data.append(order.to_dict())
+        options = order_listing_service.parse_request_args(request.args)
+        result = order_listing_service.list_orders(**options)
+        stats = order_listing_service.status_counts(
+            date_from=options.get('date_from'),
+            date_to=options.get('date_to'),
+            customer_id=options.get('customer_id')
+        )
 
-        return jsonify({'orders': orders_data, 'success': True})
+        return jsonify({
+            'orders': result['orders'],
+            'pagination': result['pagination'],
+            'stats': stats,
+            'success': True
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
         print(f"Error en orders_data: {e}")
         return jsonify({'error': str(e), 'success': False}), 500
@@ -1026,91 +1033,38 @@ def delete_user(user_id):
 @login_required
 @admin_required
 def get_analytics_data():
-    """Obtener datos para el dashboard de analytics"""
+    """Obtener datos para el dashboard de analytics (desde las tablas de rollup)"""
     try:
         from sqlalchemy import func
-        from datetime import datetime, timedelta
+        from sqlalchemy.orm import joinedload
         from Config.models.order_item import OrderItem
-        
-        # Fecha de hace 30 dï¿½as
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        # Total de pedidos
-        total_orders = Order.query.count()
-        
-        # Pedidos del ï¿½ltimo mes
-        orders_last_month = Order.query.filter(Order.created_at >= thirty_days_ago).count()
-        
-        # Total de ingresos
-        total_revenue = db.session.query(func.sum(Order.total_amount)).scalar() or 0
-        
-        # Ingresos del ï¿½ltimo mes
-        revenue_last_month = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.created_at >= thirty_days_ago
-        ).scalar() or 0
-        
-        # Total de clientes
-        total_customers = User.query.filter_by(role='cliente').count()
-        
-        # Clientes nuevos del ï¿½ltimo mes
-        customers_last_month = User.query.filter(
-            User.role == 'cliente',
-            User.created_at >= thirty_days_ago
-        ).count()
-        
-        # Total de productos activos
-        total_products = Product.query.filter_by(active=True).count()
-        
-        # Productos en stock (cantidad > 0)
-        products_in_stock = Product.query.filter(Product.stock_quantity > 0).count()
-        
-        # Productos mï¿½s vendidos
-        top_products = db.session.query(
-            Product.name,
-            func.sum(OrderItem.quantity).label('quantity')
-        ).join(OrderItem).group_by(Product.id).order_by(
-            func.sum(OrderItem.quantity).desc()
+
+        # Totales, cambios de los últimos 30 días, más vendidos y pedidos por estado
+        analytics_data = analytics_service.get_dashboard_summary(days=30)
+
+        # Total de productos activos y productos en stock (catálogo, no historial)
+        analytics_data['total_products'] = Product.query.filter_by(active=True).count()
+        analytics_data['products_change'] = Product.query.filter(Product.stock_quantity > 0).count()
+
+        # Pedidos recientes (últimos 5) con usuario y conteo de items en una sola consulta cada uno
+        recent_orders = Order.query.options(joinedload(Order.user)).order_by(
+            Order.created_at.desc()
         ).limit(5).all()
-        
-        top_products_list = [{'name': p.name, 'quantity': int(p.quantity)} for p in top_products]
-        
-        # Pedidos por estado
-        orders_by_status = {
-            'pendiente': Order.query.filter_by(status='pendiente').count(),
-            'procesando': Order.query.filter_by(status='procesando').count(),
-            'completado': Order.query.filter_by(status='completado').count(),
-            'cancelado': Order.query.filter_by(status='cancelado').count()
-        }
-        
-        # Pedidos recientes (ï¿½ltimos 5)
-        recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
-        recent_orders_list = []
-        
-        for order in recent_orders:
-            items_count = OrderItem.query.filter_by(order_id=order.id).count()
-            user = User.query.get(order.user_id)
-            recent_orders_list.append({
-                'id': order.id,
-                'user_name': user.name if user else 'Usuario desconocido',
-                'items_count': items_count,
-                'total': float(order.total_amount),
-                'created_at': order.created_at.isoformat() if order.created_at else None
-            })
-        
-        analytics_data = {
-            'total_orders': total_orders,
-            'orders_change': orders_last_month,
-            'total_revenue': float(total_revenue),
-            'revenue_change': float(revenue_last_month),
-            'total_customers': total_customers,
-            'customers_change': customers_last_month,
-            'total_products': total_products,
-            'products_change': products_in_stock,
-            'top_products': top_products_list,
-            'orders_by_status': orders_by_status,
-            'recent_orders': recent_orders_list
-        }
-        
+        recent_ids = [order.id for order in recent_orders]
+        items_counts = dict(
+            db.session.query(OrderItem.order_id, func.count(OrderItem.id)).filter(
+                OrderItem.order_id.in_(recent_ids)
+            ).group_by(OrderItem.order_id).all()
+        ) if recent_ids else {}
+
+        analytics_data['recent_orders'] = [{
+            'id': order.id,
+            'user_name': order.user.name if order.user else 'Usuario desconocido',
+            'items_count': items_counts.get(order.id, 0),
+            'total': float(order.total_amount),
+            'created_at': order.created_at.isoformat() if order.created_at else None
+        } for order in recent_orders]
+
         return jsonify({
             'success': True,
             'analytics': analytics_data
@@ -1163,6 +1117,172 @@ def clear_cache():
         print(f"Error en clear_cache: {e}")
         return jsonify({'error': str(e), 'success': False}), 500
 
+@admin_bp.route("/admin/maintenance/reservation-sweeps")
+@login_required
+@admin_required
+def reservation_sweeps():
+    """Métricas de los últimos barridos de reservas de stock vencidas"""
+    try:
+        from Config.services.reservation_sweeper import reservation_sweeper
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        runs = reservation_sweeper.recent_runs(limit)
+
+        return jsonify({
+            'runs': runs,
+            'units_released': sum(run['units_released'] for run in runs),
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en reservation_sweeps: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/geocode-cache")
+@login_required
+@admin_required
+def geocode_cache_stats():
+    """Contadores de aciertos/fallos de la caché de geocodificación"""
+    try:
+        from Config.services.geocode_cache import geocode_cache
+        return jsonify({
+            'stats': geocode_cache.stats(),
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en geocode_cache_stats: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/outbound-http")
+@login_required
+@admin_required
+def outbound_http_stats():
+    """Latencia, errores y estado del circuito de cada API externa (Google Maps, OAuth)"""
+    try:
+        from Config.services.http_client import http_client
+        return jsonify({
+            'apis': http_client.stats(),
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en outbound_http_stats: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/refresh-etas", methods=["POST"])
+@login_required
+@admin_required
+def refresh_etas():
+    """Recalcular ahora el ETA de todas las entregas activas con Distance Matrix"""
+    try:
+        from Config.services.eta_refresher import eta_refresher
+        result = eta_refresher.run_once()
+        return jsonify({
+            'result': result,
+            'stats': eta_refresher.stats(),
+            'success': result['failed_requests'] == 0
+        })
+
+    except Exception as e:
+        print(f"Error en refresh_etas: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/geocode-addresses", methods=["POST"])
+@login_required
+@admin_required
+def geocode_addresses():
+    """Geocodificar direcciones de clientes que aún no tienen coordenadas"""
+    try:
+        from Config.services.address_geocoder import address_geocoder
+        limit = max(1, min(request.args.get('limit', 500, type=int), 5000))
+        totals = address_geocoder.backfill(limit=limit)
+        return jsonify({
+            'result': totals,
+            'stats': address_geocoder.stats(),
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en geocode_addresses: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/compact-location-history", methods=["POST"])
+@login_required
+@admin_required
+def compact_location_history():
+    """Mover las filas de historial por ping a los tramos comprimidos del recorrido"""
+    try:
+        from Config.services.breadcrumb_service import breadcrumb_service
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        result = breadcrumb_service.compact_legacy_history(limit_orders=limit)
+        return jsonify({
+            'result': result,
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en compact_location_history: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/reset-notification-counters", methods=["POST"])
+@login_required
+@admin_required
+def reset_notification_counters():
+    """Borrar los contadores de no leídas para que se recalculen en la siguiente lectura"""
+    try:
+        from Config.services.notification_service import notification_service
+        return jsonify({
+            'removed': notification_service.reset_unread_counters(),
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en reset_notification_counters: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/run-retention", methods=["POST"])
+@login_required
+@admin_required
+def run_retention():
+    """Archivar ahora las notificaciones leídas y el historial de pedidos cerrados vencidos"""
+    try:
+        from Config.services.retention_service import retention_service
+        data = request.get_json(silent=True) or {}
+        run = retention_service.run_once(
+            batch_size=data.get('batch_size'),
+            max_batches=data.get('max_batches')
+        )
+
+        return jsonify({
+            'run': run,
+            'success': not run['error']
+        })
+
+    except Exception as e:
+        print(f"Error en run_retention: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@admin_bp.route("/admin/maintenance/retention-runs")
+@login_required
+@admin_required
+def retention_runs():
+    """Métricas de las últimas ejecuciones del archivado de notificaciones e historial"""
+    try:
+        from Config.services.retention_service import retention_service
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        runs = retention_service.recent_runs(limit)
+
+        return jsonify({
+            'runs': runs,
+            'notifications_archived': sum(run['notifications_archived'] for run in runs),
+            'history_archived': sum(run['history_archived'] for run in runs),
+            'success': True
+        })
+
+    except Exception as e:
+        print(f"Error en retention_runs: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
 @admin_bp.route("/admin/maintenance/export-database")
 @login_required
 @admin_required
@@ -6,8 +6,8 @@ from Config.models.user import User
 from Config.db import db
 from datetime import datetime
 import secrets
-import requests
 import os
+from Config.services.http_client import http_client
 
 @auth_bp.route("/login", methods=['GET', 'POST'])
 def login():
@@ -253,7 +253,7 @@ def google_callback():
             'grant_type': 'authorization_code'
         }
         
-        token_response = requests.post(token_url, data=token_data)
+        token_response = http_client.post('google_oauth', token_url, data=token_data)
         token_json = token_response.json()
         
         if 'access_token' not in token_json:
@@ -264,7 +264,7 @@ def google_callback():
         
         # Obtener información del usuario
         user_info_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
-        user_info_response = requests.get(user_info_url, headers={'Authorization': f'Bearer {access_token}'})
+        user_info_response = http_client.get('google_oauth', user_info_url, headers={'Authorization': f'Bearer {access_token}'})
         user_info = user_info_response.json()
         
         if 'email' not in user_info:
@@ -361,7 +361,7 @@ def facebook_callback():
             'code': code
         }
         
-        token_response = requests.get(token_url, params=token_params)
+        token_response = http_client.get('facebook_oauth', token_url, params=token_params, retries=0)
         token_json = token_response.json()
         
         if 'access_token' not in token_json:
@@ -377,7 +377,7 @@ def facebook_callback():
             'access_token': access_token
         }
         
-        user_info_response = requests.get(user_info_url, params=user_info_params)
+        user_info_response = http_client.get('facebook_oauth', user_info_url, params=user_info_params)
         user_info = user_info_response.json()
         
         if 'id' not in user_info:
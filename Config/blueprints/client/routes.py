@@ -1,4 +1,4 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, session
+from flask import render_template, redirect, url_for, flash, request, jsonify, session, current_app
 from flask_login import login_required, current_user
 from flask_wtf.csrf import generate_csrf
 from . import client_bp
@@ -9,7 +9,11 @@ from Config.models.order_item import OrderItem
 from Config.models.address import Address
 from Config.models.product import Product
 from Config.models.cart import Cart, CartItem
-import random
+from Config.services.address_geocoder import address_geocoder
+from Config.services.catalog_service import catalog_service
+from Config.services.inventory_service import inventory_service
+from Config.services.checkout_service import checkout_service, CheckoutError
+import uuid
 from Config.db import db
 from datetime import datetime, timedelta
 from sqlalchemy.orm import joinedload
@@ -240,25 +244,16 @@ def catalog():
 def catalog_data():
     """API: lista de productos activos (sin mocks)"""
     try:
-        # soporta paginación opcional ?page=1&per_page=12
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 12))
+        category_id = request.args.get('category_id', type=int)
 
-        query = Product.query.filter_by(active=True).order_by(Product.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        products = pagination.items
-        data = [p.to_dict() for p in products]
+        # Servido desde el caché del catálogo; sin consultas a la BD si hay acierto
+        result = catalog_service.get_page(page=page, per_page=per_page, category_id=category_id)
 
         return jsonify({
-            'products': data,
-            'pagination': {
-                'page': pagination.page,
-                'per_page': pagination.per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            },
+            'products': result['products'],
+            'pagination': result['pagination'],
             'success': True
         })
     except Exception as e:
@@ -396,36 +391,54 @@ def client_get_cart():
         return jsonify({'error': str(e), 'success': False}), 500
 
 
+def _guest_cart_token():
+    """Token que identifica las reservas de stock del carrito de invitado"""
+    token = session.get('guest_cart_token')
+    if not token:
+        token = uuid.uuid4().hex
+        session['guest_cart_token'] = token
+        # Las líneas añadidas antes de existir el token ya descontaron su stock
+        lines = {}
+        for it in session.get('guest_cart', []):
+            lines[it.get('product_id')] = lines.get(it.get('product_id'), 0) + it.get('quantity', 0)
+        inventory_service.adopt_guest_lines(token, lines)
+    return token
+
+
 @client_bp.route('/client/cart/add', methods=['POST'])
 def client_cart_add():
     """Añadir producto al carrito (JSON body: product_id, quantity)
     Supports authenticated DB-backed carts and anonymous session-backed guest carts.
+    Stock is reserved atomically, so concurrent adds can never oversell a product.
     """
     try:
         data = request.get_json() or {}
         product_id = int(data.get('product_id'))
         qty = int(data.get('quantity', 1))
+        if qty <= 0:
+            return jsonify({'error': 'Cantidad inválida', 'success': False}), 400
 
         product = Product.query.get(product_id)
         if not product or not product.active:
             return jsonify({'error': 'Producto no encontrado', 'success': False}), 404
-        # Verificar stock disponible
-        if product.stock_quantity < qty:
-            return jsonify({'error': 'Stock insuficiente', 'success': False}), 400
 
         if current_user.is_authenticated:
             cart = Cart.query.filter_by(user_id=current_user.id).first()
             if not cart:
                 cart = Cart(user_id=current_user.id)
                 db.session.add(cart)
-                db.session.commit()
+                db.session.flush()
 
-            # Reservar stock: decrementar stock_quantity en producto
             item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
+            current_qty = item.quantity if item else 0
+
+            # Reservar stock: UPDATE condicional sobre stock_quantity
+            if not inventory_service.set_line_quantity(product_id, current_qty + qty, cart_id=cart.id,
+                                                       legacy_quantity=current_qty):
+                db.session.rollback()
+                return jsonify({'error': 'Stock insuficiente', 'success': False}), 400
+
             if item:
-                # verificar que haya stock para la cantidad adicional
-                if product.stock_quantity < qty:
-                    return jsonify({'error': 'Stock insuficiente para la cantidad adicional', 'success': False}), 400
                 item.quantity = item.quantity + qty
                 # keep line total in sync
                 try:
@@ -439,27 +452,31 @@ def client_cart_add():
                 item = CartItem(cart_id=cart.id, product_id=product_id, quantity=qty, unit_price=unit_price_val, total_price=unit_price_val * qty)
                 db.session.add(item)
 
-            # Aplicar reserva en inventario
-            product.stock_quantity = product.stock_quantity - qty
             db.session.commit()
             return jsonify({'success': True})
         else:
             # Guest session cart stored in Flask session
+            token = _guest_cart_token()
             guest = session.get('guest_cart', [])
             # Generate a simple unique id for the guest item
             next_id = max([i.get('id', 0) for i in guest], default=0) + 1
             # Check if product already in guest cart
             existing = next((i for i in guest if i.get('product_id') == product_id), None)
+            current_qty = existing.get('quantity', 0) if existing else 0
+
+            # Reserve stock in DB so inventory reflects reservation
+            if not inventory_service.set_line_quantity(product_id, current_qty + qty, guest_token=token):
+                db.session.rollback()
+                return jsonify({'error': 'Stock insuficiente', 'success': False}), 400
+
             if existing:
-                existing['quantity'] = existing.get('quantity', 1) + qty
+                existing['quantity'] = current_qty + qty
             else:
                 guest.append({'id': next_id, 'product_id': product_id, 'quantity': qty})
 
-            # Reserve stock in DB so inventory reflects reservation
-            product.stock_quantity = product.stock_quantity - qty
+            db.session.commit()
             session['guest_cart'] = guest
             session.modified = True
-            db.session.commit()
             return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -477,10 +494,9 @@ def client_cart_remove(item_id):
             # verificar pertenece al usuario
             if item.cart.user_id != current_user.id:
                 return jsonify({'error': 'No autorizado', 'success': False}), 403
-            # Devolver stock al inventario
-            product = item.product
-            if product:
-                product.stock_quantity = (product.stock_quantity or 0) + item.quantity
+            # Devolver al inventario el stock reservado por la línea
+            inventory_service.set_line_quantity(item.product_id, 0, cart_id=item.cart_id,
+                                                legacy_quantity=item.quantity)
 
             db.session.delete(item)
             db.session.commit()
@@ -490,14 +506,13 @@ def client_cart_remove(item_id):
             item = next((i for i in guest if i.get('id') == item_id), None)
             if not item:
                 return jsonify({'error': 'Item no encontrado en carrito', 'success': False}), 404
-            prod = Product.query.get(item.get('product_id'))
-            if prod:
-                prod.stock_quantity = (prod.stock_quantity or 0) + item.get('quantity', 0)
+            token = _guest_cart_token()
+            inventory_service.set_line_quantity(item.get('product_id'), 0, guest_token=token)
+            db.session.commit()
             # remove
             guest = [i for i in guest if i.get('id') != item_id]
             session['guest_cart'] = guest
             session.modified = True
-            db.session.commit()
             return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -512,34 +527,25 @@ def client_cart_update(item_id):
     """
     try:
         data = request.get_json() or {}
-        qty = int(data.get('quantity', 0))
+        qty = max(0, int(data.get('quantity', 0)))
 
         if current_user.is_authenticated:
             item = CartItem.query.get_or_404(item_id)
             if item.cart.user_id != current_user.id:
                 return jsonify({'error': 'No autorizado', 'success': False}), 403
 
-            product = item.product
-            if qty <= 0:
-                # Devolver stock
-                if product:
-                    product.stock_quantity = (product.stock_quantity or 0) + item.quantity
+            # Ajustar la reserva (pedir más o devolver la diferencia)
+            if not inventory_service.set_line_quantity(item.product_id, qty, cart_id=item.cart_id,
+                                                       legacy_quantity=item.quantity):
+                db.session.rollback()
+                return jsonify({'error': 'Stock insuficiente para la actualización', 'success': False}), 400
+
+            if qty == 0:
                 db.session.delete(item)
             else:
-                # calcular delta (positivo = pedir más; negativo = devolver)
-                delta = qty - item.quantity
-                if delta > 0:
-                    # comprobar stock disponible
-                    if not product or product.stock_quantity < delta:
-                        return jsonify({'error': 'Stock insuficiente para la actualización', 'success': False}), 400
-                    product.stock_quantity = product.stock_quantity - delta
-                    item.quantity = qty
-                else:
-                    # devolver stock (-delta)
-                    if product:
-                        product.stock_quantity = (product.stock_quantity or 0) + (-delta)
-                    item.quantity = qty
+                item.quantity = qty
                 # update total price on the line to reflect new quantity
+                product = item.product
                 try:
                     unit = float(item.unit_price) if item.unit_price is not None else float(product.price or 0.0)
                 except Exception:
@@ -553,27 +559,19 @@ def client_cart_update(item_id):
             if not item:
                 return jsonify({'error': 'Item no encontrado en carrito', 'success': False}), 404
 
-            prod = Product.query.get(item.get('product_id'))
-            if qty <= 0:
-                # devolver stock
-                if prod:
-                    prod.stock_quantity = (prod.stock_quantity or 0) + item.get('quantity', 0)
+            token = _guest_cart_token()
+            if not inventory_service.set_line_quantity(item.get('product_id'), qty, guest_token=token):
+                db.session.rollback()
+                return jsonify({'error': 'Stock insuficiente para la actualización', 'success': False}), 400
+            db.session.commit()
+
+            if qty == 0:
                 guest = [i for i in guest if i.get('id') != item_id]
             else:
-                delta = qty - item.get('quantity', 0)
-                if delta > 0:
-                    if not prod or prod.stock_quantity < delta:
-                        return jsonify({'error': 'Stock insuficiente para la actualización', 'success': False}), 400
-                    prod.stock_quantity = prod.stock_quantity - delta
-                    item['quantity'] = qty
-                else:
-                    if prod:
-                        prod.stock_quantity = (prod.stock_quantity or 0) + (-delta)
-                    item['quantity'] = qty
+                item['quantity'] = qty
 
             session['guest_cart'] = guest
             session.modified = True
-            db.session.commit()
             return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -630,6 +628,10 @@ def create_client_address():
         db.session.add(address)
         db.session.commit()
 
+        # Las coordenadas se calculan en segundo plano
+        address_geocoder.enqueue([address.id])
+        address_geocoder.start(current_app._get_current_object())
+
         return jsonify({
             'address': address.to_dict(),
             'message': 'Dirección creada exitosamente',
@@ -660,13 +662,20 @@ def update_client_address(address_id):
             Address.query.filter_by(user_id=current_user.id).filter(Address.id != address_id).update({'is_default': False})
 
         # Actualizar campos
+        moved = any(field in data and data[field] != getattr(address, field) for field in Address.LOCATION_FIELDS)
         for field in ['name', 'street', 'city', 'state', 'zip_code', 'country', 'phone', 'is_default']:
             if field in data:
                 setattr(address, field, data[field])
 
+        if moved:
+            address_geocoder.reset(address)
         address.updated_at = datetime.utcnow()
         db.session.commit()
 
+        if moved:
+            address_geocoder.enqueue([address.id])
+            address_geocoder.start(current_app._get_current_object())
+
         return jsonify({
             'address': address.to_dict(),
             'message': 'Dirección actualizada exitosamente',
@@ -710,133 +719,24 @@ def create_order():
     """Crear un pedido desde el carrito"""
     try:
         data = request.get_json() or {}
-        
-        # Obtener el carrito del usuario
-        cart = Cart.query.filter_by(user_id=current_user.id).first()
-        if not cart or not cart.items:
-            return jsonify({'error': 'El carrito está vacío', 'success': False}), 400
-        
-        # Calcular totales
-        subtotal = sum(float(item.unit_price or item.product.price) * item.quantity for item in cart.items)
-        shipping = 15000 if subtotal < 200000 else 0
-        tax = int(subtotal * 0.19)  # IVA 19%
-        total = subtotal + shipping + tax
-        
-        # Obtener dirección de envío (usar la dirección por defecto o la primera disponible)
-        shipping_address = None
-        address = Address.query.filter_by(user_id=current_user.id, is_default=True).first()
-        if not address:
-            address = Address.query.filter_by(user_id=current_user.id).first()
-        
-        if address:
-            shipping_address = address.get_full_address()
-        
-        # Generar número de orden único (ORD + timestamp + random)
-        timestamp = datetime.utcnow().strftime("%Y%m%d")
-        random_suffix = random.randint(1000, 9999)
-        order_number = f"ORD{timestamp}{random_suffix}"
-        
-        # Verificar que el número de orden sea único
-        while Order.query.filter_by(order_number=order_number).first():
-            random_suffix = random.randint(1000, 9999)
-            order_number = f"ORD{timestamp}{random_suffix}"
-        
-        # Crear la orden
-        order = Order(
-            user_id=current_user.id,
-            order_number=order_number,
-            status='pending',
-            total_amount=float(total),
-            subtotal=float(subtotal),
-            shipping_cost=float(shipping),
-            tax_amount=float(tax),
-            shipping_address=shipping_address,
+
+        order_dict = checkout_service.create_order(
+            current_user,
             payment_method=data.get('payment_method', 'Tarjeta de crédito'),
             notes=data.get('notes', '')
         )
-        db.session.add(order)
-        db.session.flush()  # Para obtener el ID de la orden
-        
-        # Crear los items de la orden desde el carrito
-        order_items_list = []
-        order_items_data = []
-        for cart_item in cart.items:
-            product = cart_item.product
-            if not product:
-                continue
-            
-            unit_price = float(cart_item.unit_price) if cart_item.unit_price is not None else float(product.price)
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                quantity=cart_item.quantity,
-                unit_price=unit_price,
-                total_price=unit_price * cart_item.quantity
-            )
-            db.session.add(order_item)
-            order_items_list.append(order_item)
-            
-            # Crear dict del item con el producto ya disponible
-            order_items_data.append({
-                'id': None,  # Se asignará después del commit
-                'order_id': order.id,
-                'product_id': product.id,
-                'product_name': product.name,
-                'product_image': getattr(product, 'image', None),
-                'quantity': cart_item.quantity,
-                'price': unit_price,
-                'unit_price': unit_price,
-                'unit_price_cop': int(round(unit_price)),
-                'total_price': unit_price * cart_item.quantity,
-                'total_price_cop': int(round(unit_price * cart_item.quantity)),
-                'created_at': None
-            })
-        
-        # Limpiar el carrito (eliminar todos los items)
-        CartItem.query.filter_by(cart_id=cart.id).delete()
-        
-        # Commit de todos los cambios
-        db.session.commit()
-        
-        # Refrescar la orden y recargar los items desde la base de datos
-        db.session.refresh(order)
-        # Recargar la orden con sus items
-        order = Order.query.options(joinedload(Order.items)).filter_by(id=order.id).first()
-        
-        # Construir el dict manualmente para evitar problemas con relaciones lazy
-        order_dict = {
-            'id': order.id,
-            'user_id': order.user_id,
-            'order_number': order.order_number,
-            'status': order.status,
-            'status_display': 'Pendiente',
-            'total_amount': float(order.total_amount),
-            'total_amount_cop': int(round(order.total_amount)),
-            'subtotal': subtotal,
-            'subtotal_cop': int(round(subtotal)),
-            'shipping_cost': shipping,
-            'shipping_cost_cop': shipping,
-            'tax_amount': tax,
-            'tax_amount_cop': tax,
-            'shipping_address': shipping_address,
-            'payment_method': order.payment_method,
-            'notes': order.notes or '',
-            'created_at': order.created_at.isoformat() if order.created_at else None,
-            'updated_at': order.updated_at.isoformat() if order.updated_at else None,
-            'user_name': current_user.name if current_user else None,
-            'user_email': current_user.email if current_user else None,
-            'items_count': len(order_items_list),
-            'items': order_items_data
-        }
-        
+
         # Retornar la orden creada
         return jsonify({
             'order': order_dict,
-            'order_number': order_number,
+            'order_number': order_dict['order_number'],
             'message': 'Pedido creado exitosamente',
             'success': True
         })
-        
+
+    except CheckoutError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
         db.session.rollback()
         print(f"Error en create_order: {e}")
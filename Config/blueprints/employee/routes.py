@@ -7,6 +7,9 @@ from Config.models.task import Task
 from Config.models.order import Order
 from Config.models.product import Product
 from Config.db import db
+from Config.services.reporting_service import reporting_service
+from Config.services.customer_stats_service import customer_stats_service
+from Config.services.order_listing_service import order_listing_service
 import json
 from datetime import datetime
 
@@ -239,31 +242,36 @@ def complete_task(task_id):
 def orders_data():
     """Devolver datos de pedidos en formato JSON"""
     try:
-        # Obtener todos los pedidos ordenados por fecha
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-        orders_data = []
-
-        # Calcular estadísticas
+        options = order_listing_service.parse_request_args(request.args)
+        result = order_listing_service.list_orders(**options)
+
+        # Estadísticas con un GROUP BY por estado
+        counts = order_listing_service.status_counts(
+            date_from=options.get('date_from'),
+            date_to=options.get('date_to'),
+            customer_id=options.get('customer_id')
+        )
         stats = {
-            'pending': 0,
-            'shipped': 0,
-            'delivered': 0,
-            'total': len(orders)
+            'pending': counts.get('pending', 0),
+            'shipped': counts.get('shipped', 0),
+            'in_transit': counts.get('in_transit', 0),
+            'delivered': counts.get('delivered', 0),
+            'total': counts['total']
         }
+        # Entregas de hoy para el panel de rastreo (la lista ya no incluye las entregadas)
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())  # updated_at se guarda en UTC
+        stats['delivered_today'] = Order.query.filter(
+            Order.status == 'delivered', Order.updated_at >= today
+        ).count()
 
-        for order in orders:
-            order_dict = order.to_dict()
-            orders_data.append(order_dict)
-
-            # Contar por estado
-            if order.status == 'pending':
-                stats['pending'] += 1
-            elif order.status == 'shipped':
-                stats['shipped'] += 1
-            elif order.status == 'delivered':
-                stats['delivered'] += 1
-
-        return jsonify({'orders': orders_data, 'stats': stats, 'success': True})
+        return jsonify({
+            'orders': result['orders'],
+            'pagination': result['pagination'],
+            'stats': stats,
+            'success': True
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
         print(f'Error en orders_data: {e}')
         return jsonify({'error': str(e), 'success': False}), 500
@@ -486,45 +494,29 @@ def update_product(product_id):
 @employee_required
 def customers_data():
     try:
-        # Get all clients (users with role 'cliente')
-        customers = User.query.filter_by(role='cliente').all()
-        
-        # Calculate stats
-        total_customers = len(customers)
-        active_customers = sum(1 for c in customers if c.active)
-        
-        # Get customers created this month
-        from datetime import datetime, timedelta
-        current_date = datetime.utcnow()
-        first_day_of_month = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_this_month = sum(1 for c in customers if c.created_at and c.created_at >= first_day_of_month)
-        
-        # Get customer data with order count
-        customers_data = []
-        for customer in customers:
-            customer_dict = customer.to_dict()
-            # Count orders for this customer
-            order_count = Order.query.filter_by(user_id=customer.id).count()
-            customer_dict['order_count'] = order_count
-            
-            # Get total spent
-            orders = Order.query.filter_by(user_id=customer.id).all()
-            total_spent = sum(order.total_amount for order in orders)
-            customer_dict['total_spent'] = total_spent
-            
-            customers_data.append(customer_dict)
-        
-        stats = {
-            'total_customers': total_customers,
-            'active_customers': active_customers,
-            'new_this_month': new_this_month,
-            'inactive_customers': total_customers - active_customers
-        }
-        
+        # Pagination, sorting and filters are resolved in the database
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', customer_stats_service.DEFAULT_PER_PAGE, type=int)
+        sort = request.args.get('sort', 'created_at')
+        direction = request.args.get('direction', 'desc')
+        search = request.args.get('q')
+        status = request.args.get('status')
+
+        # Customers with order count and total spent in one grouped join
+        result = customer_stats_service.list_customers(
+            page=page,
+            per_page=per_page,
+            sort=sort,
+            direction=direction,
+            search=search,
+            status=status
+        )
+
         return jsonify({
             'success': True,
-            'customers': customers_data,
-            'stats': stats
+            'customers': result['customers'],
+            'pagination': result['pagination'],
+            'stats': customer_stats_service.get_summary()
         })
     except Exception as e:
         return jsonify({
@@ -537,21 +529,14 @@ def customers_data():
 @employee_required
 def get_customer(customer_id):
     try:
-        customer = User.query.get(customer_id)
+        customer_data = customer_stats_service.get_customer_stats(customer_id)
         
-        if not customer:
+        if not customer_data:
             return jsonify({
                 'success': False,
                 'error': 'Cliente no encontrado'
             }), 404
         
-        customer_data = customer.to_dict()
-        
-        # Get order count and total spent
-        orders = Order.query.filter_by(user_id=customer.id).all()
-        customer_data['order_count'] = len(orders)
-        customer_data['total_spent'] = sum(order.total_amount for order in orders)
-        
         return jsonify({
             'success': True,
             'customer': customer_data
@@ -630,74 +615,17 @@ def toggle_customer_status(customer_id):
 @employee_required
 def reports_data():
     try:
-        from datetime import datetime, timedelta
-        
         # Get date filters from query params (default: last 30 days)
         days = request.args.get('days', 30, type=int)
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Get all orders in period
-        orders = Order.query.filter(Order.created_at >= start_date).all()
-        
-        # Calculate stats
-        total_orders = len(orders)
-        total_sales = sum(order.total_amount for order in orders)
-        completed_orders = [o for o in orders if o.status == 'delivered']
-        pending_orders = [o for o in orders if o.status == 'pending']
-        
-        # Calculate average order value
-        avg_order_value = total_sales / total_orders if total_orders > 0 else 0
-        
-        # Get top products (from order items)
-        from Config.models.order_item import OrderItem
-        order_ids = [o.id for o in orders]
-        
-        if order_ids:
-            order_items = OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).all()
-            
-            # Count products sold
-            product_sales = {}
-            for item in order_items:
-                if item.product_id not in product_sales:
-                    product_sales[item.product_id] = {
-                        'quantity': 0,
-                        'revenue': 0,
-                        'name': item.product.name if item.product else 'Producto eliminado'
-                    }
-                product_sales[item.product_id]['quantity'] += item.quantity
-                product_sales[item.product_id]['revenue'] += item.subtotal
-            
-            top_products = sorted(product_sales.items(), key=lambda x: x[1]['revenue'], reverse=True)[:5]
-            top_products_data = [{'id': k, 'name': v['name'], 'quantity': v['quantity'], 'revenue': v['revenue']} for k, v in top_products]
-        else:
-            top_products_data = []
-        
-        # Sales by day (for chart)
-        sales_by_day = {}
-        for order in orders:
-            day_key = order.created_at.strftime('%Y-%m-%d')
-            if day_key not in sales_by_day:
-                sales_by_day[day_key] = {'count': 0, 'total': 0}
-            sales_by_day[day_key]['count'] += 1
-            sales_by_day[day_key]['total'] += order.total_amount
-        
-        # Sort by date
-        sales_timeline = [{'date': k, 'count': v['count'], 'total': v['total']} for k, v in sorted(sales_by_day.items())]
-        
-        stats = {
-            'total_orders': total_orders,
-            'total_sales': total_sales,
-            'completed_orders': len(completed_orders),
-            'pending_orders': len(pending_orders),
-            'avg_order_value': avg_order_value,
-            'period_days': days
-        }
-        
+
+        # Aggregates computed in SQL (sales by day/status and top products)
+        report = reporting_service.get_period_report(days)
+
         return jsonify({
             'success': True,
-            'stats': stats,
-            'top_products': top_products_data,
-            'sales_timeline': sales_timeline
+            'stats': report['stats'],
+            'top_products': report['top_products'],
+            'sales_timeline': report['sales_timeline']
         })
     except Exception as e:
         return jsonify({
@@ -710,52 +638,14 @@ def reports_data():
 @employee_required
 def sales_summary():
     try:
-        from datetime import datetime, timedelta
-        
-        # Get current month orders
-        current_date = datetime.utcnow()
-        first_day_of_month = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        orders_this_month = Order.query.filter(Order.created_at >= first_day_of_month).all()
-        
-        # Get last month for comparison
-        if current_date.month == 1:
-            first_day_last_month = current_date.replace(year=current_date.year-1, month=12, day=1)
-        else:
-            first_day_last_month = current_date.replace(month=current_date.month-1, day=1)
-        
-        last_month_end = first_day_of_month - timedelta(days=1)
-        orders_last_month = Order.query.filter(
-            Order.created_at >= first_day_last_month,
-            Order.created_at <= last_month_end
-        ).all()
-        
-        # Calculate this month
-        this_month_sales = sum(o.total_amount for o in orders_this_month)
-        this_month_orders = len(orders_this_month)
-        
-        # Calculate last month
-        last_month_sales = sum(o.total_amount for o in orders_last_month)
-        last_month_orders = len(orders_last_month)
-        
-        # Calculate growth
-        sales_growth = ((this_month_sales - last_month_sales) / last_month_sales * 100) if last_month_sales > 0 else 0
-        orders_growth = ((this_month_orders - last_month_orders) / last_month_orders * 100) if last_month_orders > 0 else 0
-        
+        # Current month vs last month in a single aggregate query
+        summary = reporting_service.get_month_over_month()
+
         return jsonify({
             'success': True,
-            'this_month': {
-                'sales': this_month_sales,
-                'orders': this_month_orders
-            },
-            'last_month': {
-                'sales': last_month_sales,
-                'orders': last_month_orders
-            },
-            'growth': {
-                'sales': sales_growth,
-                'orders': orders_growth
-            }
+            'this_month': summary['this_month'],
+            'last_month': summary['last_month'],
+            'growth': summary['growth']
         })
     except Exception as e:
         return jsonify({
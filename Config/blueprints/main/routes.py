@@ -2,6 +2,8 @@ from flask import redirect, url_for, render_template, request, jsonify
 from flask_login import login_required, current_user
 from . import main_bp
 from Config.models.product import Product
+from Config.services.catalog_service import catalog_service
+from Config.services.search_service import search_service
 
 @main_bp.route("/")
 def index():
@@ -14,28 +16,56 @@ def public_products():
     try:
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 12))
-        
-        query = Product.query.filter_by(active=True).order_by(Product.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        products = pagination.items
-        data = [p.to_dict() for p in products]
-        
+        category_id = request.args.get('category_id', type=int)
+
+        # Servido desde el caché del catálogo; sin consultas a la BD si hay acierto
+        result = catalog_service.get_page(page=page, per_page=per_page, category_id=category_id)
+
         return jsonify({
-            'products': data,
-            'pagination': {
-                'page': pagination.page,
-                'per_page': pagination.per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            },
+            'products': result['products'],
+            'pagination': result['pagination'],
             'success': True
         })
     except Exception as e:
         print(f"Error en public_products: {e}")
         return jsonify({'error': str(e), 'success': False}), 500
 
+@main_bp.route("/public/search")
+def public_search():
+    """API pública de búsqueda de productos (nombre, descripción, marca, SKU y categoría)"""
+    try:
+        query = (request.args.get('q') or '').strip()
+        limit = request.args.get('limit', 20, type=int)
+        offset = request.args.get('offset', 0, type=int)
+
+        if not query:
+            return jsonify({'products': [], 'total': 0, 'success': True})
+
+        result = search_service.search(query, limit=limit, offset=offset)
+        return jsonify({
+            'products': result['products'],
+            'total': result['total'],
+            'limit': result['limit'],
+            'offset': result['offset'],
+            'success': True
+        })
+    except Exception as e:
+        print(f"Error en public_search: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
+@main_bp.route("/public/search/suggest")
+def public_search_suggest():
+    """API pública de autocompletado para la barra de búsqueda"""
+    try:
+        prefix = (request.args.get('q') or '').strip()
+        limit = min(request.args.get('limit', 8, type=int), 20)
+
+        result = search_service.suggest(prefix, limit=limit)
+        return jsonify({'terms': result['terms'], 'products': result['products'], 'success': True})
+    except Exception as e:
+        print(f"Error en public_search_suggest: {e}")
+        return jsonify({'error': str(e), 'success': False}), 500
+
 @main_bp.route("/public/product/<int:product_id>")
 def public_product_detail(product_id):
     """Página pública de detalle de producto"""
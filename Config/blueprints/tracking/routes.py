@@ -3,18 +3,38 @@ Tracking Routes
 Endpoints for order tracking with Google Maps integration
 """
 
-from flask import jsonify, request
+from flask import Response, jsonify, request, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+import time
 from datetime import datetime
 from Config.blueprints.tracking import tracking_bp
 from Config.db import db
 from Config.models.order import Order
 from Config.models.order_tracking import OrderStatusHistory, DeliveryTracking, OrderNotification
+from Config.services.address_geocoder import address_geocoder
+from Config.services.breadcrumb_service import breadcrumb_service
+from Config.services.event_broker import event_broker
+from Config.services.fleet_snapshot import fleet_snapshot
 from Config.services.google_maps_service import google_maps_service
+from Config.services.location_ingest import location_ingest
 from Config.services.notification_service import notification_service
+from Config.services.retention_service import retention_service
+from Config.services.route_cache import route_cache
+from Config.services.route_planner import route_planner
+from Config.services.spatial_index import spatial_index
 from Config.decorators import admin_required, employee_required
 
 
+def _publish_status(order_id, status, tracking_active, tracking=None):
+    """Enviar el cambio de estado a los streams del pedido y del panel al hacer commit"""
+    data = {'order_id': order_id, 'status': status, 'tracking_active': tracking_active}
+    if tracking is not None:
+        data['tracking'] = tracking
+    event_broker.publish_on_commit(f'order:{order_id}', 'status', data)
+    event_broker.publish_on_commit('orders', 'status', data)
+
+
 @tracking_bp.route('/order/<int:order_id>/start', methods=['POST'])
 @login_required
 @employee_required
@@ -22,9 +42,14 @@ def start_tracking(order_id):
     """
     Start tracking for an order
     
+    The destination coordinates are read locally (geocoded customer
+    address or geocode cache). A stored customer address still waiting
+    for the background geocoder is queued and 409 is returned; any other
+    address is geocoded once through the cache.
+    
     Request JSON:
     {
-        "destination_address": "Calle 123, Bogotá",
+        "destination_address": "Calle 123, Bogotá",  (default: order shipping address)
         "driver_id": 5,
         "driver_name": "Juan Pérez",
         "driver_phone": "3001234567",
@@ -36,16 +61,28 @@ def start_tracking(order_id):
         if not order:
             return jsonify({'error': 'Pedido no encontrado'}), 404
         
-        data = request.get_json()
-        destination_address = data.get('destination_address')
+        data = request.get_json() or {}
+        destination_address = data.get('destination_address') or order.shipping_address
         
         if not destination_address:
             return jsonify({'error': 'Dirección de destino requerida'}), 400
         
-        # Geocode destination address
-        dest_coords = google_maps_service.geocode_address(destination_address)
+        # Coordenadas ya calculadas por el geocodificador en segundo plano
+        dest_coords = address_geocoder.resolve(order.user_id, destination_address)
         if not dest_coords:
-            return jsonify({'error': 'No se pudo geocodificar la dirección'}), 400
+            pending_id = address_geocoder.pending_address_id(order.user_id, destination_address)
+            if pending_id:
+                address_geocoder.enqueue([pending_id])
+                address_geocoder.start(current_app._get_current_object())
+                return jsonify({
+                    'error': 'La dirección aún no tiene coordenadas; intente de nuevo en unos segundos',
+                    'geocoding': 'pending'
+                }), 409
+            
+            # Dirección escrita por el despachador: una sola geocodificación (pasa por la caché)
+            dest_coords = google_maps_service.geocode_address(destination_address)
+            if not dest_coords:
+                return jsonify({'error': 'No se pudo geocodificar la dirección'}), 400
         
         # Check if tracking already exists
         existing_tracking = DeliveryTracking.query.filter_by(order_id=order_id).first()
@@ -81,11 +118,12 @@ def start_tracking(order_id):
         
         # Update order status
         order.status = 'in_transit'
+        _publish_status(order_id, 'in_transit', True, tracking.to_dict())
         
-        db.session.commit()
+        # Send notification (insertada con el mismo commit)
+        notification_service.queue_notification(order.user_id, order_id, 'out_for_delivery')
         
-        # Send notification
-        notification_service.notify_out_for_delivery(order.user_id, order_id)
+        db.session.commit()
         
         return jsonify({
             'message': 'Rastreo iniciado exitosamente',
@@ -111,73 +149,36 @@ def update_location(order_id):
     }
     """
     try:
-        tracking = DeliveryTracking.query.filter_by(order_id=order_id).first()
-        if not tracking:
+        is_active = db.session.query(DeliveryTracking.is_active).filter_by(order_id=order_id).scalar()
+        if is_active is None:
             return jsonify({'error': 'Rastreo no encontrado'}), 404
         
-        if not tracking.is_active:
+        if not is_active:
             return jsonify({'error': 'Rastreo no está activo'}), 400
         
-        data = request.get_json()
+        data = request.get_json() or {}
         latitude = data.get('latitude')
         longitude = data.get('longitude')
         
         if latitude is None or longitude is None:
             return jsonify({'error': 'Coordenadas requeridas'}), 400
-        
-        # Update current location
-        tracking.current_latitude = latitude
-        tracking.current_longitude = longitude
-        
-        # Reverse geocode to get address
-        address = google_maps_service.reverse_geocode(latitude, longitude)
-        if address:
-            tracking.current_address = address
-        
-        # Calculate distance and time to destination
-        if tracking.destination_latitude and tracking.destination_longitude:
-            distance_data = google_maps_service.calculate_distance_and_time(
-                latitude, longitude,
-                tracking.destination_latitude, tracking.destination_longitude
-            )
-            
-            if distance_data:
-                tracking.distance_km = distance_data['distance_km']
-                tracking.time_minutes = int(distance_data['duration_minutes'])
-                tracking.eta = google_maps_service.calculate_eta(
-                    distance_data['distance_km']
-                )
-                
-                # Check if near delivery
-                if google_maps_service.is_near_delivery(distance_data['distance_km']):
-                    order = Order.query.get(order_id)
-                    if order:
-                        notification_service.notify_near_delivery(
-                            order.user_id, 
-                            order_id, 
-                            int(distance_data['duration_minutes'])
-                        )
-        
-        tracking.last_updated = datetime.now()
-        
-        # Add to status history
-        status_history = OrderStatusHistory(
-            order_id=order_id,
-            status='in_transit',
-            changed_by=current_user.id,
-            latitude=latitude,
-            longitude=longitude,
-            address=tracking.current_address,
-            notes='Ubicación actualizada'
-        )
-        db.session.add(status_history)
-        
-        db.session.commit()
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Coordenadas inválidas'}), 400
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({'error': 'Coordenadas inválidas'}), 400
+        
+        # Encolar el ping: geocodificación, ETA, historial y notificaciones se procesan
+        # en segundo plano, por lotes y agrupando los pings de cada pedido
+        location_ingest.start(current_app._get_current_object())
+        if not location_ingest.enqueue(order_id, latitude, longitude, current_user.id):
+            return jsonify({'error': 'Servicio de rastreo saturado, reintente en unos segundos'}), 503
         
         return jsonify({
-            'message': 'Ubicación actualizada',
-            'tracking': tracking.to_dict()
-        }), 200
+            'message': 'Ubicación recibida',
+            'queued': True
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -194,7 +195,7 @@ def get_tracking(order_id):
             return jsonify({'error': 'Pedido no encontrado'}), 404
         
         # Check permissions
-        if not (current_user.role in ['admin', 'employee'] or order.user_id == current_user.id):
+        if not (current_user.is_employee() or order.user_id == current_user.id):
             return jsonify({'error': 'No autorizado'}), 403
         
         tracking = DeliveryTracking.query.filter_by(order_id=order_id).first()
@@ -237,7 +238,7 @@ def get_route(order_id):
             return jsonify({'error': 'Pedido no encontrado'}), 404
         
         # Check permissions
-        if not (current_user.role in ['admin', 'employee'] or order.user_id == current_user.id):
+        if not (current_user.is_employee() or order.user_id == current_user.id):
             return jsonify({'error': 'No autorizado'}), 403
         
         tracking = DeliveryTracking.query.filter_by(order_id=order_id).first()
@@ -249,17 +250,17 @@ def get_route(order_id):
         if not (tracking.current_latitude and tracking.destination_latitude):
             return jsonify({'error': 'Información de ubicación incompleta'}), 400
         
-        # Calculate full route
-        route_data = google_maps_service.calculate_route(
-            tracking.current_latitude, tracking.current_longitude,
-            tracking.destination_latitude, tracking.destination_longitude
-        )
+        # Ruta en caché mientras el repartidor siga dentro del corredor; si no, Directions API
+        route_data, source = route_cache.get_route(tracking)
+        if source in ('memory', 'remote') and route_data:
+            db.session.commit()
         
         if not route_data:
             return jsonify({'error': 'No se pudo calcular la ruta'}), 500
         
         return jsonify({
             'route': route_data,
+            'route_source': source,
             'current_location': {
                 'latitude': tracking.current_latitude,
                 'longitude': tracking.current_longitude,
@@ -279,28 +280,107 @@ def get_route(order_id):
 @tracking_bp.route('/order/<int:order_id>/history', methods=['GET'])
 @login_required
 def get_tracking_history(order_id):
-    """Get tracking history for an order"""
+    """
+    Get status history for an order (newest first, paginated)
+    
+    Query params:
+        limit: Rows per page (default 50, max 200)
+        before_id: Return rows older than this history ID
+    
+    Location pings are not included; see /order/<id>/breadcrumbs
+    """
     try:
         order = Order.query.get(order_id)
         if not order:
             return jsonify({'error': 'Pedido no encontrado'}), 404
         
         # Check permissions
-        if not (current_user.role in ['admin', 'employee'] or order.user_id == current_user.id):
+        if not (current_user.is_employee() or order.user_id == current_user.id):
             return jsonify({'error': 'No autorizado'}), 403
         
-        history = OrderStatusHistory.query.filter_by(
-            order_id=order_id
-        ).order_by(OrderStatusHistory.created_at.desc()).all()
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+        before_id = request.args.get('before_id', type=int)
+        
+        query = breadcrumb_service.status_history_query(order_id).options(
+            joinedload(OrderStatusHistory.user)
+        )
+        if before_id:
+            query = query.filter(OrderStatusHistory.id < before_id)
+        history = query.order_by(
+            OrderStatusHistory.created_at.desc(), OrderStatusHistory.id.desc()
+        ).limit(limit + 1).all()
+        
+        has_more = len(history) > limit
+        history = history[:limit]
         
         return jsonify({
-            'history': [h.to_dict() for h in history]
+            'history': [h.to_dict() for h in history],
+            'has_more': has_more,
+            'next_before_id': history[-1].id if has_more else None
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@tracking_bp.route('/order/<int:order_id>/breadcrumbs', methods=['GET'])
+@login_required
+def get_breadcrumbs(order_id):
+    """
+    Get the simplified GPS trail of a delivery
+    
+    Query params:
+        zoom: Map zoom level used to pick the simplification tolerance
+        max_points: Maximum points returned (default and cap BREADCRUMB_MAX_POINTS)
+    """
+    try:
+        order = Order.query.get(order_id)
+        if not order:
+            return jsonify({'error': 'Pedido no encontrado'}), 404
+        
+        # Check permissions
+        if not (current_user.is_employee() or order.user_id == current_user.id):
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        path = breadcrumb_service.get_path(
+            order_id,
+            zoom=request.args.get('zoom', type=float),
+            max_points=request.args.get('max_points', type=int)
+        )
+        
+        return jsonify({'order_id': order_id, 'path': path}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/order/<int:order_id>/archive', methods=['GET'])
+@login_required
+def get_archived_history(order_id):
+    """
+    Get archived status history of a closed order (newest first)
+    
+    Query params:
+        limit: Maximum rows (default 100, max 1000)
+    """
+    try:
+        order = Order.query.get(order_id)
+        if not order:
+            return jsonify({'error': 'Pedido no encontrado'}), 404
+        
+        # Check permissions
+        if not (current_user.is_employee() or order.user_id == current_user.id):
+            return jsonify({'error': 'No autorizado'}), 403
+        
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        history = retention_service.get_archive('status_history', order_id=order_id, limit=limit)
+        
+        return jsonify({'order_id': order_id, 'history': history}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @tracking_bp.route('/order/<int:order_id>/complete', methods=['POST'])
 @login_required
 @employee_required
@@ -327,11 +407,13 @@ def complete_delivery(order_id):
             notes='Pedido entregado'
         )
         db.session.add(status_history)
+        _publish_status(order_id, 'delivered', False)
         
-        db.session.commit()
+        # Send notification (insertada con el mismo commit)
+        notification_service.queue_notification(order.user_id, order_id, 'delivered')
         
-        # Send notification
-        notification_service.notify_delivered(order.user_id, order_id)
+        db.session.commit()
+        spatial_index.remove(order_id)
         
         return jsonify({
             'message': 'Entrega completada',
@@ -358,7 +440,9 @@ def cancel_tracking(order_id):
             return jsonify({'error': 'Rastreo no encontrado'}), 404
         
         tracking.is_active = False
+        _publish_status(order_id, tracking.order.status, False)
         db.session.commit()
+        spatial_index.remove(order_id)
         
         return jsonify({
             'message': 'Rastreo cancelado'
@@ -369,6 +453,247 @@ def cancel_tracking(order_id):
         return jsonify({'error': str(e)}), 500
 
 
+@tracking_bp.route('/runs/plan', methods=['POST'])
+@login_required
+@employee_required
+def plan_delivery_runs():
+    """
+    Plan delivery runs for the shipped orders waiting to be dispatched
+    
+    Nothing is stored: the plan can be recomputed at any time and each
+    stop is then started with /order/<id>/start.
+    
+    Request JSON (all optional):
+    {
+        "drivers": [{"driver_name": "Juan Pérez", "driver_phone": "3001234567", "vehicle_info": "Moto - ABC123"}],
+        "vehicles": 3,  (when no drivers are given)
+        "order_ids": [1, 2, 3],
+        "max_stops": 30,
+        "max_units": 100,
+        "depot": {"latitude": 4.6097, "longitude": -74.0817},
+        "return_to_depot": true
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        drivers = data.get('drivers') or None
+        if drivers is not None and not isinstance(drivers, list):
+            return jsonify({'error': 'drivers debe ser una lista'}), 400
+        
+        depot = data.get('depot')
+        if depot is not None:
+            try:
+                depot = {'latitude': float(depot['latitude']), 'longitude': float(depot['longitude'])}
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'depot requiere latitude y longitude'}), 400
+        
+        plan = route_planner.plan(
+            drivers=drivers,
+            vehicles=data.get('vehicles'),
+            order_ids=data.get('order_ids'),
+            max_stops=data.get('max_stops'),
+            max_units=data.get('max_units'),
+            depot=depot,
+            return_to_depot=bool(data.get('return_to_depot', True))
+        )
+        
+        return jsonify(plan), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/nearby', methods=['GET'])
+@login_required
+@employee_required
+def get_nearby_deliveries():
+    """
+    Active deliveries whose driver is within a radius of a point (closest first)
+    
+    Query params:
+        lat, lng: Center of the search
+        radius_m: Radius in meters (default 1000, max 50000)
+        limit: Maximum results (default 50)
+    """
+    try:
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        if latitude is None or longitude is None:
+            return jsonify({'error': 'Latitud y longitud requeridas'}), 400
+        
+        radius_m = max(1.0, min(request.args.get('radius_m', 1000, type=float), 50000.0))
+        limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+        
+        return jsonify({
+            'deliveries': spatial_index.within(latitude, longitude, radius_m, limit=limit)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/nearest', methods=['GET'])
+@login_required
+@employee_required
+def get_nearest_drivers():
+    """
+    Drivers of active deliveries closest to a point
+    
+    Query params:
+        lat, lng: Point to search from
+        k: Number of drivers (default 1, max 20)
+        max_radius_m: Search limit in meters (default 50000)
+    """
+    try:
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        if latitude is None or longitude is None:
+            return jsonify({'error': 'Latitud y longitud requeridas'}), 400
+        
+        k = max(1, min(request.args.get('k', 1, type=int), 20))
+        max_radius_m = max(1.0, min(request.args.get('max_radius_m', 50000, type=float), 200000.0))
+        
+        return jsonify({
+            'drivers': spatial_index.nearest(latitude, longitude, k=k, max_radius_m=max_radius_m)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/fleet', methods=['GET'])
+@login_required
+@employee_required
+def get_fleet():
+    """
+    Active deliveries for the dispatcher map, served from memory
+    
+    Query params:
+        since: Version returned by the previous call; only the deliveries
+            changed after it (and the IDs removed) are returned
+        epoch: Epoch returned by the previous call; a different epoch
+            (process restart) returns the full fleet
+    
+    Sends an ETag; If-None-Match with the current one returns 304.
+    """
+    try:
+        etag = f'"{fleet_snapshot.etag()}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=304)
+        else:
+            response = jsonify(fleet_snapshot.read(
+                since=request.args.get('since', type=int),
+                epoch=request.args.get('epoch')
+            ))
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/fleet/stats', methods=['GET'])
+@login_required
+@admin_required
+def fleet_snapshot_stats():
+    """Size, version and read counters of the in-memory fleet snapshot"""
+    try:
+        return jsonify({'stats': fleet_snapshot.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/stream', methods=['GET'])
+@login_required
+def stream_events():
+    """
+    Server-Sent Events stream with tracking updates and notifications
+    
+    Query params:
+        order_id: Order to follow (repeatable)
+        scope: 'all' to receive every delivery (admin/employee only)
+    
+    Events: 'location' (current location and estimates), 'status',
+    'notification' and 'resync' (missed events: reload with the REST endpoints).
+    The stream closes after SSE_MAX_SECONDS and EventSource reconnects
+    with Last-Event-ID.
+    """
+    try:
+        is_staff = current_user.is_employee()
+        topics = {f'user:{current_user.id}'}
+        
+        order_ids = request.args.getlist('order_id', type=int)
+        if order_ids:
+            allowed = order_ids if is_staff else [
+                row[0] for row in db.session.query(Order.id).filter(
+                    Order.id.in_(order_ids), Order.user_id == current_user.id
+                ).all()
+            ]
+            if len(set(allowed)) != len(set(order_ids)):
+                return jsonify({'error': 'No autorizado'}), 403
+            topics.update(f'order:{order_id}' for order_id in order_ids)
+        
+        if request.args.get('scope') == 'all':
+            if not is_staff:
+                return jsonify({'error': 'No autorizado'}), 403
+            topics.add('orders')
+        
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        subscription, complete = event_broker.subscribe(topics, last_event_id)
+        if subscription is None:
+            response = jsonify({
+                'error': 'Demasiadas conexiones, intenta más tarde',
+                'retry': event_broker.RETRY_SECONDS
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(event_broker.RETRY_SECONDS)
+            return response
+        
+        # El stream no usa la sesión: liberar la conexión a la base de datos antes de empezar
+        db.session.remove()
+        
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                if not complete:
+                    yield 'event: resync\ndata: {}\n\n'
+                deadline = time.monotonic() + event_broker.MAX_STREAM_SECONDS
+                while time.monotonic() < deadline:
+                    items = subscription.wait(event_broker.HEARTBEAT_SECONDS)
+                    if subscription.overflowed:
+                        subscription.overflowed = False
+                        yield 'event: resync\ndata: {}\n\n'
+                    if not items:
+                        yield ': keep-alive\n\n'
+                        continue
+                    yield ''.join(event_broker.format(item) for item in items)
+            finally:
+                event_broker.unsubscribe(subscription)
+        
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/stream/stats', methods=['GET'])
+@login_required
+@admin_required
+def stream_stats():
+    """Connected streams and events published by this process"""
+    try:
+        return jsonify({'stats': event_broker.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # Notification endpoints
 @tracking_bp.route('/notifications', methods=['GET'])
 @login_required
@@ -393,6 +718,44 @@ def get_notifications():
         return jsonify({'error': str(e)}), 500
 
 
+@tracking_bp.route('/notifications/unread-count', methods=['GET'])
+@login_required
+def get_unread_count():
+    """Unread notifications of the current user (for the navbar badge)"""
+    try:
+        return jsonify({
+            'unread_count': notification_service.get_unread_count(current_user.id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/notifications/archive', methods=['GET'])
+@login_required
+def get_archived_notifications():
+    """
+    Get archived (old, read) notifications of the current user
+    
+    Query params:
+        order_id: Only notifications of this order
+        limit: Maximum rows (default 100, max 1000)
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        notifications = retention_service.get_archive(
+            'notification',
+            order_id=request.args.get('order_id', type=int),
+            user_id=current_user.id,
+            limit=limit
+        )
+        
+        return jsonify({'notifications': notifications}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @tracking_bp.route('/notifications/<int:notification_id>/read', methods=['PUT'])
 @login_required
 def mark_notification_read(notification_id):
@@ -406,7 +769,7 @@ def mark_notification_read(notification_id):
         if notification.user_id != current_user.id:
             return jsonify({'error': 'No autorizado'}), 403
         
-        success = notification_service.mark_as_read(notification_id)
+        success = notification_service.mark_as_read(notification_id, user_id=current_user.id)
         
         if success:
             return jsonify({'message': 'Notificación marcada como leída'}), 200
@@ -436,3 +799,39 @@ def mark_all_notifications_read():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/ingest/stats', methods=['GET'])
+@login_required
+@admin_required
+def ingest_stats():
+    """Queue depth and counters of the asynchronous location ingest"""
+    try:
+        return jsonify({'stats': location_ingest.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/spatial/stats', methods=['GET'])
+@login_required
+@admin_required
+def spatial_index_stats():
+    """Size and query counters of the in-memory spatial index"""
+    try:
+        return jsonify({'stats': spatial_index.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@tracking_bp.route('/route-cache/stats', methods=['GET'])
+@login_required
+@admin_required
+def route_cache_stats():
+    """Counters of the routes served from the corridor, memory or Directions API"""
+    try:
+        return jsonify({'stats': route_cache.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -12,17 +12,44 @@ class GoogleMapsConfig:
     # API Key from environment
     API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
     
-    # API Endpoints
-    GEOCODING_API_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
-    DIRECTIONS_API_URL = 'https://maps.googleapis.com/maps/api/directions/json'
-    DISTANCE_MATRIX_API_URL = 'https://maps.googleapis.com/maps/api/distancematrix/json'
-    PLACES_API_URL = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
+    # API Endpoints (GOOGLE_MAPS_API_BASE can point to a local stub server)
+    API_BASE_URL = os.environ.get('GOOGLE_MAPS_API_BASE', 'https://maps.googleapis.com').rstrip('/')
+    GEOCODING_API_URL = f'{API_BASE_URL}/maps/api/geocode/json'
+    DIRECTIONS_API_URL = f'{API_BASE_URL}/maps/api/directions/json'
+    DISTANCE_MATRIX_API_URL = f'{API_BASE_URL}/maps/api/distancematrix/json'
+    PLACES_API_URL = f'{API_BASE_URL}/maps/api/place/nearbysearch/json'
     
     # Tracking Settings
     TRACKING_UPDATE_INTERVAL = 30  # seconds - how often to update location
     NEAR_DELIVERY_DISTANCE = 1.0   # km - distance to trigger "near delivery" notification
     AVERAGE_SPEED = 30             # km/h - average delivery vehicle speed for ETA calculation
-    
+
+    # Local ETA estimator (haversine distance * road factor / AVERAGE_SPEED)
+    DEFAULT_ROAD_FACTOR = float(os.environ.get('ETA_DEFAULT_ROAD_FACTOR', 1.3))   # used until there is calibration data
+    ETA_REMOTE_MOVE_KM = float(os.environ.get('ETA_REMOTE_MOVE_KM', 2.0))         # re-check Distance Matrix after moving this far
+    ETA_REMOTE_MAX_AGE = int(os.environ.get('ETA_REMOTE_MAX_AGE', 600))           # seconds before a remote estimate is stale
+    ETA_REFRESH_INTERVAL = int(os.environ.get('ETA_REFRESH_INTERVAL', 180))       # seconds between batched Distance Matrix refreshes
+    ETA_REFRESH_MIN_AGE = int(os.environ.get('ETA_REFRESH_MIN_AGE', 120))         # skip deliveries checked more recently than this
+    ETA_REFRESH_GRID_DECIMALS = int(os.environ.get('ETA_REFRESH_GRID_DECIMALS', 4))  # nearby positions share a matrix row/column
+
+    # Distance Matrix request limits
+    DISTANCE_MATRIX_MAX_ORIGINS = 25
+    DISTANCE_MATRIX_MAX_DESTINATIONS = 25
+    DISTANCE_MATRIX_MAX_ELEMENTS = 100
+    
+    # Geocoding cache (in-process LRU + geocode_cache table)
+    GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', 10000))          # entries kept in memory
+    GEOCODE_CACHE_TTL_DAYS = int(os.environ.get('GEOCODE_CACHE_TTL_DAYS', 30))      # address -> coordinates
+    REVERSE_GEOCODE_CACHE_TTL_DAYS = int(os.environ.get('REVERSE_GEOCODE_CACHE_TTL_DAYS', 7))  # coordinates -> address
+    GEOCODE_NEGATIVE_TTL_HOURS = int(os.environ.get('GEOCODE_NEGATIVE_TTL_HOURS', 6))  # addresses without results
+    REVERSE_GEOCODE_GRID_DECIMALS = int(os.environ.get('REVERSE_GEOCODE_GRID_DECIMALS', 4))  # 4 decimals ~ 11 m
+
+    # Route cache (Directions API results reused while the driver stays on the route)
+    ROUTE_CACHE_SIZE = int(os.environ.get('ROUTE_CACHE_SIZE', 2000))                # routes kept in memory
+    ROUTE_CACHE_TTL = int(os.environ.get('ROUTE_CACHE_TTL', 1800))                  # seconds before a route is recalculated
+    ROUTE_CACHE_GRID_DECIMALS = int(os.environ.get('ROUTE_CACHE_GRID_DECIMALS', 3))  # 3 decimals ~ 110 m
+    ROUTE_CORRIDOR_METERS = float(os.environ.get('ROUTE_CORRIDOR_METERS', 150))     # max distance from the route before recalculating
+
     # Map Display Settings
     DEFAULT_ZOOM_LEVEL = 13
     DELIVERY_ZOOM_LEVEL = 15
@@ -55,6 +82,7 @@ class GoogleMapsConfig:
         'in_preparation': 'Tu pedido #{order_id} está siendo preparado',
         'out_for_delivery': 'Tu pedido #{order_id} está en camino',
         'near_delivery': '¡Tu pedido #{order_id} está cerca! Llegará en {minutes} minutos',
+        'driver_arrived': 'El repartidor de tu pedido #{order_id} llegó a la dirección de entrega',
         'delivered': 'Tu pedido #{order_id} ha sido entregado',
         'location_update': 'Ubicación actualizada para el pedido #{order_id}'
     }
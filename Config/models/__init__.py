@@ -8,6 +8,10 @@ from .order_item import OrderItem
 from .address import Address
 from .cart import Cart, CartItem
 from .ticket import Ticket, TicketMessage
-from .order_tracking import OrderStatusHistory, DeliveryTracking, OrderNotification
+from .order_tracking import OrderStatusHistory, DeliveryTracking, DeliveryBreadcrumbSegment, OrderNotification, NotificationCounter
+from .analytics import SalesRollupDaily, SalesRollupHourly, ProductSalesRollup, ProductSalesTotal, OrderStatusRollup, AnalyticsCounter
+from .inventory import StockReservation, ReservationSweepRun
+from .geocode_cache import GeocodeCacheEntry
+from .archive import ArchiveChunk, RetentionRun
 
-__all__ = ['User', 'Product', 'Order', 'Category', 'Task', 'OrderItem', 'Address', 'Cart', 'CartItem', 'Ticket', 'TicketMessage', 'OrderStatusHistory', 'DeliveryTracking', 'OrderNotification']
\ No newline at end of file
+__all__ = ['User', 'Product', 'Order', 'Category', 'Task', 'OrderItem', 'Address', 'Cart', 'CartItem', 'Ticket', 'TicketMessage', 'OrderStatusHistory', 'DeliveryTracking', 'DeliveryBreadcrumbSegment', 'OrderNotification', 'NotificationCounter', 'SalesRollupDaily', 'SalesRollupHourly', 'ProductSalesRollup', 'ProductSalesTotal', 'OrderStatusRollup', 'AnalyticsCounter', 'StockReservation', 'ReservationSweepRun', 'GeocodeCacheEntry', 'ArchiveChunk', 'RetentionRun']
\ No newline at end of file
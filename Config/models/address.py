@@ -3,6 +3,13 @@ from datetime import datetime
 
 class Address(db.Model):
     __tablename__ = 'addresses'
+    __table_args__ = (
+        db.Index('idx_addresses_user_default', 'user_id', 'is_default', 'created_at'),
+        db.Index('idx_addresses_geocode_status', 'geocode_status', 'id'),
+    )
+
+    # Campos que, al cambiar, obligan a geocodificar de nuevo
+    LOCATION_FIELDS = ('street', 'city', 'state', 'zip_code', 'country')
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -14,6 +21,11 @@ class Address(db.Model):
     country = db.Column(db.String(100), default='Colombia')
     phone = db.Column(db.String(20))
     is_default = db.Column(db.Boolean, default=False)
+    # Coordenadas calculadas en segundo plano (AddressGeocoder): pending, ok o not_found
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geocode_status = db.Column(db.String(20), default='pending', nullable=False)
+    geocoded_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -35,6 +47,9 @@ class Address(db.Model):
             'country': self.country,
             'phone': self.phone,
             'is_default': self.is_default,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'geocode_status': self.geocode_status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
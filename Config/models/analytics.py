@@ -0,0 +1,76 @@
+from Config.db import db
+from datetime import datetime
+
+
+class SalesRollupDaily(db.Model):
+    """Agregado diario de ventas (pedidos, ingresos, clientes nuevos, unidades vendidas)"""
+    __tablename__ = 'sales_rollup_daily'
+
+    bucket_date = db.Column(db.Date, primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    new_customers = db.Column(db.Integer, nullable=False, default=0)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'date': self.bucket_date.isoformat() if self.bucket_date else None,
+            'orders_count': self.orders_count,
+            'revenue': float(self.revenue or 0),
+            'new_customers': self.new_customers,
+            'units_sold': self.units_sold
+        }
+
+
+class SalesRollupHourly(db.Model):
+    """Agregado por hora de pedidos e ingresos"""
+    __tablename__ = 'sales_rollup_hourly'
+
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'hour': self.bucket_start.isoformat() if self.bucket_start else None,
+            'orders_count': self.orders_count,
+            'revenue': float(self.revenue or 0)
+        }
+
+
+class ProductSalesRollup(db.Model):
+    """Unidades vendidas por producto y por día"""
+    __tablename__ = 'product_sales_rollup'
+
+    bucket_date = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class ProductSalesTotal(db.Model):
+    """Unidades vendidas por producto desde el inicio (para el ranking de más vendidos)"""
+    __tablename__ = 'product_sales_total'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    units_sold = db.Column(db.Integer, nullable=False, default=0, index=True)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    product = db.relationship('Product')
+
+
+class OrderStatusRollup(db.Model):
+    """Cantidad de pedidos por estado"""
+    __tablename__ = 'order_status_rollup'
+
+    status = db.Column(db.String(20), primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AnalyticsCounter(db.Model):
+    """Contadores globales acumulados (total de pedidos, ingresos, clientes)"""
+    __tablename__ = 'analytics_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
@@ -0,0 +1,70 @@
+from Config.db import db
+from datetime import datetime
+
+
+class ArchiveChunk(db.Model):
+    """Bloque comprimido de filas archivadas (notificaciones leídas o historial de pedidos cerrados)"""
+    __tablename__ = 'archive_chunks'
+    __table_args__ = (
+        db.Index('idx_archive_kind_order', 'kind', 'order_id'),
+        db.Index('idx_archive_kind_user', 'kind', 'user_id', 'last_created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # notification, status_history
+    order_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)  # Destinatario (solo notificaciones)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    first_created_at = db.Column(db.DateTime, nullable=True)
+    last_created_at = db.Column(db.DateTime, nullable=True)
+    payload = db.Column(db.LargeBinary, nullable=False)  # JSON Lines comprimido con zlib
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArchiveChunk {self.kind} order={self.order_id} rows={self.row_count}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'order_id': self.order_id,
+            'user_id': self.user_id,
+            'row_count': self.row_count,
+            'first_created_at': self.first_created_at.isoformat() if self.first_created_at else None,
+            'last_created_at': self.last_created_at.isoformat() if self.last_created_at else None,
+            'bytes': len(self.payload or b''),
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
+
+
+class RetentionRun(db.Model):
+    """Métricas de una ejecución del trabajo de retención"""
+    __tablename__ = 'retention_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    notifications_archived = db.Column(db.Integer, nullable=False, default=0)
+    history_archived = db.Column(db.Integer, nullable=False, default=0)
+    chunks_written = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<RetentionRun {self.started_at} rows={self.notifications_archived + self.history_archived}>'
+
+    def to_dict(self):
+        duration_ms = None
+        if self.started_at and self.finished_at:
+            duration_ms = int((self.finished_at - self.started_at).total_seconds() * 1000)
+        return {
+            'id': self.id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': duration_ms,
+            'batches': self.batches,
+            'notifications_archived': self.notifications_archived,
+            'history_archived': self.history_archived,
+            'chunks_written': self.chunks_written,
+            'error': self.error
+        }
@@ -22,6 +22,9 @@ class Cart(db.Model):
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        db.Index('idx_cart_items_cart_product', 'cart_id', 'product_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
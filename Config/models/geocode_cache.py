@@ -0,0 +1,37 @@
+from Config.db import db
+from datetime import datetime
+
+
+class GeocodeCacheEntry(db.Model):
+    """Resultado persistido de una geocodificación (directa por dirección o inversa por celda lat/lng)"""
+    __tablename__ = 'geocode_cache'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'cache_key', name='uq_geocode_cache_kind_key'),
+        db.Index('idx_geocode_cache_expires', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # forward, reverse
+    cache_key = db.Column(db.String(255), nullable=False)  # Dirección normalizada o celda "lat,lng"
+    found = db.Column(db.Boolean, nullable=False, default=True)  # False = ZERO_RESULTS (caché negativa)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    formatted_address = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<GeocodeCacheEntry {self.kind} {self.cache_key}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'cache_key': self.cache_key,
+            'found': self.found,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'formatted_address': self.formatted_address,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
@@ -0,0 +1,77 @@
+from Config.db import db
+from datetime import datetime
+
+
+class StockReservation(db.Model):
+    """Reserva de inventario de una línea de carrito (usuario o invitado) con vencimiento"""
+    __tablename__ = 'stock_reservations'
+    __table_args__ = (
+        db.UniqueConstraint('cart_id', 'product_id', name='uq_reservation_cart_product'),
+        db.UniqueConstraint('guest_token', 'product_id', name='uq_reservation_guest_product'),
+        db.Index('idx_reservations_status_expires', 'status', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=True)  # Carrito de usuario autenticado
+    guest_token = db.Column(db.String(64), nullable=True)  # Carrito de invitado (sesión)
+    status = db.Column(db.String(20), nullable=False, default='active')  # active, expired
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    product = db.relationship('Product')
+
+    def __repr__(self):
+        return f'<StockReservation product={self.product_id} qty={self.quantity} {self.status}>'
+
+    def is_active(self):
+        return self.status == 'active'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'cart_id': self.cart_id,
+            'status': self.status,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class ReservationSweepRun(db.Model):
+    """Métricas de una ejecución del barrido de reservas vencidas"""
+    __tablename__ = 'reservation_sweep_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    reservations_released = db.Column(db.Integer, nullable=False, default=0)
+    legacy_lines_released = db.Column(db.Integer, nullable=False, default=0)  # Líneas de carrito sin reserva
+    units_released = db.Column(db.Integer, nullable=False, default=0)  # Unidades devueltas al inventario
+    products_affected = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<ReservationSweepRun {self.started_at} units={self.units_released}>'
+
+    def to_dict(self):
+        duration_ms = None
+        if self.started_at and self.finished_at:
+            duration_ms = int((self.finished_at - self.started_at).total_seconds() * 1000)
+        return {
+            'id': self.id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': duration_ms,
+            'batches': self.batches,
+            'reservations_released': self.reservations_released,
+            'legacy_lines_released': self.legacy_lines_released,
+            'units_released': self.units_released,
+            'products_affected': self.products_affected,
+            'error': self.error
+        }
@@ -3,6 +3,12 @@ from datetime import datetime
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('idx_orders_user_created', 'user_id', 'created_at'),
+        db.Index('idx_orders_status_created', 'status', 'created_at'),
+        db.Index('idx_orders_status_updated', 'status', 'updated_at'),
+        db.Index('idx_orders_created_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('idx_order_items_order', 'order_id'),
+        db.Index('idx_order_items_product', 'product_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -4,6 +4,9 @@ from datetime import datetime
 class OrderStatusHistory(db.Model):
     """Historial de cambios de estado de pedidos con geolocalización"""
     __tablename__ = 'order_status_history'
+    __table_args__ = (
+        db.Index('idx_osh_order_created', 'order_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -77,6 +80,18 @@ class DeliveryTracking(db.Model):
     estimated_distance_km = db.Column(db.Float)  # Distancia en kilómetros
     estimated_time_minutes = db.Column(db.Integer)  # Tiempo estimado en minutos
     eta = db.Column(db.DateTime)  # Estimated Time of Arrival
+    eta_source = db.Column(db.String(10))  # local (haversine) o remote (Distance Matrix)
+    
+    # Última consulta a Distance Matrix (para decidir cuándo volver a consultar)
+    remote_checked_at = db.Column(db.DateTime)
+    remote_latitude = db.Column(db.Float)
+    remote_longitude = db.Column(db.Float)
+    road_factor = db.Column(db.Float)  # Distancia por carretera / distancia en línea recta
+    
+    # Última ruta de Directions API (se reutiliza mientras el repartidor siga sobre ella)
+    route_polyline = db.Column(db.Text)  # overview_polyline codificada
+    route_summary = db.Column(db.Text)  # JSON: distancia, duración, direcciones, pasos, destino y modo
+    route_fetched_at = db.Column(db.DateTime)
     
     # Estado
     is_active = db.Column(db.Boolean, default=True)
@@ -108,16 +123,62 @@ class DeliveryTracking(db.Model):
             'estimates': {
                 'distance_km': self.estimated_distance_km,
                 'time_minutes': self.estimated_time_minutes,
-                'eta': self.eta.isoformat() if self.eta else None
+                'eta': self.eta.isoformat() if self.eta else None,
+                'source': self.eta_source
             },
             'is_active': self.is_active,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
 
 
+class DeliveryBreadcrumbSegment(db.Model):
+    """Tramo comprimido del recorrido GPS de un pedido (deltas codificados como varints)"""
+    __tablename__ = 'delivery_breadcrumb_segments'
+    __table_args__ = (
+        db.UniqueConstraint('order_id', 'seq', name='uq_breadcrumb_order_seq'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False, default=0)  # Orden del tramo dentro del pedido
+    point_count = db.Column(db.Integer, nullable=False, default=1)
+    
+    # Primer punto (coordenadas en unidades de 1e-5 grados, ~1 m)
+    started_at = db.Column(db.DateTime, nullable=False)
+    start_latitude_e5 = db.Column(db.Integer, nullable=False)
+    start_longitude_e5 = db.Column(db.Integer, nullable=False)
+    
+    # Último punto (base para codificar el siguiente delta)
+    ended_at = db.Column(db.DateTime, nullable=False)
+    end_latitude_e5 = db.Column(db.Integer, nullable=False)
+    end_longitude_e5 = db.Column(db.Integer, nullable=False)
+    
+    # Puntos 2..n: (segundos, lat, lng) como deltas zigzag-varint respecto al punto anterior
+    deltas = db.Column(db.LargeBinary, nullable=False, default=b'')
+    
+    def __repr__(self):
+        return f'<DeliveryBreadcrumbSegment order={self.order_id} seq={self.seq} points={self.point_count}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'seq': self.seq,
+            'point_count': self.point_count,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+            'bytes': len(self.deltas or b'')
+        }
+
+
 class OrderNotification(db.Model):
     """Notificaciones de pedidos para usuarios"""
     __tablename__ = 'order_notifications'
+    __table_args__ = (
+        db.Index('idx_on_user_read_created', 'user_id', 'is_read', 'created_at'),
+        db.Index('idx_on_user_created', 'user_id', 'created_at'),
+        db.Index('idx_on_order_created', 'order_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -140,3 +201,19 @@ class OrderNotification(db.Model):
             'is_read': self.is_read,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class NotificationCounter(db.Model):
+    """Contador de notificaciones sin leer por usuario (se mantiene con cada cambio)"""
+    __tablename__ = 'notification_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'unread': self.unread,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
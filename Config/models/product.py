@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('idx_products_active_created', 'active', 'created_at'),
+        db.Index('idx_products_category_active', 'category_id', 'active'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('idx_tasks_assigned_status', 'assigned_to', 'status'),
+        db.Index('idx_tasks_assigned_created', 'assigned_to', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Ticket(db.Model):
     __tablename__ = 'tickets'
+    __table_args__ = (
+        db.Index('idx_tickets_user_created', 'user_id', 'created_at'),
+        db.Index('idx_tickets_assigned', 'assigned_to'),
+        db.Index('idx_tickets_created', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -46,6 +51,9 @@ class Ticket(db.Model):
 
 class TicketMessage(db.Model):
     __tablename__ = 'ticket_messages'
+    __table_args__ = (
+        db.Index('idx_ticket_messages_ticket_created', 'ticket_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
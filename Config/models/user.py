@@ -6,6 +6,9 @@ import secrets
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('idx_users_role_created', 'role', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(100), unique=True)
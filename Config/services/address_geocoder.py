@@ -0,0 +1,308 @@
+"""
+Address Geocoder
+Background geocoding of customer addresses, so dispatching reads coordinates locally
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import bindparam
+from Config.db import db
+from Config.models.address import Address
+from Config.services.geocode_cache import geocode_cache
+from Config.services.google_maps_service import google_maps_service
+
+
+class AddressGeocoder:
+    """
+    Fills the latitude/longitude of addresses outside the request
+
+    The client routes queue the IDs of addresses created or moved (their
+    coordinates are reset to 'pending'), and a worker thread drains the
+    queue in batches: each batch loads its addresses with one query,
+    geocodes every distinct address text once (the geocode cache answers
+    repeated ones without calling the API) and writes all the results with
+    one UPDATE. A result is only stored if the address still has the text
+    that was geocoded. Rows still pending after a restart are picked up by
+    backfill() (backfill_address_coordinates.py).
+
+    resolve() never calls the API, so dispatching orders only reads the
+    addresses table and the geocode cache.
+    """
+
+    BATCH_SIZE = int(os.getenv('ADDRESS_GEOCODE_BATCH_SIZE', 100))
+    FLUSH_INTERVAL = float(os.getenv('ADDRESS_GEOCODE_FLUSH_INTERVAL', 2))  # seconds
+    MAX_PENDING = int(os.getenv('ADDRESS_GEOCODE_MAX_PENDING', 10000))
+
+    def __init__(self):
+        self._pending = {}  # address_id -> None (dict keeps arrival order)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self._app = None
+        self.queued = 0
+        self.rejected = 0
+        self.geocoded = 0
+        self.not_found = 0
+        self.failed = 0
+        self.stale = 0
+        self.batches = 0
+
+    def enqueue(self, address_ids: Iterable[int]) -> int:
+        """
+        Queue addresses for geocoding
+
+        Returns:
+            Number of addresses queued (duplicates and overflow are skipped)
+        """
+        added = 0
+        with self._lock:
+            for address_id in address_ids:
+                if address_id in self._pending:
+                    continue
+                if len(self._pending) >= self.MAX_PENDING:
+                    self.rejected += 1
+                    continue
+                self._pending[address_id] = None
+                added += 1
+            self.queued += added
+        if added:
+            self._wakeup.set()
+        return added
+
+    @staticmethod
+    def reset(address: Address) -> None:
+        """Mark an address as needing new coordinates (not committed)"""
+        address.latitude = None
+        address.longitude = None
+        address.geocode_status = 'pending'
+        address.geocoded_at = None
+
+    @staticmethod
+    def resolve(user_id: Optional[int], address_text: str) -> Optional[Dict]:
+        """
+        Coordinates of a destination without calling the API
+
+        Looks for a geocoded address of the customer with the same text,
+        then in the geocode cache.
+
+        Returns:
+            Dict with 'latitude', 'longitude', 'formatted_address' or None
+        """
+        key = geocode_cache.normalize_address(address_text)
+        if user_id is not None:
+            addresses = Address.query.filter(
+                Address.user_id == user_id,
+                Address.geocode_status == 'ok'
+            ).all()
+            for address in addresses:
+                if geocode_cache.normalize_address(address.get_full_address()) == key:
+                    return {
+                        'latitude': address.latitude,
+                        'longitude': address.longitude,
+                        'formatted_address': address.get_full_address()
+                    }
+
+        cached, result = geocode_cache.get_forward(address_text)
+        return result if cached else None
+
+    def pending_address_id(self, user_id: Optional[int], address_text: str) -> Optional[int]:
+        """ID of a customer address with this text that is still waiting for coordinates"""
+        if user_id is None:
+            return None
+        key = geocode_cache.normalize_address(address_text)
+        for address in Address.query.filter(
+            Address.user_id == user_id,
+            Address.geocode_status == 'pending'
+        ).all():
+            if geocode_cache.normalize_address(address.get_full_address()) == key:
+                return address.id
+        return None
+
+    def process_batch(self, address_ids: List[int]) -> Dict:
+        """
+        Geocode a batch of addresses and store the results with one UPDATE
+
+        Must be called inside an application context.
+
+        Returns:
+            Dict with 'geocoded', 'not_found', 'failed' and 'stale' counts
+        """
+        counts = {'geocoded': 0, 'not_found': 0, 'failed': 0, 'stale': 0}
+        if not address_ids:
+            return counts
+
+        rows = db.session.query(
+            Address.id, Address.street, Address.city, Address.state,
+            Address.zip_code, Address.country
+        ).filter(
+            Address.id.in_(address_ids),
+            Address.geocode_status == 'pending'
+        ).all()
+        db.session.rollback()  # no mantener la transacción abierta durante las llamadas a la API
+
+        results = {}
+        now = datetime.utcnow()
+        params = []
+        for row in rows:
+            text = f"{row.street}, {row.city}, {row.state} {row.zip_code}, {row.country}"
+            key = geocode_cache.normalize_address(text)
+            if key not in results:
+                results[key] = google_maps_service.geocode_address(text)
+                if results[key] is None:
+                    # Sin resultados queda en caché; un error de red o de la API no
+                    cached, _ = geocode_cache.get_forward(text)
+                    results[key] = 'not_found' if cached else 'failed'
+
+            result = results[key]
+            if result == 'failed':
+                counts['failed'] += 1
+                continue
+            found = isinstance(result, dict)
+            params.append({
+                'b_id': row.id,
+                'b_street': row.street,
+                'b_city': row.city,
+                'b_state': row.state,
+                'b_zip_code': row.zip_code,
+                'b_country': row.country,
+                'v_latitude': result['latitude'] if found else None,
+                'v_longitude': result['longitude'] if found else None,
+                'v_geocode_status': 'ok' if found else 'not_found',
+                'v_geocoded_at': now
+            })
+            counts['geocoded' if found else 'not_found'] += 1
+
+        if params:
+            table = Address.__table__
+            # Solo si la dirección sigue siendo la geocodificada; updated_at se conserva
+            # para que el onupdate del modelo no la cambie
+            result = db.session.execute(
+                table.update().where(
+                    table.c.id == bindparam('b_id'),
+                    table.c.geocode_status == 'pending',
+                    table.c.street == bindparam('b_street'),
+                    table.c.city == bindparam('b_city'),
+                    table.c.state == bindparam('b_state'),
+                    table.c.zip_code == bindparam('b_zip_code'),
+                    table.c.country.is_not_distinct_from(bindparam('b_country'))
+                ).values(
+                    latitude=bindparam('v_latitude'),
+                    longitude=bindparam('v_longitude'),
+                    geocode_status=bindparam('v_geocode_status'),
+                    geocoded_at=bindparam('v_geocoded_at'),
+                    updated_at=table.c.updated_at
+                ),
+                params
+            )
+            db.session.commit()
+            if result.rowcount is not None and result.rowcount >= 0:
+                counts['stale'] = len(params) - result.rowcount
+
+        return counts
+
+    def backfill(self, batch_size: Optional[int] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Geocode every address still pending, in ID order
+
+        Must be called inside an application context. Rows that fail
+        (network or API errors) stay pending for the next run.
+
+        Args:
+            batch_size: Addresses per batch
+            limit: Maximum addresses handled in this call
+
+        Returns:
+            Totals of process_batch plus 'batches'
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        totals = {'geocoded': 0, 'not_found': 0, 'failed': 0, 'stale': 0, 'batches': 0}
+        last_id = 0
+        handled = 0
+        while limit is None or handled < limit:
+            size = batch_size if limit is None else min(batch_size, limit - handled)
+            address_ids = [
+                row[0] for row in db.session.query(Address.id).filter(
+                    Address.geocode_status == 'pending',
+                    Address.id > last_id
+                ).order_by(Address.id).limit(size).all()
+            ]
+            if not address_ids:
+                break
+            counts = self.process_batch(address_ids)
+            for name, value in counts.items():
+                totals[name] += value
+            totals['batches'] += 1
+            handled += len(address_ids)
+            last_id = address_ids[-1]
+        self._count(totals)
+        return totals
+
+    def _count(self, counts: Dict) -> None:
+        with self._lock:
+            self.geocoded += counts['geocoded']
+            self.not_found += counts['not_found']
+            self.failed += counts['failed']
+            self.stale += counts['stale']
+            self.batches += counts.get('batches', 1)
+
+    def _take_batch(self) -> List[int]:
+        with self._lock:
+            address_ids = list(self._pending)[:self.BATCH_SIZE]
+            for address_id in address_ids:
+                del self._pending[address_id]
+            return address_ids
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            while not self._stop.is_set():
+                address_ids = self._take_batch()
+                if not address_ids:
+                    break
+                with self._app.app_context():
+                    try:
+                        self._count(self.process_batch(address_ids))
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Error geocoding addresses: {str(e)}")
+                    finally:
+                        db.session.remove()
+
+    def start(self, app) -> None:
+        """Start the worker thread (no-op if already running)"""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._app = app
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name='address-geocoder', daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker; addresses still queued stay pending for backfill()"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def stats(self) -> Dict:
+        return {
+            'queued_now': len(self._pending),
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'geocoded': self.geocoded,
+            'not_found': self.not_found,
+            'failed': self.failed,
+            'stale': self.stale,
+            'batches': self.batches,
+            'running': self._worker is not None and self._worker.is_alive()
+        }
+
+
+# Singleton instance
+address_geocoder = AddressGeocoder()
@@ -0,0 +1,425 @@
+"""
+Analytics Rollup Service
+Maintains pre-aggregated sales tables that back the admin analytics dashboard
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import bindparam, event, func, inspect, select, tuple_
+from Config.db import db
+from Config.models.order import Order
+from Config.models.order_item import OrderItem
+from Config.models.product import Product
+from Config.models.user import User
+from Config.models.analytics import (
+    SalesRollupDaily, SalesRollupHourly, ProductSalesRollup,
+    ProductSalesTotal, OrderStatusRollup, AnalyticsCounter
+)
+
+
+class AnalyticsRollupService:
+    """Service for maintaining and reading the analytics rollup tables"""
+
+    # Dashboard buckets used by admin_dashboard.js (renderOrdersByStatus)
+    STATUS_BUCKETS = {
+        'pending': 'pendiente',
+        'processing': 'procesando',
+        'shipped': 'completado',
+        'in_transit': 'completado',
+        'delivered': 'completado',
+        'cancelled': 'cancelado'
+    }
+
+    @staticmethod
+    def _new_deltas() -> Dict:
+        return {
+            'daily': defaultdict(lambda: defaultdict(float)),
+            'hourly': defaultdict(lambda: defaultdict(float)),
+            'product_daily': defaultdict(lambda: defaultdict(float)),
+            'product_total': defaultdict(lambda: defaultdict(float)),
+            'status': defaultdict(lambda: defaultdict(float)),
+            'counters': defaultdict(lambda: defaultdict(float))
+        }
+
+    @staticmethod
+    def _loaded(obj, attr: str, default=None):
+        """Read an attribute without triggering a lazy load inside a flush"""
+        return inspect(obj).dict.get(attr, default)
+
+    @staticmethod
+    def _add_order(deltas: Dict, created_at: datetime, status: Optional[str],
+                   total_amount: float, sign: int = 1) -> None:
+        day = created_at.date()
+        hour = created_at.replace(minute=0, second=0, microsecond=0)
+        amount = float(total_amount or 0) * sign
+
+        deltas['daily'][(day,)]['orders_count'] += sign
+        deltas['daily'][(day,)]['revenue'] += amount
+        deltas['hourly'][(hour,)]['orders_count'] += sign
+        deltas['hourly'][(hour,)]['revenue'] += amount
+        deltas['status'][(status or 'pending',)]['orders_count'] += sign
+        deltas['counters'][('orders',)]['value'] += sign
+        deltas['counters'][('revenue',)]['value'] += amount
+
+    @staticmethod
+    def _add_item(deltas: Dict, created_at: datetime, product_id: int,
+                  quantity: int, total_price: float, sign: int = 1) -> None:
+        day = created_at.date()
+        units = int(quantity or 0) * sign
+        amount = float(total_price or 0) * sign
+
+        deltas['daily'][(day,)]['units_sold'] += units
+        deltas['product_daily'][(day, product_id)]['units_sold'] += units
+        deltas['product_daily'][(day, product_id)]['revenue'] += amount
+        deltas['product_total'][(product_id,)]['units_sold'] += units
+        deltas['product_total'][(product_id,)]['revenue'] += amount
+
+    @staticmethod
+    def _add_customer(deltas: Dict, created_at: datetime, sign: int = 1) -> None:
+        deltas['daily'][(created_at.date(),)]['new_customers'] += sign
+        deltas['counters'][('customers',)]['value'] += sign
+
+    @staticmethod
+    def collect_changes(session) -> Dict:
+        """
+        Build rollup deltas from the pending changes of a session
+
+        Args:
+            session: SQLAlchemy session being flushed
+
+        Returns:
+            Dict of rollup deltas keyed by table
+        """
+        service = AnalyticsRollupService
+        deltas = service._new_deltas()
+        now = datetime.utcnow()
+
+        for obj in session.new:
+            if isinstance(obj, Order):
+                service._add_order(
+                    deltas,
+                    service._loaded(obj, 'created_at') or now,
+                    obj.status,
+                    obj.total_amount
+                )
+            elif isinstance(obj, OrderItem):
+                service._add_item(
+                    deltas,
+                    service._loaded(obj, 'created_at') or now,
+                    obj.product_id,
+                    obj.quantity,
+                    obj.total_price
+                )
+            elif isinstance(obj, User) and obj.role == 'cliente':
+                service._add_customer(deltas, service._loaded(obj, 'created_at') or now)
+
+        for obj in session.dirty:
+            state = inspect(obj)
+            if isinstance(obj, Order):
+                status_hist = state.attrs.status.history
+                if status_hist.added:
+                    old_status = status_hist.deleted[0] if status_hist.deleted else None
+                    new_status = status_hist.added[0]
+                    if old_status != new_status:
+                        if old_status:
+                            deltas['status'][(old_status,)]['orders_count'] -= 1
+                        deltas['status'][(new_status,)]['orders_count'] += 1
+
+                amount_hist = state.attrs.total_amount.history
+                if amount_hist.added and amount_hist.deleted:
+                    diff = float(amount_hist.added[0] or 0) - float(amount_hist.deleted[0] or 0)
+                    if diff:
+                        created_at = service._loaded(obj, 'created_at') or now
+                        hour = created_at.replace(minute=0, second=0, microsecond=0)
+                        deltas['daily'][(created_at.date(),)]['revenue'] += diff
+                        deltas['hourly'][(hour,)]['revenue'] += diff
+                        deltas['counters'][('revenue',)]['value'] += diff
+            elif isinstance(obj, User):
+                role_hist = state.attrs.role.history
+                if role_hist.added and role_hist.deleted:
+                    was_client = role_hist.deleted[0] == 'cliente'
+                    is_client = role_hist.added[0] == 'cliente'
+                    if was_client != is_client:
+                        service._add_customer(
+                            deltas,
+                            service._loaded(obj, 'created_at') or now,
+                            1 if is_client else -1
+                        )
+
+        for obj in session.deleted:
+            if isinstance(obj, Order):
+                state = inspect(obj)
+                status_hist = state.attrs.status.history
+                # Use the committed status in case it was changed in the same flush
+                status = status_hist.deleted[0] if status_hist.deleted else obj.status
+                service._add_order(
+                    deltas,
+                    service._loaded(obj, 'created_at') or now,
+                    status,
+                    obj.total_amount,
+                    sign=-1
+                )
+            elif isinstance(obj, OrderItem):
+                service._add_item(
+                    deltas,
+                    service._loaded(obj, 'created_at') or now,
+                    obj.product_id,
+                    obj.quantity,
+                    obj.total_price,
+                    sign=-1
+                )
+            elif isinstance(obj, User) and obj.role == 'cliente':
+                service._add_customer(deltas, service._loaded(obj, 'created_at') or now, -1)
+
+        return deltas
+
+    @staticmethod
+    def _upsert(connection, table, key_columns, rows: Dict) -> bool:
+        """
+        Increment many rollup rows with one INSERT ... ON CONFLICT/ON DUPLICATE
+        KEY UPDATE executemany per set of incremented columns
+
+        Two transactions creating the same new row (first order of an hour,
+        day or product) both succeed: the database adds the second increment
+        to the row inserted by the first instead of raising IntegrityError.
+
+        Returns:
+            False if the dialect has no upsert (the caller falls back)
+        """
+        dialect = connection.dialect.name
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return False
+
+        grouped = defaultdict(list)
+        for key, increments in rows.items():
+            grouped[tuple(sorted(increments))].append({**dict(zip(key_columns, key)), **increments})
+
+        for columns, params in grouped.items():
+            stmt = insert(table)
+            if dialect == 'mysql':
+                values = {column: table.c[column] + stmt.inserted[column] for column in columns}
+            else:
+                values = {column: table.c[column] + stmt.excluded[column] for column in columns}
+            # Las columnas onupdate no se aplican en la rama de conflicto
+            if 'updated_at' in table.c:
+                values['updated_at'] = datetime.utcnow()
+            if dialect == 'mysql':
+                stmt = stmt.on_duplicate_key_update(values)
+            else:
+                stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=values)
+            connection.execute(stmt, params)
+        return True
+
+    @staticmethod
+    def _bump_many(connection, table, key_columns, rows: Dict) -> None:
+        """
+        Increment many rollup rows with a constant number of statements:
+        one SELECT for the existing keys, then an executemany UPDATE and an
+        executemany INSERT per set of incremented columns
+
+        Fallback for dialects without an upsert; concurrent inserts of the
+        same new row raise IntegrityError there.
+        """
+        rows = {
+            key: {col: value for col, value in increments.items() if value}
+            for key, increments in rows.items()
+        }
+        rows = {key: increments for key, increments in rows.items() if increments}
+        if not rows:
+            return
+
+        key_cols = [table.c[column] for column in key_columns]
+        if len(key_cols) == 1:
+            condition = key_cols[0].in_([key[0] for key in rows])
+        else:
+            condition = tuple_(*key_cols).in_(list(rows))
+        existing = {tuple(row) for row in connection.execute(select(*key_cols).where(condition))}
+
+        updates = defaultdict(list)
+        inserts = defaultdict(list)
+        for key, increments in rows.items():
+            columns = tuple(sorted(increments))
+            if key in existing:
+                params = {f'k_{column}': value for column, value in zip(key_columns, key)}
+                params.update({f'i_{column}': increments[column] for column in columns})
+                updates[columns].append(params)
+            else:
+                inserts[columns].append({**dict(zip(key_columns, key)), **increments})
+
+        for columns, params in updates.items():
+            stmt = table.update()
+            for column in key_columns:
+                stmt = stmt.where(table.c[column] == bindparam(f'k_{column}'))
+            stmt = stmt.values({column: table.c[column] + bindparam(f'i_{column}') for column in columns})
+            connection.execute(stmt, params)
+
+        for columns, params in inserts.items():
+            connection.execute(table.insert(), params)
+
+    @staticmethod
+    def apply_deltas(connection, deltas: Dict) -> None:
+        """
+        Write rollup deltas using the given connection
+
+        Args:
+            connection: Connection bound to the current transaction
+            deltas: Deltas produced by collect_changes or record_order_items
+        """
+        targets = [
+            ('daily', SalesRollupDaily.__table__, ('bucket_date',)),
+            ('hourly', SalesRollupHourly.__table__, ('bucket_start',)),
+            ('product_daily', ProductSalesRollup.__table__, ('bucket_date', 'product_id')),
+            ('product_total', ProductSalesTotal.__table__, ('product_id',)),
+            ('status', OrderStatusRollup.__table__, ('status',)),
+            ('counters', AnalyticsCounter.__table__, ('name',))
+        ]
+
+        for name, table, key_columns in targets:
+            rows = {
+                key: {col: value for col, value in increments.items() if value}
+                for key, increments in deltas[name].items()
+            }
+            rows = {key: increments for key, increments in rows.items() if increments}
+            if not rows:
+                continue
+            if not AnalyticsRollupService._upsert(connection, table, key_columns, rows):
+                AnalyticsRollupService._bump_many(connection, table, key_columns, rows)
+
+    @staticmethod
+    def record_order_items(connection, rows) -> None:
+        """
+        Update the rollups for order items inserted without the ORM unit of
+        work (bulk INSERT statements are not seen by the flush hook)
+
+        Args:
+            connection: Connection bound to the current transaction
+            rows: Inserted order_items rows as dicts
+        """
+        deltas = AnalyticsRollupService._new_deltas()
+        now = datetime.utcnow()
+        for row in rows:
+            AnalyticsRollupService._add_item(
+                deltas,
+                row.get('created_at') or now,
+                row['product_id'],
+                row['quantity'],
+                row['total_price']
+            )
+        AnalyticsRollupService.apply_deltas(connection, deltas)
+
+    @staticmethod
+    def on_after_flush(session, flush_context) -> None:
+        """SQLAlchemy after_flush hook that keeps the rollups in sync"""
+        deltas = AnalyticsRollupService.collect_changes(session)
+        AnalyticsRollupService.apply_deltas(session.connection(), deltas)
+
+    @staticmethod
+    def get_dashboard_summary(days: int = 30) -> Dict:
+        """
+        Build the admin analytics payload from the rollup tables
+
+        Args:
+            days: Size of the "recent" window in days
+
+        Returns:
+            Dict with the same shape expected by admin_dashboard.js
+        """
+        today = datetime.utcnow().date()
+        since = today - timedelta(days=days - 1)
+
+        counters = dict(db.session.query(AnalyticsCounter.name, AnalyticsCounter.value).all())
+
+        window = db.session.query(
+            func.coalesce(func.sum(SalesRollupDaily.orders_count), 0),
+            func.coalesce(func.sum(SalesRollupDaily.revenue), 0),
+            func.coalesce(func.sum(SalesRollupDaily.new_customers), 0)
+        ).filter(SalesRollupDaily.bucket_date >= since).one()
+
+        top_products = db.session.query(
+            Product.name, ProductSalesTotal.units_sold
+        ).join(Product, Product.id == ProductSalesTotal.product_id).filter(
+            ProductSalesTotal.units_sold > 0
+        ).order_by(ProductSalesTotal.units_sold.desc()).limit(5).all()
+
+        orders_by_status = {bucket: 0 for bucket in sorted(set(AnalyticsRollupService.STATUS_BUCKETS.values()))}
+        for status, count in db.session.query(OrderStatusRollup.status, OrderStatusRollup.orders_count).all():
+            bucket = AnalyticsRollupService.STATUS_BUCKETS.get(status)
+            if bucket:
+                orders_by_status[bucket] += int(count or 0)
+
+        hour_start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+        hourly = SalesRollupHourly.query.filter(
+            SalesRollupHourly.bucket_start >= hour_start
+        ).order_by(SalesRollupHourly.bucket_start).all()
+
+        return {
+            'total_orders': int(counters.get('orders', 0)),
+            'orders_change': int(window[0]),
+            'total_revenue': float(counters.get('revenue', 0)),
+            'revenue_change': float(window[1]),
+            'total_customers': int(counters.get('customers', 0)),
+            'customers_change': int(window[2]),
+            'top_products': [{'name': name, 'quantity': int(units)} for name, units in top_products],
+            'orders_by_status': orders_by_status,
+            'hourly_sales': [h.to_dict() for h in hourly]
+        }
+
+    @staticmethod
+    def rebuild() -> bool:
+        """
+        Recompute every rollup table from the base tables (backfill)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        service = AnalyticsRollupService
+        try:
+            deltas = service._new_deltas()
+
+            orders = db.session.query(
+                Order.created_at, Order.status, Order.total_amount
+            ).yield_per(1000)
+            for created_at, status, total_amount in orders:
+                service._add_order(deltas, created_at or datetime.utcnow(), status, total_amount)
+
+            items = db.session.query(
+                OrderItem.created_at, OrderItem.product_id, OrderItem.quantity, OrderItem.total_price
+            ).yield_per(1000)
+            for created_at, product_id, quantity, total_price in items:
+                service._add_item(deltas, created_at or datetime.utcnow(), product_id, quantity, total_price)
+
+            customers = db.session.query(User.created_at).filter(User.role == 'cliente').yield_per(1000)
+            for (created_at,) in customers:
+                service._add_customer(deltas, created_at or datetime.utcnow())
+
+            for model in (SalesRollupDaily, SalesRollupHourly, ProductSalesRollup,
+                          ProductSalesTotal, OrderStatusRollup, AnalyticsCounter):
+                db.session.query(model).delete(synchronize_session=False)
+
+            service.apply_deltas(db.session.connection(), deltas)
+            db.session.commit()
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding analytics rollups: {str(e)}")
+            return False
+
+
+# active_history: cargar el estado y el total anteriores aunque la instancia esté
+# expirada, para que collect_changes descuente el valor viejo de los rollups
+for _attribute in (Order.status, Order.total_amount):
+    event.listen(_attribute, 'set', lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+event.listen(db.session, 'after_flush', AnalyticsRollupService.on_after_flush)
+
+
+# Singleton instance
+analytics_service = AnalyticsRollupService()
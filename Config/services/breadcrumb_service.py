@@ -0,0 +1,394 @@
+"""
+Breadcrumb Service
+Compact storage of delivery GPS trails, with Douglas-Peucker simplification for map display
+"""
+
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, or_
+from Config.db import db
+from Config.models.order_tracking import DeliveryBreadcrumbSegment, OrderStatusHistory
+
+# (unix seconds, latitude * 1e5, longitude * 1e5)
+Point = Tuple[int, int, int]
+
+
+class BreadcrumbService:
+    """
+    Service for recording and reading the GPS trail of deliveries
+
+    Location pings are not status changes, so they are kept out of
+    order_status_history. Each order's trail is stored as segments of up to
+    SEGMENT_POINTS points: the first and last point are plain columns and
+    the rest are packed as zigzag varint deltas (seconds, lat, lng at 1e-5
+    degrees, ~1 m). A point usually takes 3-6 bytes instead of a full
+    history row. Pings that moved less than MIN_MOVE_METERS from the
+    previous point are dropped unless HEARTBEAT_SECONDS have passed.
+
+    Reads decode the segments and simplify the trail with Douglas-Peucker,
+    using a tolerance derived from the map zoom level, and never return more
+    than MAX_POINTS points.
+    """
+
+    SEGMENT_POINTS = int(os.getenv('BREADCRUMB_SEGMENT_POINTS', 256))
+    MIN_MOVE_METERS = float(os.getenv('BREADCRUMB_MIN_MOVE_METERS', 10))
+    HEARTBEAT_SECONDS = int(os.getenv('BREADCRUMB_HEARTBEAT_SECONDS', 300))
+    MAX_POINTS = int(os.getenv('BREADCRUMB_MAX_POINTS', 500))
+    DEFAULT_TOLERANCE_METERS = float(os.getenv('BREADCRUMB_TOLERANCE_METERS', 5))
+    PIXEL_TOLERANCE = 1.5  # pixels of error allowed at the requested zoom
+
+    # Nota de las filas de historial que la ingesta escribía por cada ping
+    PING_NOTE = 'Ubicación actualizada'
+
+    SCALE = 100000
+    EPOCH = datetime(1970, 1, 1)
+    METERS_PER_DEGREE = 111320.0
+    WEB_MERCATOR_METERS_PER_PIXEL = 156543.03392  # at zoom 0 on the equator
+
+    # ----- encoding -----
+
+    @staticmethod
+    def _to_seconds(moment: datetime) -> int:
+        return int(round((moment - BreadcrumbService.EPOCH).total_seconds()))
+
+    @staticmethod
+    def _to_datetime(seconds: int) -> datetime:
+        return BreadcrumbService.EPOCH + timedelta(seconds=seconds)
+
+    @staticmethod
+    def _write_varint(out: bytearray, value: int) -> None:
+        value = (value << 1) ^ (value >> 63)  # zigzag: small negatives stay small
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def _read_varints(data: bytes) -> List[int]:
+        values = []
+        value = shift = 0
+        for byte in data:
+            value |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+                continue
+            values.append((value >> 1) ^ -(value & 1))
+            value = shift = 0
+        return values
+
+    @staticmethod
+    def _segment_points(segment: DeliveryBreadcrumbSegment) -> List[Point]:
+        point = (
+            BreadcrumbService._to_seconds(segment.started_at),
+            segment.start_latitude_e5,
+            segment.start_longitude_e5
+        )
+        points = [point]
+        values = BreadcrumbService._read_varints(segment.deltas or b'')
+        for i in range(0, len(values) - 2, 3):
+            point = (point[0] + values[i], point[1] + values[i + 1], point[2] + values[i + 2])
+            points.append(point)
+        return points
+
+    @staticmethod
+    def _segment_row(order_id: int, seq: int, point: Point) -> Dict:
+        moment = BreadcrumbService._to_datetime(point[0])
+        return {
+            'order_id': order_id,
+            'seq': seq,
+            'point_count': 1,
+            'started_at': moment,
+            'start_latitude_e5': point[1],
+            'start_longitude_e5': point[2],
+            'ended_at': moment,
+            'end_latitude_e5': point[1],
+            'end_longitude_e5': point[2],
+            'deltas': b''
+        }
+
+    @staticmethod
+    def _new_segment(order_id: int, seq: int, point: Point) -> DeliveryBreadcrumbSegment:
+        return DeliveryBreadcrumbSegment(**BreadcrumbService._segment_row(order_id, seq, point))
+
+    @staticmethod
+    def _append_point(segment: DeliveryBreadcrumbSegment, point: Point) -> None:
+        out = bytearray(segment.deltas or b'')
+        BreadcrumbService._write_varint(out, point[0] - BreadcrumbService._to_seconds(segment.ended_at))
+        BreadcrumbService._write_varint(out, point[1] - segment.end_latitude_e5)
+        BreadcrumbService._write_varint(out, point[2] - segment.end_longitude_e5)
+        segment.deltas = bytes(out)
+        segment.point_count += 1
+        segment.ended_at = BreadcrumbService._to_datetime(point[0])
+        segment.end_latitude_e5 = point[1]
+        segment.end_longitude_e5 = point[2]
+
+    @staticmethod
+    def _point(latitude: float, longitude: float, recorded_at: datetime) -> Point:
+        return (
+            BreadcrumbService._to_seconds(recorded_at),
+            int(round(latitude * BreadcrumbService.SCALE)),
+            int(round(longitude * BreadcrumbService.SCALE))
+        )
+
+    @staticmethod
+    def _distance_m(a: Point, b: Point) -> float:
+        """Equirectangular distance in meters (accurate at breadcrumb scale)"""
+        scale = BreadcrumbService.METERS_PER_DEGREE / BreadcrumbService.SCALE
+        mean_lat = math.radians((a[1] + b[1]) / 2 / BreadcrumbService.SCALE)
+        dx = (b[2] - a[2]) * scale * math.cos(mean_lat)
+        dy = (b[1] - a[1]) * scale
+        return math.hypot(dx, dy)
+
+    # ----- writes -----
+
+    @staticmethod
+    def record_pings(pings: List[Dict]) -> int:
+        """
+        Append one ping per order to the open segments (not committed)
+
+        Loads the open segment of every order with one query, and writes the
+        segments started by this batch with one multi-row INSERT. Meant for
+        the location ingest batches, which coalesce pings per order (only the
+        latest ping of each order is kept).
+
+        Args:
+            pings: Dicts with 'order_id', 'latitude', 'longitude', 'received_at'
+
+        Returns:
+            Number of points stored (pings dropped as jitter are not counted)
+        """
+        if not pings:
+            return 0
+
+        latest = {}
+        for ping in pings:
+            current = latest.get(ping['order_id'])
+            if current is None or ping['received_at'] >= current['received_at']:
+                latest[ping['order_id']] = ping
+        order_ids = sorted(latest)
+        last_segments = {}
+        segments = DeliveryBreadcrumbSegment.query.filter(
+            DeliveryBreadcrumbSegment.order_id.in_(order_ids),
+            DeliveryBreadcrumbSegment.point_count < BreadcrumbService.SEGMENT_POINTS
+        ).order_by(DeliveryBreadcrumbSegment.order_id).with_for_update().all()
+        for segment in segments:
+            current = last_segments.get(segment.order_id)
+            if current is None or segment.seq > current.seq:
+                last_segments[segment.order_id] = segment
+
+        # Pedidos cuyo último tramo está lleno: el siguiente seq sale de su máximo
+        missing = [order_id for order_id in order_ids if order_id not in last_segments]
+        next_seq = {}
+        if missing:
+            next_seq = dict(db.session.query(
+                DeliveryBreadcrumbSegment.order_id, db.func.max(DeliveryBreadcrumbSegment.seq) + 1
+            ).filter(DeliveryBreadcrumbSegment.order_id.in_(missing)).group_by(
+                DeliveryBreadcrumbSegment.order_id
+            ).all())
+
+        new_rows = []
+        for order_id in order_ids:
+            ping = latest[order_id]
+            point = BreadcrumbService._point(ping['latitude'], ping['longitude'], ping['received_at'])
+            segment = last_segments.get(order_id)
+
+            if segment is None:
+                new_rows.append(BreadcrumbService._segment_row(order_id, next_seq.get(order_id, 0), point))
+                continue
+
+            last = (BreadcrumbService._to_seconds(segment.ended_at), segment.end_latitude_e5, segment.end_longitude_e5)
+            if (BreadcrumbService._distance_m(last, point) < BreadcrumbService.MIN_MOVE_METERS
+                    and point[0] - last[0] < BreadcrumbService.HEARTBEAT_SECONDS):
+                continue
+            BreadcrumbService._append_point(segment, point)
+            new_rows.append(None)
+
+        stored = len(new_rows)
+        new_rows = [row for row in new_rows if row is not None]
+        if new_rows:
+            db.session.execute(insert(DeliveryBreadcrumbSegment), new_rows)
+        return stored
+
+    @staticmethod
+    def _rewrite(order_id: int, segments: List[DeliveryBreadcrumbSegment], points: List[Point]) -> None:
+        """Replace the loaded segments of an order with the given points (not committed)"""
+        for segment in segments:
+            db.session.delete(segment)
+        db.session.flush()  # Liberar (order_id, seq) antes de insertar los nuevos tramos
+        segment = None
+        for point in sorted(points):
+            if segment is None or segment.point_count >= BreadcrumbService.SEGMENT_POINTS:
+                seq = segment.seq + 1 if segment is not None else 0
+                segment = BreadcrumbService._new_segment(order_id, seq, point)
+                db.session.add(segment)
+            else:
+                BreadcrumbService._append_point(segment, point)
+
+    @staticmethod
+    def compact_legacy_history(limit_orders: int = 100) -> Dict:
+        """
+        Move per-ping rows of order_status_history into breadcrumb segments
+
+        Processes up to limit_orders orders per call and commits once.
+
+        Returns:
+            Dict with 'orders', 'rows_removed' and 'points_stored'
+        """
+        try:
+            order_ids = [row[0] for row in db.session.query(OrderStatusHistory.order_id).filter(
+                OrderStatusHistory.notes == BreadcrumbService.PING_NOTE
+            ).distinct().order_by(OrderStatusHistory.order_id).limit(limit_orders).all()]
+
+            rows_removed = 0
+            points_stored = 0
+            for order_id in order_ids:
+                rows = db.session.query(
+                    OrderStatusHistory.id, OrderStatusHistory.latitude,
+                    OrderStatusHistory.longitude, OrderStatusHistory.created_at
+                ).filter(
+                    OrderStatusHistory.order_id == order_id,
+                    OrderStatusHistory.notes == BreadcrumbService.PING_NOTE
+                ).all()
+
+                segments = DeliveryBreadcrumbSegment.query.filter_by(order_id=order_id).with_for_update().all()
+                points = []
+                for segment in segments:
+                    points.extend(BreadcrumbService._segment_points(segment))
+                points.extend(
+                    BreadcrumbService._point(row.latitude, row.longitude, row.created_at)
+                    for row in rows
+                    if row.latitude is not None and row.longitude is not None and row.created_at is not None
+                )
+                BreadcrumbService._rewrite(order_id, segments, points)
+
+                OrderStatusHistory.query.filter(
+                    OrderStatusHistory.id.in_([row.id for row in rows])
+                ).delete(synchronize_session=False)
+                rows_removed += len(rows)
+                points_stored += len(points)
+
+            db.session.commit()
+            return {'orders': len(order_ids), 'rows_removed': rows_removed, 'points_stored': points_stored}
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error compacting location history: {str(e)}")
+            return {'orders': 0, 'rows_removed': 0, 'points_stored': 0}
+
+    # ----- reads -----
+
+    @staticmethod
+    def simplify(points: List[Point], tolerance_m: float) -> List[Point]:
+        """
+        Douglas-Peucker simplification of a trail
+
+        Keeps the first and last point and every point farther than
+        tolerance_m from the chord that would replace it.
+        """
+        if len(points) < 3 or tolerance_m <= 0:
+            return list(points)
+
+        # Proyección local en metros alrededor del primer punto
+        scale = BreadcrumbService.METERS_PER_DEGREE / BreadcrumbService.SCALE
+        cos_lat = math.cos(math.radians(points[0][1] / BreadcrumbService.SCALE))
+        xs = [(p[2] - points[0][2]) * scale * cos_lat for p in points]
+        ys = [(p[1] - points[0][1]) * scale for p in points]
+
+        keep = [False] * len(points)
+        keep[0] = keep[-1] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            first, last = stack.pop()
+            dx, dy = xs[last] - xs[first], ys[last] - ys[first]
+            length = math.hypot(dx, dy)
+            max_distance, index = 0.0, None
+            for i in range(first + 1, last):
+                if length:
+                    distance = abs(dy * (xs[i] - xs[first]) - dx * (ys[i] - ys[first])) / length
+                else:
+                    distance = math.hypot(xs[i] - xs[first], ys[i] - ys[first])
+                if distance > max_distance:
+                    max_distance, index = distance, i
+            if index is not None and max_distance > tolerance_m:
+                keep[index] = True
+                stack.append((first, index))
+                stack.append((index, last))
+
+        return [point for point, kept in zip(points, keep) if kept]
+
+    @staticmethod
+    def tolerance_for_zoom(zoom: float, latitude: float) -> float:
+        """Meters covered by PIXEL_TOLERANCE pixels at a Web Mercator zoom level"""
+        zoom = max(0.0, min(22.0, float(zoom)))
+        meters_per_pixel = (BreadcrumbService.WEB_MERCATOR_METERS_PER_PIXEL
+                            * math.cos(math.radians(latitude)) / (2 ** zoom))
+        return meters_per_pixel * BreadcrumbService.PIXEL_TOLERANCE
+
+    @staticmethod
+    def get_points(order_id: int) -> List[Point]:
+        """Full decoded trail of an order, oldest first"""
+        segments = DeliveryBreadcrumbSegment.query.filter_by(
+            order_id=order_id
+        ).order_by(DeliveryBreadcrumbSegment.seq).all()
+        points = []
+        for segment in segments:
+            points.extend(BreadcrumbService._segment_points(segment))
+        return points
+
+    @staticmethod
+    def get_path(order_id: int, zoom: Optional[float] = None,
+                 max_points: Optional[int] = None) -> Dict:
+        """
+        Simplified trail of an order for map display
+
+        Args:
+            order_id: Order ID
+            zoom: Map zoom level; sets the simplification tolerance
+            max_points: Upper bound of points returned (capped at MAX_POINTS)
+
+        Returns:
+            Dict with 'points' ([latitude, longitude, unix seconds] lists),
+            'total_points', 'tolerance_m' and 'started_at'/'ended_at'
+        """
+        max_points = min(max_points or BreadcrumbService.MAX_POINTS, BreadcrumbService.MAX_POINTS)
+        max_points = max(2, max_points)
+        points = BreadcrumbService.get_points(order_id)
+
+        tolerance = BreadcrumbService.DEFAULT_TOLERANCE_METERS
+        if zoom is not None and points:
+            tolerance = BreadcrumbService.tolerance_for_zoom(zoom, points[0][1] / BreadcrumbService.SCALE)
+
+        simplified = BreadcrumbService.simplify(points, tolerance)
+        # Si aún excede el límite, se duplica la tolerancia hasta que quepa
+        attempts = 0
+        while len(simplified) > max_points and attempts < 12:
+            tolerance *= 2
+            simplified = BreadcrumbService.simplify(points, tolerance)
+            attempts += 1
+        if len(simplified) > max_points:
+            step = (len(simplified) - 1) / (max_points - 1)
+            simplified = [simplified[int(round(i * step))] for i in range(max_points)]
+
+        return {
+            'points': [
+                [point[1] / BreadcrumbService.SCALE, point[2] / BreadcrumbService.SCALE, point[0]]
+                for point in simplified
+            ],
+            'total_points': len(points),
+            'tolerance_m': round(tolerance, 2),
+            'started_at': BreadcrumbService._to_datetime(points[0][0]).isoformat() if points else None,
+            'ended_at': BreadcrumbService._to_datetime(points[-1][0]).isoformat() if points else None
+        }
+
+    @staticmethod
+    def status_history_query(order_id: int):
+        """order_status_history of an order without the legacy per-ping rows"""
+        return OrderStatusHistory.query.filter(
+            OrderStatusHistory.order_id == order_id,
+            or_(OrderStatusHistory.notes.is_(None), OrderStatusHistory.notes != BreadcrumbService.PING_NOTE)
+        )
+
+
+# Singleton instance
+breadcrumb_service = BreadcrumbService()
@@ -0,0 +1,104 @@
+"""
+In-process cache
+Thread-safe LRU cache with per-entry TTL, shared by the read-model services
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire after a time-to-live
+
+    Each worker process has its own instance, so the TTL bounds how long
+    another process may keep serving data that was invalidated elsewhere.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        Args:
+            maxsize: Maximum number of entries before evicting the least recently used
+            ttl: Seconds an entry stays valid (None or 0 disables expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value (marking it as recently used) or default"""
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if self._expired(expires_at):
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value or compute it with loader and cache it"""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Counters for monitoring the hit ratio"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,213 @@
+"""
+Catalog Service
+Cached read model for the public and client product catalog
+"""
+
+from typing import Dict, List, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+from Config.db import db
+from Config.models.product import Product
+from Config.models.category import Category
+from Config.services.cache import TTLCache
+
+
+class CatalogService:
+    """
+    Service for serving catalog pages from an in-process cache
+
+    Two caches are kept: page entries (ordered product IDs plus pagination,
+    keyed by page/filters) and product projections (keyed by product ID).
+    Stock or price changes only evict the affected projections; changes that
+    alter which products appear on a page (new/deleted products, active flag,
+    category) evict the page entries as well.
+    """
+
+    DEFAULT_PER_PAGE = 12
+    MAX_PER_PAGE = 100
+
+    # Product columns that change the membership or order of catalog pages
+    STRUCTURAL_FIELDS = ('active', 'created_at', 'category_id')
+
+    _pages = TTLCache(maxsize=512, ttl=300)
+    _products = TTLCache(maxsize=5000, ttl=300)
+
+    @staticmethod
+    def project(product: Product) -> Dict:
+        """Denormalized catalog projection of a product"""
+        data = product.to_dict()
+        data['in_stock'] = (product.stock_quantity or 0) > 0
+        return data
+
+    @staticmethod
+    def _load_page(page: int, per_page: int, category_id: Optional[int]) -> Dict:
+        query = Product.query.options(joinedload(Product.category)).filter(Product.active == True)
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+        pagination = query.order_by(Product.created_at.desc(), Product.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        # Fill the product cache with the rows already loaded for this page
+        for product in pagination.items:
+            CatalogService._products.set(product.id, CatalogService.project(product))
+
+        return {
+            'ids': [product.id for product in pagination.items],
+            'pagination': {
+                'page': pagination.page,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        }
+
+    @staticmethod
+    def get_products(ids: List[int]) -> List[Dict]:
+        """
+        Get product projections, loading only the ones missing from the cache
+
+        Args:
+            ids: Product IDs in the desired order
+
+        Returns:
+            List of projections (products that no longer exist are skipped)
+        """
+        found = {}
+        missing = []
+        for product_id in ids:
+            data = CatalogService._products.get(product_id)
+            if data is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = data
+
+        if missing:
+            products = Product.query.options(joinedload(Product.category)).filter(
+                Product.id.in_(missing)
+            ).all()
+            for product in products:
+                data = CatalogService.project(product)
+                CatalogService._products.set(product.id, data)
+                found[product.id] = data
+
+        return [found[product_id] for product_id in ids if product_id in found]
+
+    @staticmethod
+    def get_page(page: int = 1, per_page: int = DEFAULT_PER_PAGE,
+                 category_id: Optional[int] = None) -> Dict:
+        """
+        Get one catalog page of active products, newest first
+
+        On a cache hit no database query is executed.
+
+        Args:
+            page: Page number (1-based)
+            per_page: Page size (capped at MAX_PER_PAGE)
+            category_id: Optional category filter
+
+        Returns:
+            Dict with 'products' and 'pagination'
+        """
+        page = max(1, page)
+        per_page = max(1, min(per_page, CatalogService.MAX_PER_PAGE))
+        key = (page, per_page, category_id)
+
+        entry = CatalogService._pages.get(key)
+        if entry is None:
+            entry = CatalogService._load_page(page, per_page, category_id)
+            CatalogService._pages.set(key, entry)
+
+        return {
+            'products': CatalogService.get_products(entry['ids']),
+            'pagination': dict(entry['pagination'])
+        }
+
+    @staticmethod
+    def invalidate(product_ids: Optional[List[int]] = None, pages: bool = True) -> None:
+        """
+        Evict cached catalog data
+
+        Call this after changes that bypass the ORM (bulk UPDATE statements).
+
+        Args:
+            product_ids: Products whose projection changed (None evicts all)
+            pages: Whether page entries must be evicted too
+        """
+        if product_ids is None:
+            CatalogService._products.clear()
+        else:
+            CatalogService._products.delete_many(product_ids)
+        if pages:
+            CatalogService._pages.clear()
+
+    @staticmethod
+    def invalidate_on_commit(product_ids: List[int], pages: bool = False) -> None:
+        """
+        Evict product projections when the current transaction commits
+
+        For changes made with UPDATE statements, which the flush hooks do not see.
+        """
+        pending = db.session.info.setdefault('catalog_invalidations', {'ids': set(), 'pages': False, 'all': False})
+        pending['ids'].update(product_ids)
+        pending['pages'] = pending['pages'] or pages
+
+    @staticmethod
+    def stats() -> Dict:
+        return {
+            'pages': CatalogService._pages.stats(),
+            'products': CatalogService._products.stats()
+        }
+
+    @staticmethod
+    def on_after_flush(session, flush_context) -> None:
+        """Record which catalog entries the flushed changes invalidate"""
+        pending = session.info.setdefault('catalog_invalidations', {'ids': set(), 'pages': False, 'all': False})
+
+        for obj in session.new:
+            if isinstance(obj, Product):
+                pending['pages'] = True
+
+        for obj in session.deleted:
+            if isinstance(obj, Product):
+                pending['ids'].add(obj.id)
+                pending['pages'] = True
+            elif isinstance(obj, Category):
+                pending['all'] = True
+
+        for obj in session.dirty:
+            if isinstance(obj, Product):
+                state = inspect(obj)
+                if not any(attr.history.has_changes() for attr in state.attrs):
+                    continue
+                pending['ids'].add(obj.id)
+                if any(state.attrs[field].history.has_changes() for field in CatalogService.STRUCTURAL_FIELDS):
+                    pending['pages'] = True
+            elif isinstance(obj, Category):
+                pending['all'] = True
+
+    @staticmethod
+    def on_after_commit(session) -> None:
+        """Apply the recorded invalidations once the data is committed"""
+        pending = session.info.pop('catalog_invalidations', None)
+        if not pending:
+            return
+        if pending['all']:
+            CatalogService.invalidate()
+        elif pending['ids'] or pending['pages']:
+            CatalogService.invalidate(list(pending['ids']), pages=pending['pages'])
+
+    @staticmethod
+    def on_after_rollback(session) -> None:
+        session.info.pop('catalog_invalidations', None)
+
+
+event.listen(db.session, 'after_flush', CatalogService.on_after_flush)
+event.listen(db.session, 'after_commit', CatalogService.on_after_commit)
+event.listen(db.session, 'after_rollback', CatalogService.on_after_rollback)
+
+
+# Singleton instance
+catalog_service = CatalogService()
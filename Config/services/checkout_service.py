@@ -0,0 +1,247 @@
+"""
+Checkout Service
+Creates orders from carts with a fixed number of statements per checkout
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from Config.db import db
+from Config.models.order import Order
+from Config.models.order_item import OrderItem
+from Config.models.address import Address
+from Config.models.product import Product
+from Config.models.cart import Cart, CartItem
+from Config.services.analytics_service import analytics_service
+from Config.services.inventory_service import inventory_service
+
+
+class CheckoutError(ValueError):
+    """Business error that prevents the checkout (empty cart, missing stock)"""
+
+
+class OrderNumberGenerator:
+    """
+    Time-ordered order numbers generated without querying the database
+
+    Format: ORD + YYYYMMDD + 9 base36 characters (20 characters, the column
+    size). The suffix packs the millisecond of the day, a node ID and a
+    per-millisecond sequence (snowflake style), so numbers never collide
+    between processes as long as each one has a distinct node ID.
+
+    Set ORDER_NODE_ID (0-1023) per worker/container to guarantee distinct
+    IDs; otherwise a random one is drawn, since process IDs repeat across
+    containers. Two processes may then share a node ID, so the checkout
+    retries with a new number when the insert hits the unique index.
+    """
+
+    ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    NODE_BITS = 10
+    SEQUENCE_BITS = 10
+
+    def __init__(self, node_id: Optional[int] = None):
+        if node_id is None:
+            node_id = os.getenv('ORDER_NODE_ID')
+            node_id = int(node_id) if node_id else random.SystemRandom().randrange(1 << self.NODE_BITS)
+        self.node_id = node_id % (1 << self.NODE_BITS)
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _encode(self, value: int, width: int) -> str:
+        chars = []
+        for _ in range(width):
+            value, remainder = divmod(value, 36)
+            chars.append(self.ALPHABET[remainder])
+        return ''.join(reversed(chars))
+
+    def next(self) -> str:
+        with self._lock:
+            while True:
+                now_ms = time.time_ns() // 1_000_000
+                if now_ms > self._last_ms:
+                    self._last_ms = now_ms
+                    self._sequence = 0
+                    break
+                if now_ms == self._last_ms and self._sequence < (1 << self.SEQUENCE_BITS) - 1:
+                    self._sequence += 1
+                    break
+                # Sequence exhausted (or clock moved back): wait for the next millisecond
+                time.sleep(0.0005)
+
+            moment = datetime.utcfromtimestamp(now_ms / 1000)
+            ms_of_day = now_ms % 86_400_000
+            value = (((ms_of_day << self.NODE_BITS) | self.node_id) << self.SEQUENCE_BITS) | self._sequence
+            return f"ORD{moment.strftime('%Y%m%d')}{self._encode(value, 9)}"
+
+
+class CheckoutService:
+    """
+    Service for turning a user's cart into an order
+
+    The number of statements does not depend on the cart size: one query
+    loads the cart lines with their products, the order items are written
+    with a single multi-row INSERT, the cart is emptied with one DELETE and
+    the response is built from the values already in memory.
+    """
+
+    SHIPPING_COST = 15000
+    FREE_SHIPPING_FROM = 200000
+    TAX_RATE = 0.19  # IVA 19%
+    ORDER_NUMBER_ATTEMPTS = 3
+
+    order_numbers = OrderNumberGenerator()
+
+    @staticmethod
+    def _shipping_address(user_id: int) -> Optional[str]:
+        """Default address of the user, or the first one registered"""
+        address = Address.query.filter_by(user_id=user_id).order_by(
+            Address.is_default.desc(), Address.created_at
+        ).first()
+        return address.get_full_address() if address else None
+
+    @staticmethod
+    def create_order(user, payment_method: str = 'Tarjeta de crédito', notes: str = '') -> Dict:
+        """
+        Create an order from the user's cart and commit it
+
+        Args:
+            user: User checking out
+            payment_method: Payment method label
+            notes: Customer notes
+
+        Returns:
+            Dict representation of the created order
+
+        Raises:
+            CheckoutError: If the cart is empty or a product lacks stock
+        """
+        # Leer los datos del usuario antes del commit (que expira las instancias cargadas)
+        user_id, user_name, user_email = user.id, user.name, user.email
+
+        lines = db.session.query(CartItem, Product).join(
+            Cart, Cart.id == CartItem.cart_id
+        ).join(
+            Product, Product.id == CartItem.product_id
+        ).filter(Cart.user_id == user_id).order_by(CartItem.id).all()
+
+        if not lines:
+            raise CheckoutError('El carrito está vacío')
+
+        cart_id = lines[0][0].cart_id
+        now = datetime.utcnow()
+
+        quantities = {}
+        for cart_item, product in lines:
+            quantities[product.id] = quantities.get(product.id, 0) + cart_item.quantity
+
+        # El stock reservado pasa a la orden (las reservas vencidas se vuelven a tomar)
+        failed_product_id = inventory_service.consume_cart(cart_id, quantities)
+        if failed_product_id is not None:
+            name = next(product.name for _, product in lines if product.id == failed_product_id)
+            raise CheckoutError(f'Stock insuficiente para {name}')
+
+        subtotal = 0.0
+        item_rows = []
+        items_data = []
+        for cart_item, product in lines:
+            unit_price = float(cart_item.unit_price) if cart_item.unit_price is not None else float(product.price)
+            line_total = unit_price * cart_item.quantity
+            subtotal += line_total
+            item_rows.append({
+                'product_id': product.id,
+                'quantity': cart_item.quantity,
+                'unit_price': unit_price,
+                'total_price': line_total,
+                'created_at': now
+            })
+            items_data.append({
+                'id': None,
+                'product_id': product.id,
+                'product_name': product.name,
+                'product_image': getattr(product, 'image', None),
+                'quantity': cart_item.quantity,
+                'price': unit_price,
+                'unit_price': unit_price,
+                'unit_price_cop': int(round(unit_price)),
+                'total_price': line_total,
+                'total_price_cop': int(round(line_total)),
+                'created_at': now.isoformat()
+            })
+
+        shipping = CheckoutService.SHIPPING_COST if subtotal < CheckoutService.FREE_SHIPPING_FROM else 0
+        tax = int(subtotal * CheckoutService.TAX_RATE)
+        total = subtotal + shipping + tax
+        shipping_address = CheckoutService._shipping_address(user_id)
+
+        order = Order(
+            user_id=user_id,
+            status='pending',
+            total_amount=float(total),
+            subtotal=float(subtotal),
+            shipping_cost=float(shipping),
+            tax_amount=float(tax),
+            shipping_address=shipping_address,
+            payment_method=payment_method,
+            notes=notes or '',
+            created_at=now,
+            updated_at=now
+        )
+        # Si otro proceso generó el mismo número (mismo node ID), se reintenta con uno nuevo
+        for attempt in range(CheckoutService.ORDER_NUMBER_ATTEMPTS):
+            order_number = CheckoutService.order_numbers.next()
+            order.order_number = order_number
+            try:
+                with db.session.begin_nested():
+                    db.session.add(order)
+                    db.session.flush()  # Para obtener el ID de la orden
+                break
+            except IntegrityError:
+                if attempt == CheckoutService.ORDER_NUMBER_ATTEMPTS - 1:
+                    raise
+        order_id = order.id
+
+        for row, item in zip(item_rows, items_data):
+            row['order_id'] = order_id
+            item['order_id'] = order_id
+
+        # Un solo INSERT multi-fila; el hook de flush no lo ve, así que los rollups se actualizan aquí
+        db.session.execute(insert(OrderItem), item_rows)
+        analytics_service.record_order_items(db.session.connection(), item_rows)
+
+        CartItem.query.filter(CartItem.cart_id == cart_id).delete(synchronize_session=False)
+        db.session.commit()
+
+        return {
+            'id': order_id,
+            'user_id': user_id,
+            'order_number': order_number,
+            'status': 'pending',
+            'status_display': 'Pendiente',
+            'total_amount': float(total),
+            'total_amount_cop': int(round(total)),
+            'subtotal': subtotal,
+            'subtotal_cop': int(round(subtotal)),
+            'shipping_cost': shipping,
+            'shipping_cost_cop': shipping,
+            'tax_amount': tax,
+            'tax_amount_cop': tax,
+            'shipping_address': shipping_address,
+            'payment_method': payment_method,
+            'notes': notes or '',
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat(),
+            'user_name': user_name,
+            'user_email': user_email,
+            'items_count': len(items_data),
+            'items': items_data
+        }
+
+
+# Singleton instance
+checkout_service = CheckoutService()
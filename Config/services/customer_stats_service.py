@@ -0,0 +1,178 @@
+"""
+Customer Stats Service
+Order statistics per customer computed with a single grouped join
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import case, func, or_
+from Config.db import db
+from Config.models.order import Order
+from Config.models.user import User
+
+
+class CustomerStatsService:
+    """Service for listing customers together with their order statistics"""
+
+    DEFAULT_PER_PAGE = 50
+    MAX_PER_PAGE = 200
+
+    @staticmethod
+    def _columns():
+        return {
+            'order_count': func.count(Order.id),
+            'total_spent': func.coalesce(func.sum(Order.total_amount), 0),
+            'last_order_date': func.max(Order.created_at)
+        }
+
+    @staticmethod
+    def _base_query():
+        """Customers LEFT JOIN orders grouped by customer"""
+        columns = CustomerStatsService._columns()
+        return db.session.query(
+            User.id,
+            User.name,
+            User.email,
+            User.role,
+            User.phone,
+            User.active,
+            User.created_at,
+            columns['order_count'].label('order_count'),
+            columns['total_spent'].label('total_spent'),
+            columns['last_order_date'].label('last_order_date')
+        ).outerjoin(
+            Order, Order.user_id == User.id
+        ).group_by(
+            User.id, User.name, User.email, User.role, User.phone, User.active, User.created_at
+        )
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        return {
+            'id': row.id,
+            'name': row.name,
+            'email': row.email,
+            'role': row.role,
+            'phone': row.phone,
+            'is_active': row.active,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'order_count': int(row.order_count or 0),
+            'total_spent': float(row.total_spent or 0),
+            'last_order_date': row.last_order_date.isoformat() if row.last_order_date else None
+        }
+
+    @staticmethod
+    def _filter_customers(query, search: Optional[str] = None, status: Optional[str] = None):
+        query = query.filter(User.role == 'cliente')
+
+        if search:
+            pattern = f"%{search.strip()}%"
+            query = query.filter(or_(User.name.ilike(pattern), User.email.ilike(pattern)))
+
+        if status == 'active':
+            query = query.filter(User.active == True)
+        elif status == 'inactive':
+            query = query.filter(User.active == False)
+
+        return query
+
+    @staticmethod
+    def list_customers(page: int = 1, per_page: int = DEFAULT_PER_PAGE,
+                       sort: str = 'created_at', direction: str = 'desc',
+                       search: Optional[str] = None, status: Optional[str] = None) -> Dict:
+        """
+        Get a page of customers with order count, total spent and last order date
+
+        Args:
+            page: Page number (1-based)
+            per_page: Page size (capped at MAX_PER_PAGE)
+            sort: One of name, email, created_at, order_count, total_spent, last_order_date
+            direction: 'asc' or 'desc'
+            search: Optional text matched against name and email
+            status: Optional 'active' or 'inactive' filter
+
+        Returns:
+            Dict with 'customers' and 'pagination'
+        """
+        page = max(1, page)
+        per_page = max(1, min(per_page, CustomerStatsService.MAX_PER_PAGE))
+
+        columns = CustomerStatsService._columns()
+        sort_columns = {
+            'name': User.name,
+            'email': User.email,
+            'created_at': User.created_at,
+            'order_count': columns['order_count'],
+            'total_spent': columns['total_spent'],
+            'last_order_date': columns['last_order_date']
+        }
+        sort_column = sort_columns.get(sort, User.created_at)
+        sort_column = sort_column.asc() if direction == 'asc' else sort_column.desc()
+
+        total = CustomerStatsService._filter_customers(
+            db.session.query(func.count(User.id)), search, status
+        ).scalar() or 0
+
+        rows = CustomerStatsService._filter_customers(
+            CustomerStatsService._base_query(), search, status
+        ).order_by(sort_column, User.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+
+        pages = (total + per_page - 1) // per_page if total else 0
+
+        return {
+            'customers': [CustomerStatsService._row_to_dict(row) for row in rows],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
+            }
+        }
+
+    @staticmethod
+    def get_customer_stats(customer_id: int) -> Optional[Dict]:
+        """
+        Get one user together with its order statistics
+
+        Args:
+            customer_id: ID of the user
+
+        Returns:
+            Customer dict or None if not found
+        """
+        row = CustomerStatsService._base_query().filter(User.id == customer_id).first()
+        return CustomerStatsService._row_to_dict(row) if row else None
+
+    @staticmethod
+    def get_summary(current_date: Optional[datetime] = None) -> Dict:
+        """
+        Customer counters for the stats cards in one aggregate query
+
+        Args:
+            current_date: Reference date for "new this month" (defaults to now)
+
+        Returns:
+            Dict with total, active, inactive and new_this_month counts
+        """
+        if current_date is None:
+            current_date = datetime.utcnow()
+        first_day_of_month = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        total, active, new_this_month = db.session.query(
+            func.count(User.id),
+            func.coalesce(func.sum(case((User.active == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.created_at >= first_day_of_month, 1), else_=0)), 0)
+        ).filter(User.role == 'cliente').one()
+
+        return {
+            'total_customers': int(total),
+            'active_customers': int(active),
+            'new_this_month': int(new_this_month),
+            'inactive_customers': int(total) - int(active)
+        }
+
+
+# Singleton instance
+customer_stats_service = CustomerStatsService()
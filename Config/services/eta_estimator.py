@@ -0,0 +1,177 @@
+"""
+ETA Estimator
+Local distance/ETA estimates for delivery tracking, refreshed from Distance Matrix only when needed
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from Config.db import db
+from Config.google_maps_config import GoogleMapsConfig
+from Config.models.order_tracking import DeliveryTracking
+from Config.services.cache import TTLCache
+from Config.services.google_maps_service import google_maps_service
+
+
+class EtaEstimator:
+    """
+    Estimates the remaining distance and time of a delivery without network calls
+
+    The road distance is approximated as the great-circle (haversine)
+    distance multiplied by a road factor. Each Distance Matrix answer stores
+    the factor it measured on the tracking row; the delivery keeps using its
+    own factor, and new deliveries use the median of recent ones (or
+    DEFAULT_ROAD_FACTOR). Time is derived from GoogleMapsConfig.AVERAGE_SPEED.
+
+    Distance Matrix is consulted only when the driver moved more than
+    ETA_REMOTE_MOVE_KM since the last remote check or that check is older
+    than ETA_REMOTE_MAX_AGE seconds.
+    """
+
+    EARTH_RADIUS_KM = 6371.0088
+    MIN_ROAD_FACTOR = 1.0
+    MAX_ROAD_FACTOR = 3.0
+    # Below this straight-line distance the measured factor is mostly noise
+    MIN_CALIBRATION_KM = 0.5
+    CALIBRATION_SAMPLE = 500
+
+    _calibration = TTLCache(maxsize=1, ttl=600)
+
+    @staticmethod
+    def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        """Great-circle distance between two points in kilometers"""
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        d_phi = phi2 - phi1
+        d_lambda = math.radians(lng2 - lng1)
+        a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+        return 2 * EtaEstimator.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    @staticmethod
+    def _load_road_factor() -> float:
+        factors = [
+            row[0] for row in db.session.query(DeliveryTracking.road_factor).filter(
+                DeliveryTracking.road_factor.isnot(None)
+            ).order_by(DeliveryTracking.remote_checked_at.desc()).limit(EtaEstimator.CALIBRATION_SAMPLE).all()
+        ]
+        if not factors:
+            return GoogleMapsConfig.DEFAULT_ROAD_FACTOR
+        factors.sort()
+        middle = len(factors) // 2
+        if len(factors) % 2:
+            return factors[middle]
+        return (factors[middle - 1] + factors[middle]) / 2
+
+    @staticmethod
+    def road_factor() -> float:
+        """Road factor calibrated from past deliveries (cached for 10 minutes)"""
+        try:
+            return EtaEstimator._calibration.get_or_set('road_factor', EtaEstimator._load_road_factor)
+        except Exception as e:
+            print(f"Error calibrating road factor: {str(e)}")
+            return GoogleMapsConfig.DEFAULT_ROAD_FACTOR
+
+    @staticmethod
+    def estimate(latitude: float, longitude: float, dest_latitude: float, dest_longitude: float,
+                 road_factor: Optional[float] = None) -> Dict:
+        """
+        Estimate road distance and driving time to the destination
+
+        Returns:
+            Dict with 'distance_km', 'duration_minutes' and 'source'
+        """
+        factor = road_factor or EtaEstimator.road_factor()
+        distance_km = EtaEstimator.haversine_km(latitude, longitude, dest_latitude, dest_longitude) * factor
+        duration_minutes = distance_km / GoogleMapsConfig.AVERAGE_SPEED * 60
+        return {
+            'distance_km': round(distance_km, 3),
+            'duration_minutes': duration_minutes,
+            'source': 'local'
+        }
+
+    @staticmethod
+    def measured_road_factor(latitude: float, longitude: float, dest_latitude: float, dest_longitude: float,
+                             road_km: float) -> Optional[float]:
+        """Road factor measured by a Distance Matrix answer (None when too close to be meaningful)"""
+        straight_km = EtaEstimator.haversine_km(latitude, longitude, dest_latitude, dest_longitude)
+        if straight_km < EtaEstimator.MIN_CALIBRATION_KM:
+            return None
+        return min(EtaEstimator.MAX_ROAD_FACTOR, max(EtaEstimator.MIN_ROAD_FACTOR, road_km / straight_km))
+
+    @staticmethod
+    def needs_remote(tracking: DeliveryTracking, latitude: float, longitude: float,
+                     now: Optional[datetime] = None) -> bool:
+        """Whether Distance Matrix should be consulted for this ping"""
+        if not GoogleMapsConfig.is_configured():
+            return False
+        if tracking.remote_checked_at is None or tracking.remote_latitude is None:
+            return True
+
+        now = now or datetime.utcnow()
+        if now - tracking.remote_checked_at > timedelta(seconds=GoogleMapsConfig.ETA_REMOTE_MAX_AGE):
+            return True
+
+        moved_km = EtaEstimator.haversine_km(
+            tracking.remote_latitude, tracking.remote_longitude, latitude, longitude
+        )
+        return moved_km > GoogleMapsConfig.ETA_REMOTE_MOVE_KM
+
+    @staticmethod
+    def update_tracking(tracking: DeliveryTracking, latitude: float, longitude: float,
+                        allow_remote: bool = True) -> Optional[Dict]:
+        """
+        Refresh the distance/ETA estimates of a tracking row (not committed)
+
+        Args:
+            tracking: Active delivery tracking
+            latitude: Current driver latitude
+            longitude: Current driver longitude
+            allow_remote: Whether Distance Matrix may be consulted if due
+
+        Returns:
+            The estimate used (see estimate()), or None without a destination
+        """
+        if tracking.destination_latitude is None or tracking.destination_longitude is None:
+            return None
+
+        now = datetime.utcnow()
+        result = None
+
+        if allow_remote and EtaEstimator.needs_remote(tracking, latitude, longitude, now):
+            remote = google_maps_service.calculate_distance_and_time(
+                latitude, longitude,
+                tracking.destination_latitude, tracking.destination_longitude
+            )
+            # A failed call also counts as a check, so an API outage does not
+            # turn every following ping into another remote call
+            tracking.remote_checked_at = now
+            tracking.remote_latitude = latitude
+            tracking.remote_longitude = longitude
+            if remote:
+                factor = EtaEstimator.measured_road_factor(
+                    latitude, longitude, tracking.destination_latitude, tracking.destination_longitude,
+                    remote['distance_km']
+                )
+                if factor is not None:
+                    tracking.road_factor = factor
+                result = {
+                    'distance_km': remote['distance_km'],
+                    'duration_minutes': remote['duration_minutes'],
+                    'source': 'remote'
+                }
+
+        if result is None:
+            result = EtaEstimator.estimate(
+                latitude, longitude,
+                tracking.destination_latitude, tracking.destination_longitude,
+                road_factor=tracking.road_factor
+            )
+
+        tracking.estimated_distance_km = result['distance_km']
+        tracking.estimated_time_minutes = max(1, int(round(result['duration_minutes'])))
+        tracking.eta = datetime.now() + timedelta(minutes=tracking.estimated_time_minutes)
+        tracking.eta_source = result['source']
+        return result
+
+
+# Singleton instance
+eta_estimator = EtaEstimator()
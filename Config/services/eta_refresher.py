@@ -0,0 +1,277 @@
+"""
+ETA Refresher
+Periodic refresh of the distance/ETA of every active delivery with packed Distance Matrix requests
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, func, or_
+from Config.db import db
+from Config.google_maps_config import GoogleMapsConfig
+from Config.models.order_tracking import DeliveryTracking
+from Config.services.eta_estimator import eta_estimator
+from Config.services.event_broker import event_broker
+from Config.services.geocode_cache import geocode_cache
+from Config.services.google_maps_service import google_maps_service
+
+
+class EtaRefresher:
+    """
+    Recomputes the remote ETA of all active deliveries in a few requests
+
+    Every run loads the active deliveries not checked in the last
+    ETA_REFRESH_MIN_AGE seconds with one query, packs their (driver
+    position, destination) pairs into Distance Matrix requests within the
+    API limits (25 origins, 25 destinations, 100 elements) and writes the
+    results back with one UPDATE. Positions and destinations are rounded to
+    ETA_REFRESH_GRID_DECIMALS, so deliveries of the same driver, or to the
+    same place, share a row or column of the matrix.
+
+    Only the pairs that are needed are read from each matrix; with all
+    positions and destinations distinct a request carries 10 pairs (100
+    elements), so 500 deliveries take 50 requests instead of 500.
+
+    A refreshed row also counts as a remote check for EtaEstimator. This is
+    the only place remote ETAs are computed; the location ingest uses local
+    estimates. The addresses Distance Matrix returns for the origins fill
+    the reverse geocode cache, which the ingest reads for current_address.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.last_run = None
+
+    @staticmethod
+    def _grid_key(latitude: float, longitude: float) -> Tuple[float, float]:
+        decimals = GoogleMapsConfig.ETA_REFRESH_GRID_DECIMALS
+        return round(float(latitude), decimals), round(float(longitude), decimals)
+
+    @staticmethod
+    def pack(pairs: List[Tuple[Tuple, Tuple, object]]) -> List[Dict]:
+        """
+        Pack origin/destination pairs into Distance Matrix requests
+
+        Origins are placed first-fit, with the destinations they need, into
+        the first request that stays within the limits.
+
+        Args:
+            pairs: (origin key, destination key, item) tuples
+
+        Returns:
+            List of {'origins': [...], 'destinations': [...], 'pairs': [...]}
+        """
+        max_origins = GoogleMapsConfig.DISTANCE_MATRIX_MAX_ORIGINS
+        max_destinations = GoogleMapsConfig.DISTANCE_MATRIX_MAX_DESTINATIONS
+        max_elements = GoogleMapsConfig.DISTANCE_MATRIX_MAX_ELEMENTS
+
+        by_origin = {}
+        for origin, destination, item in pairs:
+            by_origin.setdefault(origin, []).append((origin, destination, item))
+
+        # Un origen con muchos destinos se parte en grupos que quepan en una petición
+        groups = []
+        per_request = min(max_destinations, max_elements)
+        for origin, items in sorted(by_origin.items(), key=lambda entry: -len(entry[1])):
+            destinations = list(dict.fromkeys(destination for _, destination, _ in items))
+            for start in range(0, len(destinations), per_request):
+                chunk = set(destinations[start:start + per_request])
+                groups.append((origin, chunk, [pair for pair in items if pair[1] in chunk]))
+
+        requests = []
+        for origin, destinations, items in groups:
+            for request in requests:
+                merged = request['_destinations'] | destinations
+                origins = len(request['origins']) + (origin not in request['_origins'])
+                if origins <= max_origins and len(merged) <= max_destinations and origins * len(merged) <= max_elements:
+                    break
+            else:
+                request = {'origins': [], 'destinations': [], 'pairs': [], '_origins': set(), '_destinations': set()}
+                requests.append(request)
+
+            if origin not in request['_origins']:
+                request['_origins'].add(origin)
+                request['origins'].append(origin)
+            for destination in destinations:
+                if destination not in request['_destinations']:
+                    request['_destinations'].add(destination)
+                    request['destinations'].append(destination)
+            request['pairs'].extend(items)
+
+        for request in requests:
+            del request['_origins'], request['_destinations']
+        return requests
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Refresh the remote ETA of the active deliveries that are due
+
+        Must be called inside an application context.
+
+        Returns:
+            Metrics of the run
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        result = {
+            'started_at': now.isoformat(), 'deliveries': 0, 'requests': 0, 'elements': 0,
+            'updated': 0, 'failed_requests': 0, 'duration_ms': 0
+        }
+        if not GoogleMapsConfig.is_configured():
+            return result
+
+        due = now - timedelta(seconds=GoogleMapsConfig.ETA_REFRESH_MIN_AGE)
+        rows = db.session.query(
+            DeliveryTracking.id, DeliveryTracking.order_id,
+            DeliveryTracking.current_latitude, DeliveryTracking.current_longitude,
+            DeliveryTracking.destination_latitude, DeliveryTracking.destination_longitude,
+            DeliveryTracking.last_updated
+        ).filter(
+            DeliveryTracking.is_active == True,
+            DeliveryTracking.current_latitude.isnot(None),
+            DeliveryTracking.destination_latitude.isnot(None),
+            or_(DeliveryTracking.remote_checked_at.is_(None), DeliveryTracking.remote_checked_at < due)
+        ).all()
+        db.session.rollback()  # no mantener la transacción abierta durante las llamadas a la API
+        result['deliveries'] = len(rows)
+
+        pairs = [
+            (self._grid_key(row.current_latitude, row.current_longitude),
+             self._grid_key(row.destination_latitude, row.destination_longitude), row)
+            for row in rows
+        ]
+
+        params = []
+        eta_now = datetime.now()
+        for request in self.pack(pairs):
+            result['requests'] += 1
+            result['elements'] += len(request['origins']) * len(request['destinations'])
+            matrix = google_maps_service.distance_matrix(request['origins'], request['destinations'])
+            if matrix is None:
+                result['failed_requests'] += 1
+                continue
+
+            origin_index = {origin: i for i, origin in enumerate(request['origins'])}
+            destination_index = {destination: j for j, destination in enumerate(request['destinations'])}
+            for origin, destination, row in request['pairs']:
+                element = matrix[origin_index[origin]][destination_index[destination]]
+                if element is None:
+                    continue
+                minutes = max(1, int(round(element['duration_minutes'])))
+                _, address = geocode_cache.get_reverse(*origin)
+                params.append({
+                    'b_id': row.id,
+                    'b_last_updated': row.last_updated,
+                    'v_distance': round(element['distance_km'], 3),
+                    'v_minutes': minutes,
+                    'v_eta': eta_now + timedelta(minutes=minutes),
+                    'v_latitude': row.current_latitude,
+                    'v_longitude': row.current_longitude,
+                    'v_address': address,
+                    'v_road_factor': eta_estimator.measured_road_factor(
+                        row.current_latitude, row.current_longitude,
+                        row.destination_latitude, row.destination_longitude,
+                        element['distance_km']
+                    ),
+                    '_order_id': row.order_id
+                })
+
+        if params:
+            table = DeliveryTracking.__table__
+            # Se omite la fila si el repartidor envió otra posición mientras tanto;
+            # last_updated se conserva para que el onupdate del modelo no la cambie
+            db.session.execute(
+                table.update().where(
+                    table.c.id == bindparam('b_id'),
+                    table.c.is_active == True,
+                    table.c.last_updated.is_not_distinct_from(bindparam('b_last_updated'))
+                ).values(
+                    estimated_distance_km=bindparam('v_distance'),
+                    estimated_time_minutes=bindparam('v_minutes'),
+                    eta=bindparam('v_eta'),
+                    eta_source='remote',
+                    remote_checked_at=now,
+                    remote_latitude=bindparam('v_latitude'),
+                    remote_longitude=bindparam('v_longitude'),
+                    road_factor=func.coalesce(bindparam('v_road_factor'), table.c.road_factor),
+                    current_address=func.coalesce(bindparam('v_address'), table.c.current_address),
+                    last_updated=table.c.last_updated
+                ),
+                [{name: value for name, value in row.items() if name != '_order_id'} for row in params]
+            )
+            # Publicar solo las filas que el UPDATE cambió: las omitidas ya tienen una ETA más reciente
+            refreshed = {
+                row_id for (row_id,) in db.session.query(DeliveryTracking.id).filter(
+                    DeliveryTracking.id.in_([row['b_id'] for row in params]),
+                    DeliveryTracking.remote_checked_at == now
+                )
+            }
+            for row in params:
+                if row['b_id'] not in refreshed:
+                    continue
+                data = {
+                    'order_id': row['_order_id'],
+                    'distance_km': row['v_distance'],
+                    'time_minutes': row['v_minutes'],
+                    'eta': row['v_eta'].isoformat()
+                }
+                event_broker.publish_on_commit(f"order:{row['_order_id']}", 'eta', data)
+                event_broker.publish_on_commit('orders', 'eta', data)
+            db.session.commit()
+            result['updated'] = len(refreshed)
+
+        result['duration_ms'] = int((time.perf_counter() - started) * 1000)
+        with self._lock:
+            self.last_run = result
+        return result
+
+    def _loop(self, app, interval: int) -> None:
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error refreshing ETAs: {str(e)}")
+                finally:
+                    db.session.remove()
+            self._stop.wait(interval)
+
+    def start(self, app, interval: Optional[int] = None) -> bool:
+        """
+        Start the refresher in a daemon thread
+
+        Returns:
+            False if it was already running
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return False
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(app, interval or GoogleMapsConfig.ETA_REFRESH_INTERVAL),
+            name='eta-refresher', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread after the current run"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'last_run': self.last_run
+            }
+
+
+# Singleton instance
+eta_refresher = EtaRefresher()
@@ -0,0 +1,205 @@
+"""
+Event Broker
+In-process publish/subscribe for pushing tracking and notification updates to Server-Sent Events streams
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from Config.db import db
+
+# (event ID, topic, event name, JSON payload)
+Event = Tuple[int, str, str, str]
+
+
+class Subscription:
+    """Bounded inbox of one SSE connection"""
+
+    def __init__(self, topics: Iterable[str], maxsize: int):
+        self.topics = frozenset(topics)
+        self._events = deque(maxlen=maxsize)
+        self._ready = threading.Event()
+        self.overflowed = False
+
+    def push(self, item: Event) -> None:
+        if len(self._events) == self._events.maxlen:
+            # El cliente va atrasado: se descarta lo más viejo y se le pide resincronizar
+            self.overflowed = True
+        self._events.append(item)
+        self._ready.set()
+
+    def wait(self, timeout: float) -> List[Event]:
+        """Events received since the last call (empty after timeout seconds without events)"""
+        self._ready.wait(timeout)
+        self._ready.clear()
+        items = []
+        while self._events:
+            items.append(self._events.popleft())
+        return items
+
+
+class EventBroker:
+    """
+    Fan-out of events to the subscriptions of each topic
+
+    Topics are plain strings: 'order:<id>' for a delivery, 'user:<id>' for
+    a user's notifications and 'orders' for staff dashboards. Payloads are
+    serialized once per event, whatever the number of subscribers, and each
+    subscription only holds a small deque and an Event, so idle connections
+    cost no CPU. The last REPLAY_SIZE events are kept so a reconnecting
+    EventSource (Last-Event-ID) receives what it missed.
+
+    In-process listeners (add_listener) receive the events of a topic as
+    Python objects, e.g. to keep an in-memory view such as the fleet
+    snapshot current without reading the database.
+
+    The broker lives in the process memory: with several worker processes,
+    a client only sees events published by the process that serves it.
+
+    Each open stream holds a server thread for up to MAX_STREAM_SECONDS.
+    Under the threaded server started by app.py (and the Docker image),
+    the number of idle connections is therefore bounded by threads, not
+    by the broker: MAX_SUBSCRIBERS defaults to a value such a server can
+    hold, and extra streams are refused with 503 and a retry hint
+    (RETRY_SECONDS) so clients fall back to polling. Thousands of
+    connections need an async server (e.g. gunicorn -k gevent) and a
+    higher SSE_MAX_SUBSCRIBERS.
+    """
+
+    QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))  # events buffered per connection
+    REPLAY_SIZE = int(os.getenv('SSE_REPLAY_SIZE', 2000))
+    MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 100))  # one server thread per stream
+    RETRY_SECONDS = int(os.getenv('SSE_RETRY_SECONDS', 30))  # suggested wait when the cap is reached
+    HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', 20))  # keeps proxies from closing idle streams
+    MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_SECONDS', 300))  # then EventSource reconnects with Last-Event-ID
+
+    def __init__(self):
+        self._topics = {}  # topic -> set of subscriptions
+        self._listeners = {}  # topic -> list of callbacks
+        self._recent = deque(maxlen=self.REPLAY_SIZE)
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self.subscribers = 0
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[int] = None) -> Tuple[Optional[Subscription], bool]:
+        """
+        Register a subscription to some topics
+
+        Args:
+            topics: Topics to receive
+            last_event_id: Last event seen by a reconnecting client
+
+        Returns:
+            (subscription, complete): subscription is None when the process
+            is at MAX_SUBSCRIBERS; complete is False when events after
+            last_event_id are no longer available (the client must reload)
+        """
+        subscription = Subscription(topics, self.QUEUE_SIZE)
+        with self._lock:
+            if self.subscribers >= self.MAX_SUBSCRIBERS:
+                return None, False
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+            self.subscribers += 1
+
+            complete = True
+            if last_event_id is not None:
+                oldest = self._recent[0][0] if self._recent else self._last_id + 1
+                # IDs mayores al último emitido vienen de antes de un reinicio del proceso
+                complete = oldest <= last_event_id + 1 and last_event_id <= self._last_id
+                for item in self._recent:
+                    if item[0] > last_event_id and item[1] in subscription.topics:
+                        subscription.push(item)
+        return subscription, complete
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+            self.subscribers -= 1
+
+    def add_listener(self, topic: str, callback: Callable[[str, Dict], None]) -> None:
+        """
+        Call callback(name, data) for every event published to a topic
+
+        Callbacks run in the publishing thread and must be quick; their
+        errors are logged and do not stop the delivery.
+        """
+        with self._lock:
+            self._listeners.setdefault(topic, []).append(callback)
+
+    def publish(self, topic: str, name: str, data: Dict) -> int:
+        """
+        Deliver an event to the current subscribers of a topic
+
+        Returns:
+            The event ID
+        """
+        payload = json.dumps(data, default=str)
+        with self._lock:
+            self._last_id += 1
+            item = (self._last_id, topic, name, payload)
+            self._recent.append(item)
+            subscribers = list(self._topics.get(topic, ()))
+            listeners = list(self._listeners.get(topic, ()))
+            self.published += 1
+            self.delivered += len(subscribers)
+        for subscription in subscribers:
+            subscription.push(item)
+        for callback in listeners:
+            try:
+                callback(name, data)
+            except Exception as e:
+                print(f"Error in event listener for {topic}: {str(e)}")
+        return item[0]
+
+    @staticmethod
+    def publish_on_commit(topic: str, name: str, data: Dict) -> None:
+        """
+        Publish an event when the current transaction commits
+
+        Nothing is sent if it rolls back, so clients never see changes
+        that were not stored.
+        """
+        db.session.info.setdefault('pending_events', []).append((topic, name, data))
+
+    @staticmethod
+    def format(item: Event) -> str:
+        """Server-Sent Events wire format of an event"""
+        return f"id: {item[0]}\nevent: {item[2]}\ndata: {item[3]}\n\n"
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'subscribers': self.subscribers,
+                'max_subscribers': self.MAX_SUBSCRIBERS,
+                'topics': len(self._topics),
+                'published': self.published,
+                'delivered': self.delivered,
+                'last_event_id': self._last_id
+            }
+
+    @staticmethod
+    def on_after_commit(session) -> None:
+        for topic, name, data in session.info.pop('pending_events', ()):
+            event_broker.publish(topic, name, data)
+
+    @staticmethod
+    def on_after_rollback(session) -> None:
+        session.info.pop('pending_events', None)
+
+
+# Singleton instance
+event_broker = EventBroker()
+
+event.listen(db.session, 'after_commit', EventBroker.on_after_commit)
+event.listen(db.session, 'after_rollback', EventBroker.on_after_rollback)
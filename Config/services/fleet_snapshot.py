@@ -0,0 +1,218 @@
+"""
+Fleet Snapshot
+In-memory, versioned view of all active deliveries for the dispatcher map
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Optional
+from Config.db import db
+from Config.models.order import Order
+from Config.models.order_tracking import DeliveryTracking
+from Config.services.event_broker import event_broker
+
+
+class FleetSnapshot:
+    """
+    Compact state of every active delivery, kept current by the event broker
+
+    The snapshot listens to the events published on the 'orders' topic
+    after each commit (positions from the location ingest, ETA refreshes,
+    start/complete/cancel), so serving the fleet map reads no tables. Every
+    change bumps a version number stored on the changed delivery; a client
+    that sends the last version it saw receives only the deliveries changed
+    since then plus the IDs removed (kept for the last TOMBSTONES removals).
+
+    Versions belong to one process and one snapshot generation (epoch):
+    when the epoch differs, or the removals a client missed are no longer
+    kept, the full fleet is returned. The snapshot is rebuilt from the
+    database (one query) on first use and every RELOAD_SECONDS, which also
+    picks up changes made by other worker processes; a reload only bumps
+    the version of deliveries that actually differ.
+    """
+
+    RELOAD_SECONDS = float(os.getenv('FLEET_SNAPSHOT_RELOAD_SECONDS', 60))
+    TOMBSTONES = int(os.getenv('FLEET_SNAPSHOT_TOMBSTONES', 5000))
+    FIELDS = ('lat', 'lng', 'status', 'eta', 'eta_minutes', 'distance_km', 'driver', 'vehicle', 'updated_at')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # order_id -> compact dict (with 'v')
+        self._removed = deque(maxlen=self.TOMBSTONES)  # (version, order_id)
+        self._version = 0
+        self._loaded_at = None
+        self.epoch = uuid.uuid4().hex[:12]
+        self.full_reads = 0
+        self.delta_reads = 0
+
+    @staticmethod
+    def _from_tracking(tracking: Dict) -> Dict:
+        """Compact fields from a DeliveryTracking.to_dict() payload"""
+        location = tracking.get('current_location') or {}
+        estimates = tracking.get('estimates') or {}
+        driver = tracking.get('driver') or {}
+        return {
+            'lat': location.get('latitude'),
+            'lng': location.get('longitude'),
+            'eta': estimates.get('eta'),
+            'eta_minutes': estimates.get('time_minutes'),
+            'distance_km': estimates.get('distance_km'),
+            'driver': driver.get('name'),
+            'vehicle': driver.get('vehicle'),
+            'updated_at': tracking.get('last_updated')
+        }
+
+    def _apply(self, order_id: int, fields: Dict, create: bool = True) -> None:
+        """Merge fields into a delivery (caller holds the lock)"""
+        entry = self._entries.get(order_id)
+        if entry is None:
+            if not create:
+                return
+            entry = {'order_id': order_id, 'status': 'in_transit'}
+            entry.update({name: None for name in self.FIELDS if name != 'status'})
+        changed = {name: value for name, value in fields.items() if entry.get(name) != value}
+        if not changed and order_id in self._entries:
+            return
+        self._version += 1
+        entry.update(changed)
+        entry['v'] = self._version
+        self._entries[order_id] = entry
+
+    def _remove(self, order_id: int) -> None:
+        if self._entries.pop(order_id, None) is not None:
+            self._version += 1
+            self._removed.append((self._version, order_id))
+
+    def on_event(self, name: str, data: Dict) -> None:
+        """Event broker listener for the 'orders' topic"""
+        order_id = data.get('order_id')
+        if order_id is None:
+            return
+        with self._lock:
+            if name == 'location':
+                self._apply(order_id, self._from_tracking(data.get('tracking') or {}))
+            elif name == 'eta':
+                self._apply(order_id, {
+                    'eta': data.get('eta'),
+                    'eta_minutes': data.get('time_minutes'),
+                    'distance_km': data.get('distance_km')
+                }, create=False)
+            elif name == 'status':
+                if not data.get('tracking_active'):
+                    self._remove(order_id)
+                    return
+                fields = self._from_tracking(data['tracking']) if data.get('tracking') else {}
+                fields['status'] = data.get('status')
+                self._apply(order_id, fields)
+
+    def reload(self) -> int:
+        """
+        Rebuild the snapshot from the active deliveries (one query)
+
+        Must be called inside an application context.
+
+        Returns:
+            Number of active deliveries
+        """
+        rows = db.session.query(
+            DeliveryTracking.order_id, DeliveryTracking.current_latitude, DeliveryTracking.current_longitude,
+            DeliveryTracking.eta, DeliveryTracking.estimated_time_minutes, DeliveryTracking.estimated_distance_km,
+            DeliveryTracking.driver_name, DeliveryTracking.vehicle_info, DeliveryTracking.last_updated,
+            Order.status
+        ).join(Order, Order.id == DeliveryTracking.order_id).filter(
+            DeliveryTracking.is_active == True
+        ).all()
+
+        with self._lock:
+            active = set()
+            for row in rows:
+                active.add(row.order_id)
+                self._apply(row.order_id, {
+                    'lat': row.current_latitude,
+                    'lng': row.current_longitude,
+                    'status': row.status,
+                    'eta': row.eta.isoformat() if row.eta else None,
+                    'eta_minutes': row.estimated_time_minutes,
+                    'distance_km': row.estimated_distance_km,
+                    'driver': row.driver_name,
+                    'vehicle': row.vehicle_info,
+                    'updated_at': row.last_updated.isoformat() if row.last_updated else None
+                })
+            for order_id in [order_id for order_id in self._entries if order_id not in active]:
+                self._remove(order_id)
+            self._loaded_at = time.monotonic()
+            return len(self._entries)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.RELOAD_SECONDS:
+            return
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Error loading fleet snapshot: {str(e)}")
+            self._loaded_at = time.monotonic()
+
+    def etag(self) -> str:
+        """
+        Entity tag of the current state ('<epoch>:<version>')
+
+        Must be called inside an application context (for the periodic reload).
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return f'{self.epoch}:{self._version}'
+
+    def read(self, since: Optional[int] = None, epoch: Optional[str] = None) -> Dict:
+        """
+        Active deliveries, or only what changed after version `since`
+
+        Must be called inside an application context (for the periodic reload).
+
+        Returns:
+            Dict with 'epoch', 'version', 'full' (True when the whole fleet
+            is returned), 'deliveries' and 'removed' (order IDs)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            oldest_removal = self._removed[0][0] if self._removed else None
+            delta = (
+                since is not None and epoch == self.epoch and since <= self._version and (
+                    len(self._removed) < self._removed.maxlen or oldest_removal is None or since >= oldest_removal - 1
+                )
+            )
+            if delta:
+                self.delta_reads += 1
+                deliveries = [dict(entry) for entry in self._entries.values() if entry['v'] > since]
+                removed = [order_id for version, order_id in self._removed if version > since]
+            else:
+                self.full_reads += 1
+                deliveries = [dict(entry) for entry in self._entries.values()]
+                removed = []
+            return {
+                'epoch': self.epoch,
+                'version': self._version,
+                'full': not delta,
+                'deliveries': deliveries,
+                'removed': removed
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'version': self._version,
+                'deliveries': len(self._entries),
+                'tombstones': len(self._removed),
+                'full_reads': self.full_reads,
+                'delta_reads': self.delta_reads,
+                'loaded_seconds_ago': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None
+            }
+
+
+# Singleton instance
+fleet_snapshot = FleetSnapshot()
+
+event_broker.add_listener('orders', fleet_snapshot.on_event)
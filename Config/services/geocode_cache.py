@@ -0,0 +1,183 @@
+"""
+Geocode Cache
+Two-tier cache (in-process LRU + geocode_cache table) for Google geocoding results
+"""
+
+import hashlib
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from Config.db import db
+from Config.google_maps_config import GoogleMapsConfig
+from Config.models.geocode_cache import GeocodeCacheEntry
+from Config.services.cache import TTLCache
+
+
+class GeocodeCache:
+    """
+    Cache for forward (address) and reverse (coordinates) geocoding
+
+    Forward lookups are keyed on the normalized address text; reverse lookups
+    on the coordinates rounded to a grid (REVERSE_GEOCODE_GRID_DECIMALS), so
+    nearby driver pings share one entry. Misses in memory fall back to the
+    geocode_cache table, which is shared by every worker process and survives
+    restarts. "No results" answers are cached too, with a shorter TTL.
+
+    The table is read and written on its own connection, outside the
+    request's session, so a cache write never commits (or waits on) the
+    caller's pending changes.
+    """
+
+    NOT_FOUND = {'found': False}
+
+    def __init__(self):
+        self._memory = TTLCache(maxsize=GoogleMapsConfig.GEOCODE_CACHE_SIZE, ttl=None)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        """Lowercase, accent-free, single-spaced address used as cache key"""
+        text = unicodedata.normalize('NFKD', address or '')
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+        text = re.sub(r'\s*([,#])\s*', r'\1 ', text)
+        text = re.sub(r'\s+', ' ', text).strip(' ,.')
+        if len(text) > 255:
+            text = 'sha1:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return text
+
+    @staticmethod
+    def grid_key(latitude: float, longitude: float) -> str:
+        """Grid cell of a coordinate pair used as reverse geocoding key"""
+        decimals = GoogleMapsConfig.REVERSE_GEOCODE_GRID_DECIMALS
+        return f"{round(float(latitude), decimals):.{decimals}f},{round(float(longitude), decimals):.{decimals}f}"
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _lookup(self, kind: str, key: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Returns:
+            (cached, value): value is None for a cached "no results" answer
+        """
+        entry = self._memory.get((kind, key))
+        if entry is not None:
+            self._count('memory_hits')
+            return True, None if entry is self.NOT_FOUND else dict(entry)
+
+        try:
+            table = GeocodeCacheEntry.__table__
+            with db.engine.connect() as connection:
+                row = connection.execute(
+                    select(table.c.found, table.c.latitude, table.c.longitude,
+                           table.c.formatted_address, table.c.expires_at)
+                    .where(table.c.kind == kind, table.c.cache_key == key)
+                ).first()
+        except Exception as e:
+            print(f"Error reading geocode cache: {str(e)}")
+            row = None
+
+        now = datetime.utcnow()
+        if row is None or row.expires_at <= now:
+            self._count('misses')
+            return False, None
+
+        value = self.NOT_FOUND
+        if row.found:
+            value = {
+                'latitude': row.latitude,
+                'longitude': row.longitude,
+                'formatted_address': row.formatted_address
+            }
+        self._memory.set((kind, key), value, ttl=(row.expires_at - now).total_seconds())
+        self._count('db_hits')
+        return True, None if value is self.NOT_FOUND else dict(value)
+
+    def _store(self, kind: str, key: str, value: Optional[Dict], ttl: timedelta) -> None:
+        self._memory.set((kind, key), dict(value) if value else self.NOT_FOUND, ttl=ttl.total_seconds())
+        self._count('stores')
+
+        now = datetime.utcnow()
+        values = {
+            'found': value is not None,
+            'latitude': value.get('latitude') if value else None,
+            'longitude': value.get('longitude') if value else None,
+            'formatted_address': (value.get('formatted_address') or '')[:500] if value else None,
+            'created_at': now,
+            'expires_at': now + ttl
+        }
+        try:
+            table = GeocodeCacheEntry.__table__
+            with db.engine.begin() as connection:
+                result = connection.execute(
+                    table.update().where(table.c.kind == kind, table.c.cache_key == key).values(**values)
+                )
+                if result.rowcount == 0:
+                    connection.execute(table.insert().values(kind=kind, cache_key=key, **values))
+        except Exception as e:
+            # Otro proceso pudo insertar la misma clave; la caché en memoria ya tiene el valor
+            print(f"Error writing geocode cache: {str(e)}")
+
+    def get_forward(self, address: str) -> Tuple[bool, Optional[Dict]]:
+        """Cached geocoding of an address: (cached, {'latitude', 'longitude', 'formatted_address'})"""
+        return self._lookup('forward', self.normalize_address(address))
+
+    def set_forward(self, address: str, value: Optional[Dict]) -> None:
+        """Cache the geocoding of an address (None caches a "no results" answer)"""
+        if value is None:
+            ttl = timedelta(hours=GoogleMapsConfig.GEOCODE_NEGATIVE_TTL_HOURS)
+        else:
+            ttl = timedelta(days=GoogleMapsConfig.GEOCODE_CACHE_TTL_DAYS)
+        self._store('forward', self.normalize_address(address), value, ttl)
+
+    def get_reverse(self, latitude: float, longitude: float) -> Tuple[bool, Optional[str]]:
+        """Cached reverse geocoding of a coordinate pair: (cached, formatted_address)"""
+        cached, value = self._lookup('reverse', self.grid_key(latitude, longitude))
+        return cached, value['formatted_address'] if value else None
+
+    def set_reverse(self, latitude: float, longitude: float, formatted_address: Optional[str]) -> None:
+        """Cache the reverse geocoding of a coordinate pair (None caches a "no results" answer)"""
+        if formatted_address is None:
+            ttl = timedelta(hours=GoogleMapsConfig.GEOCODE_NEGATIVE_TTL_HOURS)
+            value = None
+        else:
+            ttl = timedelta(days=GoogleMapsConfig.REVERSE_GEOCODE_CACHE_TTL_DAYS)
+            value = {'latitude': latitude, 'longitude': longitude, 'formatted_address': formatted_address}
+        self._store('reverse', self.grid_key(latitude, longitude), value, ttl)
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the geocode_cache table"""
+        try:
+            table = GeocodeCacheEntry.__table__
+            with db.engine.begin() as connection:
+                result = connection.execute(table.delete().where(table.c.expires_at <= datetime.utcnow()))
+            return result.rowcount
+        except Exception as e:
+            print(f"Error purging geocode cache: {str(e)}")
+            return 0
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters of both tiers"""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_ratio': (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            'memory': self._memory.stats()
+        }
+
+
+# Singleton instance
+geocode_cache = GeocodeCache()
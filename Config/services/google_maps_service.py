@@ -3,10 +3,11 @@ Google Maps Service
 Provides integration with Google Maps APIs for order tracking
 """
 
-import requests
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Tuple
 from Config.google_maps_config import GoogleMapsConfig
+from Config.services.geocode_cache import geocode_cache
+from Config.services.http_client import http_client
 
 
 class GoogleMapsService:
@@ -16,19 +17,26 @@ class GoogleMapsService:
     def geocode_address(address: str) -> Optional[Dict]:
         """
         Convert an address to latitude and longitude coordinates
-        
+
+        Results (including "no results") are cached in memory and in the
+        geocode_cache table, so repeated addresses do not call the API.
+
         Args:
             address: Street address to geocode
             
         Returns:
             Dict with 'latitude', 'longitude', 'formatted_address' or None if error
         """
+        cached, result = geocode_cache.get_forward(address)
+        if cached:
+            return result
+
         try:
             params = GoogleMapsConfig.get_geocoding_params(address)
-            response = requests.get(
-                GoogleMapsConfig.GEOCODING_API_URL, 
-                params=params,
-                timeout=10
+            response = http_client.get(
+                'google_geocoding',
+                GoogleMapsConfig.GEOCODING_API_URL,
+                params=params
             )
             
             if response.status_code == 200:
@@ -38,11 +46,16 @@ class GoogleMapsService:
                     result = data['results'][0]
                     location = result['geometry']['location']
                     
-                    return {
+                    geocoded = {
                         'latitude': location['lat'],
                         'longitude': location['lng'],
                         'formatted_address': result['formatted_address']
                     }
+                    geocode_cache.set_forward(address, geocoded)
+                    return geocoded
+
+                if data['status'] == 'ZERO_RESULTS':
+                    geocode_cache.set_forward(address, None)
             
             return None
             
@@ -54,7 +67,10 @@ class GoogleMapsService:
     def reverse_geocode(latitude: float, longitude: float) -> Optional[str]:
         """
         Convert coordinates to a formatted address
-        
+
+        Results are cached per grid cell (see GeocodeCache.grid_key), so pings
+        a few meters apart reuse the same lookup.
+
         Args:
             latitude: Latitude coordinate
             longitude: Longitude coordinate
@@ -62,6 +78,10 @@ class GoogleMapsService:
         Returns:
             Formatted address string or None if error
         """
+        cached, address = geocode_cache.get_reverse(latitude, longitude)
+        if cached:
+            return address
+
         try:
             params = {
                 'latlng': f"{latitude},{longitude}",
@@ -69,17 +89,22 @@ class GoogleMapsService:
                 'language': 'es'
             }
             
-            response = requests.get(
+            response = http_client.get(
+                'google_geocoding',
                 GoogleMapsConfig.GEOCODING_API_URL,
-                params=params,
-                timeout=10
+                params=params
             )
             
             if response.status_code == 200:
                 data = response.json()
                 
                 if data['status'] == 'OK' and len(data['results']) > 0:
-                    return data['results'][0]['formatted_address']
+                    address = data['results'][0]['formatted_address']
+                    geocode_cache.set_reverse(latitude, longitude, address)
+                    return address
+
+                if data['status'] == 'ZERO_RESULTS':
+                    geocode_cache.set_reverse(latitude, longitude, None)
             
             return None
             
@@ -89,7 +114,7 @@ class GoogleMapsService:
     
     @staticmethod
     def calculate_route(origin_lat: float, origin_lng: float, 
-                       dest_lat: float, dest_lng: float) -> Optional[Dict]:
+                       dest_lat: float, dest_lng: float, mode: str = 'driving') -> Optional[Dict]:
         """
         Calculate route between two points
         
@@ -98,6 +123,7 @@ class GoogleMapsService:
             origin_lng: Origin longitude
             dest_lat: Destination latitude
             dest_lng: Destination longitude
+            mode: Travel mode (driving, walking, bicycling)
             
         Returns:
             Dict with route information or None if error
@@ -106,11 +132,11 @@ class GoogleMapsService:
             origin = GoogleMapsConfig.format_latlng(origin_lat, origin_lng)
             destination = GoogleMapsConfig.format_latlng(dest_lat, dest_lng)
             
-            params = GoogleMapsConfig.get_directions_params(origin, destination)
-            response = requests.get(
+            params = GoogleMapsConfig.get_directions_params(origin, destination, mode)
+            response = http_client.get(
+                'google_directions',
                 GoogleMapsConfig.DIRECTIONS_API_URL,
-                params=params,
-                timeout=10
+                params=params
             )
             
             if response.status_code == 200:
@@ -166,10 +192,10 @@ class GoogleMapsService:
             destination = GoogleMapsConfig.format_latlng(dest_lat, dest_lng)
             
             params = GoogleMapsConfig.get_distance_matrix_params([origin], [destination])
-            response = requests.get(
+            response = http_client.get(
+                'google_distance_matrix',
                 GoogleMapsConfig.DISTANCE_MATRIX_API_URL,
-                params=params,
-                timeout=10
+                params=params
             )
             
             if response.status_code == 200:
@@ -194,6 +220,65 @@ class GoogleMapsService:
             print(f"Error calculating distance: {str(e)}")
             return None
     
+    @staticmethod
+    def distance_matrix(origins: List[Tuple[float, float]],
+                        destinations: List[Tuple[float, float]]) -> Optional[List[List[Optional[Dict]]]]:
+        """
+        Distances and times for every origin/destination combination in one request
+        
+        The caller keeps the request within the API limits (25 origins,
+        25 destinations, 100 elements).
+        
+        Args:
+            origins: (latitude, longitude) pairs
+            destinations: (latitude, longitude) pairs
+            
+        Returns:
+            Matrix [origin][destination] of dicts with 'distance_meters',
+            'distance_km', 'duration_seconds' and 'duration_minutes' (None for
+            pairs without a route), or None if the request failed. The
+            addresses the API returns for the origins are stored in the
+            reverse geocode cache.
+        """
+        try:
+            params = GoogleMapsConfig.get_distance_matrix_params(
+                [GoogleMapsConfig.format_latlng(lat, lng) for lat, lng in origins],
+                [GoogleMapsConfig.format_latlng(lat, lng) for lat, lng in destinations]
+            )
+            response = http_client.get(
+                'google_distance_matrix',
+                GoogleMapsConfig.DISTANCE_MATRIX_API_URL,
+                params=params
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                if data['status'] == 'OK':
+                    # Las direcciones de los orígenes quedan en la caché de geocodificación inversa
+                    for (latitude, longitude), address in zip(origins, data.get('origin_addresses') or []):
+                        if address:
+                            geocode_cache.set_reverse(latitude, longitude, address)
+                    
+                    matrix = []
+                    for row in data['rows']:
+                        matrix.append([
+                            {
+                                'distance_meters': element['distance']['value'],
+                                'distance_km': element['distance']['value'] / 1000,
+                                'duration_seconds': element['duration']['value'],
+                                'duration_minutes': element['duration']['value'] / 60
+                            } if element['status'] == 'OK' else None
+                            for element in row['elements']
+                        ])
+                    return matrix
+            
+            return None
+            
+        except Exception as e:
+            print(f"Error calculating distance matrix: {str(e)}")
+            return None
+    
     @staticmethod
     def calculate_eta(distance_km: float, current_time: Optional[datetime] = None) -> datetime:
         """
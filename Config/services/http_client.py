@@ -0,0 +1,266 @@
+"""
+HTTP Client
+Shared outbound HTTP session with connection pooling, retries, circuit breakers and per-API metrics
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker of one upstream API
+
+    After FAILURES consecutive failures (network errors, timeouts, 429 or
+    5xx answers) the circuit opens and calls fail immediately for
+    RESET_SECONDS. Then a single trial call is let through (half-open): its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._trial or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return 'half_open'
+            return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self._consecutive = 0
+                self._opened_at = None
+                self._trial = False
+                return
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                if self._opened_at is None or self._trial:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class ApiMetrics:
+    """Call, error and latency counters of one upstream API"""
+
+    def __init__(self, sample_size: int = 500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=sample_size)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.status_codes = {}
+
+    def record(self, latency_ms: float, status_code: Optional[int], error: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(latency_ms)
+            if error:
+                self.errors += 1
+            key = str(status_code) if status_code is not None else 'network'
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            status_codes = dict(self.status_codes)
+            calls, errors = self.calls, self.errors
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 2)
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'error_rate': round(errors / calls, 4) if calls else 0.0,
+            'retries': self.retries,
+            'short_circuited': self.short_circuited,
+            'status_codes': status_codes,
+            'latency_ms': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1], 2) if latencies else None
+            }
+        }
+
+
+class HttpClient:
+    """
+    Outbound HTTP client shared by every integration (Google Maps, OAuth)
+
+    A single requests.Session keeps TCP/TLS connections alive per host
+    (up to HTTP_POOL_SIZE per host), so consecutive calls skip the
+    handshakes. Each named API has its own timeouts, retry budget, circuit
+    breaker and metrics (see ENDPOINTS). Retries use exponential backoff
+    with full jitter and only happen for network errors, timeouts, 429 and
+    5xx answers; non-idempotent requests (POST) are not retried unless
+    asked. Callers get the requests.Response, or a requests exception
+    (CircuitOpenError while the API is failing fast).
+    """
+
+    POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 20))
+    BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.2))  # seconds
+    BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 2.0))  # seconds
+    BREAKER_FAILURES = int(os.getenv('HTTP_BREAKER_FAILURES', 5))
+    BREAKER_RESET_SECONDS = float(os.getenv('HTTP_BREAKER_RESET_SECONDS', 30))
+    RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+    # name -> (connect timeout, read timeout) in seconds and retries after the first attempt
+    ENDPOINTS = {
+        'google_geocoding': {'timeout': (3.05, 5), 'retries': 2},
+        'google_directions': {'timeout': (3.05, 10), 'retries': 1},
+        'google_distance_matrix': {'timeout': (3.05, 10), 'retries': 1},
+        'google_oauth': {'timeout': (3.05, 10), 'retries': 1},
+        'facebook_oauth': {'timeout': (3.05, 10), 'retries': 1},
+    }
+    DEFAULT_ENDPOINT = {'timeout': (3.05, 10), 'retries': 1}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._breakers = {}
+        self._metrics = {}
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled session, created on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=self.POOL_SIZE, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _state(self, name: str) -> Tuple[CircuitBreaker, ApiMetrics]:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(self.BREAKER_FAILURES, self.BREAKER_RESET_SECONDS)
+                self._metrics[name] = ApiMetrics()
+            return self._breakers[name], self._metrics[name]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+
+    def request(self, name: str, method: str, url: str, retries: Optional[int] = None,
+                timeout: Optional[Tuple[float, float]] = None, **kwargs) -> requests.Response:
+        """
+        Send a request to a named upstream API
+
+        Args:
+            name: API name (key of ENDPOINTS) used for timeouts, breaker and metrics
+            method: HTTP method
+            url: Full URL
+            retries: Override of the retry budget (defaults to 0 for POST)
+            timeout: Override of the (connect, read) timeout
+            **kwargs: Passed to requests (params, data, json, headers...)
+
+        Returns:
+            The last response (which may be a 429/5xx once retries run out)
+
+        Raises:
+            CircuitOpenError: The API is failing and the breaker is open
+            requests.RequestException: Network error or timeout after the last retry
+        """
+        config = self.ENDPOINTS.get(name, self.DEFAULT_ENDPOINT)
+        if retries is None:
+            retries = config['retries'] if method.upper() in ('GET', 'HEAD') else 0
+        timeout = timeout or config['timeout']
+        breaker, metrics = self._state(name)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                metrics.count('short_circuited')
+                raise CircuitOpenError(f'{name}: circuito abierto tras fallos consecutivos')
+
+            started = time.perf_counter()
+            response, error = None, None
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            failed = error is not None or response.status_code in self.RETRY_STATUSES
+            metrics.record(latency_ms, response.status_code if response is not None else None, failed)
+            breaker.record(not failed)
+
+            if not failed or attempt >= retries:
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            metrics.count('retries')
+            if response is not None:
+                response.close()
+            time.sleep(self._backoff(attempt))
+
+    def get(self, name: str, url: str, **kwargs) -> requests.Response:
+        return self.request(name, 'GET', url, **kwargs)
+
+    def post(self, name: str, url: str, **kwargs) -> requests.Response:
+        return self.request(name, 'POST', url, **kwargs)
+
+    def stats(self) -> Dict:
+        """Metrics and breaker state per API"""
+        with self._lock:
+            names = list(self._metrics)
+        result = {}
+        for name in names:
+            breaker, metrics = self._state(name)
+            result[name] = dict(metrics.snapshot(), circuit=breaker.state, circuit_opened=breaker.opened)
+        return result
+
+    def reset(self) -> None:
+        """Drop pooled connections, breakers and metrics"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._breakers = {}
+            self._metrics = {}
+
+
+# Singleton instance
+http_client = HttpClient()
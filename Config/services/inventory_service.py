@@ -0,0 +1,336 @@
+"""
+Inventory Service
+Atomic stock reservations for carts using conditional UPDATE statements
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import update
+from Config.db import db
+from Config.models.product import Product
+from Config.models.cart import Cart, CartItem
+from Config.models.inventory import StockReservation
+from Config.services.catalog_service import catalog_service
+
+
+class InventoryService:
+    """
+    Service for reserving product stock for cart lines
+
+    Stock is decremented with a single UPDATE ... WHERE stock_quantity >= :qty,
+    so concurrent requests can never oversell or lose updates (the row lock is
+    held until the transaction commits). Each cart line has a StockReservation
+    that records how much stock it holds and when it expires; the methods
+    only change the session and never commit, so the caller commits the stock
+    change together with the cart change.
+    """
+
+    RESERVATION_MINUTES = int(os.getenv('CART_RESERVATION_MINUTES', 60))
+
+    @staticmethod
+    def _expire_stock_attribute(product_id: int) -> None:
+        """Make loaded Product instances reload stock_quantity after an UPDATE"""
+        product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+        if product is not None:
+            db.session.expire(product, ['stock_quantity'])
+
+    @staticmethod
+    def try_decrement(product_id: int, quantity: int) -> bool:
+        """
+        Take stock from an active product if enough is available
+
+        Args:
+            product_id: ID of the product
+            quantity: Units to take (must be positive)
+
+        Returns:
+            True if the stock was taken, False if there was not enough
+        """
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.active == True, Product.stock_quantity >= quantity)
+            .values(stock_quantity=Product.stock_quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        InventoryService._expire_stock_attribute(product_id)
+        return result.rowcount == 1
+
+    @staticmethod
+    def increment(product_id: int, quantity: int) -> None:
+        """Return units to a product's stock"""
+        db.session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(stock_quantity=Product.stock_quantity + quantity)
+            .execution_options(synchronize_session=False)
+        )
+        InventoryService._expire_stock_attribute(product_id)
+
+    @staticmethod
+    def _owner_query(cart_id: Optional[int], guest_token: Optional[str]):
+        if cart_id is not None:
+            return StockReservation.query.filter(StockReservation.cart_id == cart_id)
+        return StockReservation.query.filter(StockReservation.guest_token == guest_token)
+
+    @staticmethod
+    def _lock_reservations(lines: Dict[int, int], cart_id: Optional[int],
+                           guest_token: Optional[str]) -> Dict[int, StockReservation]:
+        """Load (and lock) the owner's reservations for the given products"""
+        return {
+            r.product_id: r for r in InventoryService._owner_query(cart_id, guest_token).filter(
+                StockReservation.product_id.in_(list(lines))
+            ).with_for_update().all()
+        }
+
+    @staticmethod
+    def _deltas(lines: Dict[int, int], reservations: Dict[int, StockReservation],
+                legacy_quantities: Dict[int, int]) -> Dict[int, int]:
+        """Units to take (positive) or give back (negative) per product"""
+        deltas = {}
+        for product_id, wanted in lines.items():
+            reservation = reservations.get(product_id)
+            if reservation is None:
+                held = legacy_quantities.get(product_id, 0)
+            else:
+                held = reservation.quantity if reservation.is_active() else 0
+            deltas[product_id] = max(0, wanted) - held
+        return deltas
+
+    @staticmethod
+    def _move_stock(deltas: Dict[int, int]) -> Optional[int]:
+        """
+        Apply stock deltas: take first (in product ID order, to avoid deadlocks
+        between concurrent carts) and give back what was taken if a product
+        lacks stock
+
+        Returns:
+            None on success, or the ID of the first product without enough stock
+        """
+        taken = []
+        for product_id in sorted(p for p, delta in deltas.items() if delta > 0):
+            if not InventoryService.try_decrement(product_id, deltas[product_id]):
+                for taken_id in taken:
+                    InventoryService.increment(taken_id, deltas[taken_id])
+                return product_id
+            taken.append(product_id)
+
+        for product_id in sorted(p for p, delta in deltas.items() if delta < 0):
+            InventoryService.increment(product_id, -deltas[product_id])
+
+        changed = [product_id for product_id, delta in deltas.items() if delta]
+        if changed:
+            catalog_service.invalidate_on_commit(changed)
+        return None
+
+    @staticmethod
+    def set_line_quantities(lines: Dict[int, int], cart_id: Optional[int] = None,
+                            guest_token: Optional[str] = None,
+                            legacy_quantities: Optional[Dict[int, int]] = None) -> Optional[int]:
+        """
+        Make the stock held by several cart lines match the wanted quantities
+
+        All lines are applied in one transaction; if any product lacks stock,
+        what was already taken is given back.
+
+        Args:
+            lines: product_id -> wanted quantity (0 releases the line)
+            cart_id: Cart of an authenticated user
+            guest_token: Token of a session-backed guest cart
+            legacy_quantities: product_id -> quantity held by cart lines created
+                before reservations existed (used when a line has no reservation)
+
+        Returns:
+            None on success, or the ID of the first product without enough stock
+        """
+        if cart_id is None and guest_token is None:
+            raise ValueError('cart_id or guest_token is required')
+
+        expires_at = datetime.utcnow() + timedelta(minutes=InventoryService.RESERVATION_MINUTES)
+
+        reservations = InventoryService._lock_reservations(lines, cart_id, guest_token)
+        deltas = InventoryService._deltas(lines, reservations, legacy_quantities or {})
+        failed = InventoryService._move_stock(deltas)
+        if failed is not None:
+            return failed
+
+        for product_id, wanted in lines.items():
+            reservation = reservations.get(product_id)
+            if wanted <= 0:
+                if reservation is not None:
+                    db.session.delete(reservation)
+                continue
+            if reservation is None:
+                reservation = StockReservation(product_id=product_id, cart_id=cart_id, guest_token=guest_token)
+                db.session.add(reservation)
+            reservation.quantity = wanted
+            reservation.status = 'active'
+            reservation.expires_at = expires_at
+
+        InventoryService.touch(cart_id, guest_token, expires_at)
+        return None
+
+    @staticmethod
+    def set_line_quantity(product_id: int, quantity: int, cart_id: Optional[int] = None,
+                          guest_token: Optional[str] = None, legacy_quantity: int = 0) -> bool:
+        """
+        Make the stock held by one cart line match the wanted quantity
+
+        Returns:
+            True if successful, False if there is not enough stock
+        """
+        failed = InventoryService.set_line_quantities(
+            {product_id: quantity}, cart_id, guest_token, {product_id: legacy_quantity}
+        )
+        return failed is None
+
+    @staticmethod
+    def touch(cart_id: Optional[int] = None, guest_token: Optional[str] = None,
+              expires_at: Optional[datetime] = None) -> None:
+        """Extend the expiry of every active reservation of a cart and mark the cart as used"""
+        if expires_at is None:
+            expires_at = datetime.utcnow() + timedelta(minutes=InventoryService.RESERVATION_MINUTES)
+        InventoryService._owner_query(cart_id, guest_token).filter(
+            StockReservation.status == 'active'
+        ).update({'expires_at': expires_at}, synchronize_session=False)
+        if cart_id is not None:
+            Cart.query.filter(Cart.id == cart_id).update({'updated_at': datetime.utcnow()}, synchronize_session=False)
+
+    @staticmethod
+    def adopt_guest_lines(guest_token: str, lines: Dict[int, int]) -> None:
+        """
+        Create reservations for guest cart lines whose stock was already taken
+        before the cart had a token (no stock is moved)
+        """
+        expires_at = datetime.utcnow() + timedelta(minutes=InventoryService.RESERVATION_MINUTES)
+        for product_id, quantity in lines.items():
+            if quantity > 0:
+                db.session.add(StockReservation(
+                    product_id=product_id, quantity=quantity, guest_token=guest_token,
+                    status='active', expires_at=expires_at
+                ))
+
+    @staticmethod
+    def consume_cart(cart_id: int, lines: Dict[int, int]) -> Optional[int]:
+        """
+        Turn the reservations of a cart into a sale at checkout
+
+        Expired lines are reserved again; the reservations are then removed
+        because the stock now belongs to the order.
+
+        Args:
+            cart_id: ID of the cart being checked out
+            lines: product_id -> quantity ordered
+
+        Returns:
+            None on success, or the ID of the first product without enough stock
+        """
+        reservations = InventoryService._lock_reservations(lines, cart_id, None)
+        failed = InventoryService._move_stock(InventoryService._deltas(lines, reservations, lines))
+        if failed is not None:
+            return failed
+
+        InventoryService._owner_query(cart_id, None).delete(synchronize_session=False)
+        return None
+
+    @staticmethod
+    def release_expired(limit: int = 500, now: Optional[datetime] = None) -> Dict:
+        """
+        Give back the stock of up to `limit` expired reservations and commit
+
+        Reservations of user carts are kept as 'expired' (the cart line still
+        exists and is reserved again at checkout); guest reservations are deleted.
+
+        Returns:
+            Dict with 'reservations', 'units' and 'product_ids' released
+        """
+        now = now or datetime.utcnow()
+        try:
+            expired = StockReservation.query.filter(
+                StockReservation.status == 'active',
+                StockReservation.expires_at <= now
+            ).order_by(StockReservation.expires_at).limit(limit).with_for_update(skip_locked=True).all()
+
+            units_by_product = {}
+            for reservation in expired:
+                units_by_product[reservation.product_id] = units_by_product.get(reservation.product_id, 0) + reservation.quantity
+                if reservation.cart_id is not None:
+                    reservation.status = 'expired'
+                else:
+                    db.session.delete(reservation)
+
+            for product_id in sorted(units_by_product):
+                if units_by_product[product_id]:
+                    InventoryService.increment(product_id, units_by_product[product_id])
+
+            if units_by_product:
+                catalog_service.invalidate_on_commit(list(units_by_product))
+            db.session.commit()
+
+            return {
+                'reservations': len(expired),
+                'units': sum(units_by_product.values()),
+                'product_ids': sorted(units_by_product)
+            }
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error releasing expired reservations: {str(e)}")
+            raise
+
+    @staticmethod
+    def release_stale_cart_lines(cutoff: datetime, limit: int = 500) -> Dict:
+        """
+        Give back the stock of up to `limit` cart lines without a reservation
+        (created before reservations existed) whose cart is idle since `cutoff`,
+        and commit
+
+        An 'expired' reservation is recorded for each line so its stock is not
+        returned twice and is reserved again at checkout.
+
+        Returns:
+            Dict with 'lines', 'units' and 'product_ids' released
+        """
+        try:
+            lines = db.session.query(CartItem.cart_id, CartItem.product_id, db.func.sum(CartItem.quantity)).join(
+                Cart, Cart.id == CartItem.cart_id
+            ).outerjoin(
+                StockReservation,
+                (StockReservation.cart_id == CartItem.cart_id) & (StockReservation.product_id == CartItem.product_id)
+            ).filter(
+                Cart.updated_at < cutoff,
+                StockReservation.id.is_(None)
+            ).group_by(CartItem.cart_id, CartItem.product_id).order_by(CartItem.cart_id).limit(limit).all()
+
+            now = datetime.utcnow()
+            units_by_product = {}
+            for cart_id, product_id, quantity in lines:
+                quantity = int(quantity or 0)
+                units_by_product[product_id] = units_by_product.get(product_id, 0) + quantity
+                db.session.add(StockReservation(
+                    product_id=product_id, quantity=quantity, cart_id=cart_id,
+                    status='expired', expires_at=now
+                ))
+
+            for product_id in sorted(units_by_product):
+                if units_by_product[product_id]:
+                    InventoryService.increment(product_id, units_by_product[product_id])
+
+            if units_by_product:
+                catalog_service.invalidate_on_commit(list(units_by_product))
+            db.session.commit()
+
+            return {
+                'lines': len(lines),
+                'units': sum(units_by_product.values()),
+                'product_ids': sorted(units_by_product)
+            }
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error releasing stale cart lines: {str(e)}")
+            raise
+
+
+# Singleton instance
+inventory_service = InventoryService()
@@ -0,0 +1,288 @@
+"""
+Location Ingest
+Asynchronous pipeline for driver location pings: enqueue in the request, enrich and persist in batches
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from Config.db import db
+from Config.models.order import Order
+from Config.models.order_tracking import DeliveryTracking
+from Config.services.breadcrumb_service import breadcrumb_service
+from Config.services.eta_estimator import eta_estimator
+from Config.services.event_broker import event_broker
+from Config.services.geocode_cache import geocode_cache
+from Config.services.google_maps_service import google_maps_service
+from Config.services.notification_service import notification_service
+from Config.services.spatial_index import spatial_index
+
+
+class LocationIngest:
+    """
+    Queue of driver pings processed by a pool of worker threads
+
+    Pings are coalesced per order: while a ping waits in the queue, newer
+    pings of the same order replace it, so each batch handles at most one
+    ping per delivery no matter how often drivers report. A batch loads all
+    its tracking rows with one query, runs the local geocode/ETA enrichment
+    (no external calls: remote ETAs and addresses come from EtaRefresher),
+    appends the points to the compact breadcrumb segments (see
+    BreadcrumbService) and commits once. If the batch fails, its pings are
+    retried one per transaction, so a bad row only loses its own position.
+    The new positions are then pushed to the SSE streams through the event
+    broker. Each position also moves
+    the delivery in the spatial index once the batch commits; the geofence
+    events it crosses are published and, on arrival at the destination,
+    notified to the customer.
+
+    The queue lives in the process memory: pings still queued when the
+    process stops are lost, which only delays the next position update.
+    """
+
+    WORKERS = int(os.getenv('LOCATION_INGEST_WORKERS', 2))
+    BATCH_SIZE = int(os.getenv('LOCATION_INGEST_BATCH_SIZE', 500))
+    FLUSH_INTERVAL = float(os.getenv('LOCATION_INGEST_FLUSH_INTERVAL', 0.5))  # seconds
+    MAX_PENDING = int(os.getenv('LOCATION_INGEST_MAX_PENDING', 50000))  # distinct orders queued
+
+    def __init__(self):
+        self._pending = {}  # order_id -> latest ping (dict preserves arrival order)
+        self._inflight = set()  # orders being processed by a worker
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._workers = []
+        self._app = None
+        self.received = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch_ms = 0.0
+
+    def enqueue(self, order_id: int, latitude: float, longitude: float,
+                user_id: Optional[int] = None) -> bool:
+        """
+        Queue a ping for asynchronous processing
+
+        Returns:
+            False if the queue is full (the caller should ask to retry later)
+        """
+        ping = {
+            'order_id': order_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'user_id': user_id,
+            'received_at': datetime.utcnow()
+        }
+        with self._lock:
+            if order_id in self._pending:
+                self.coalesced += 1
+            elif len(self._pending) >= self.MAX_PENDING:
+                self.rejected += 1
+                return False
+            self._pending[order_id] = ping
+            self.received += 1
+            if len(self._pending) >= self.BATCH_SIZE:
+                self._wakeup.set()
+        return True
+
+    def _take_batch(self) -> List[Dict]:
+        """Pop up to BATCH_SIZE pings, skipping orders another worker is still writing"""
+        with self._lock:
+            order_ids = []
+            for order_id in self._pending:
+                if order_id not in self._inflight:
+                    order_ids.append(order_id)
+                    if len(order_ids) >= self.BATCH_SIZE:
+                        break
+            self._inflight.update(order_ids)
+            return [self._pending.pop(order_id) for order_id in order_ids]
+
+    def _release_batch(self, batch: List[Dict]) -> None:
+        with self._lock:
+            self._inflight.difference_update(ping['order_id'] for ping in batch)
+
+    def process_batch(self, pings: List[Dict]) -> int:
+        """
+        Enrich and persist a batch of pings (one per order) and commit
+
+        Must be called inside an application context.
+
+        Returns:
+            Number of pings applied to an active tracking
+        """
+        if not pings:
+            return 0
+
+        trackings = {
+            tracking.order_id: tracking for tracking in DeliveryTracking.query.filter(
+                DeliveryTracking.order_id.in_([ping['order_id'] for ping in pings]),
+                DeliveryTracking.is_active == True
+            ).all()
+        }
+
+        # Recargar el índice antes de tocar las filas: después leería posiciones sin commit
+        spatial_index.ensure_loaded()
+
+        now = datetime.now()
+        accepted = []
+        near = []
+        arrived = []
+        for ping in pings:
+            tracking = trackings.get(ping['order_id'])
+            if tracking is None:
+                continue
+
+            latitude, longitude = ping['latitude'], ping['longitude']
+            tracking.current_latitude = latitude
+            tracking.current_longitude = longitude
+
+            # Solo datos locales: las llamadas remotas (Distance Matrix, que también llena la
+            # caché de direcciones) las hace eta_refresher por lotes, fuera de esta transacción
+            _, address = geocode_cache.get_reverse(latitude, longitude)
+            if address:
+                tracking.current_address = address
+
+            estimate = eta_estimator.update_tracking(tracking, latitude, longitude, allow_remote=False)
+            if estimate and google_maps_service.is_near_delivery(estimate['distance_km']):
+                near.append((tracking.order_id, max(1, int(estimate['duration_minutes']))))
+
+            tracking.last_updated = now
+            accepted.append(ping)
+
+            data = {'order_id': tracking.order_id, 'tracking': tracking.to_dict()}
+            event_broker.publish_on_commit(f'order:{tracking.order_id}', 'location', data)
+            event_broker.publish_on_commit('orders', 'location', data)
+
+            # El índice se mueve al hacer commit: si falla, el siguiente ping vuelve a emitir la entrada
+            spatial_index.update_on_commit(
+                tracking.order_id, latitude, longitude,
+                tracking.destination_latitude, tracking.destination_longitude,
+                {'driver_name': tracking.driver_name, 'driver_phone': tracking.driver_phone,
+                 'vehicle_info': tracking.vehicle_info}
+            )
+            for fence_event in spatial_index.preview(
+                tracking.order_id, latitude, longitude,
+                tracking.destination_latitude, tracking.destination_longitude
+            ):
+                event_broker.publish_on_commit(f'order:{tracking.order_id}', 'geofence', fence_event)
+                event_broker.publish_on_commit('orders', 'geofence', fence_event)
+                if fence_event['fence'] == 'arrival' and fence_event['event'] == 'enter':
+                    arrived.append(tracking.order_id)
+
+        # Los pings van al recorrido comprimido; order_status_history queda para cambios de estado
+        breadcrumb_service.record_pings(accepted)
+
+        if near or arrived:
+            # Las notificaciones viajan en la misma transacción (un INSERT, con throttling por pedido)
+            owners = dict(db.session.query(Order.id, Order.user_id).filter(
+                Order.id.in_([order_id for order_id, _ in near] + arrived)
+            ).all())
+            notification_service.queue_notifications([
+                notification_service.build_notification(owners[order_id], order_id, 'near_delivery', minutes=minutes)
+                for order_id, minutes in near if order_id in owners
+            ] + [
+                notification_service.build_notification(owners[order_id], order_id, 'driver_arrived')
+                for order_id in arrived if order_id in owners
+            ])
+
+        db.session.commit()
+        return len(accepted)
+
+    def process(self, pings: List[Dict]) -> Tuple[int, int]:
+        """
+        Process a batch, retrying its pings one per transaction if it fails
+
+        Must be called inside an application context.
+
+        Returns:
+            (pings written, pings that failed)
+        """
+        try:
+            return self.process_batch(pings), 0
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error processing location batch, retrying per ping: {str(e)}")
+
+        written = failed = 0
+        for ping in pings:
+            try:
+                written += self.process_batch([ping])
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                print(f"Error processing location of order {ping['order_id']}: {str(e)}")
+        return written, failed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            while not self._stop.is_set():
+                batch = self._take_batch()
+                if not batch:
+                    break
+                started = time.perf_counter()
+                with self._app.app_context():
+                    try:
+                        written, failed = self.process(batch)
+                        with self._lock:
+                            self.processed += written
+                            self.batches += 1
+                            self.errors += failed
+                    finally:
+                        db.session.remove()
+                        self._release_batch(batch)
+                self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    def start(self, app, workers: Optional[int] = None) -> None:
+        """Start the worker threads (no-op if already running)"""
+        with self._lock:
+            if any(worker.is_alive() for worker in self._workers):
+                return
+            self._app = app
+            self._stop.clear()
+            self._workers = [
+                threading.Thread(target=self._run, name=f'location-ingest-{i}', daemon=True)
+                for i in range(workers or self.WORKERS)
+            ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after draining the queue"""
+        self._stop.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        if self._app is not None and self._pending:
+            with self._app.app_context():
+                while True:
+                    batch = self._take_batch()
+                    if not batch:
+                        break
+                    self.processed += self.process_batch(batch)
+                    self._release_batch(batch)
+                db.session.remove()
+
+    def stats(self) -> Dict:
+        return {
+            'queued': len(self._pending),
+            'received': self.received,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'processed': self.processed,
+            'batches': self.batches,
+            'errors': self.errors,
+            'last_batch_ms': round(self.last_batch_ms, 2),
+            'workers': sum(1 for worker in self._workers if worker.is_alive())
+        }
+
+
+# Singleton instance
+location_ingest = LocationIngest()
@@ -3,15 +3,161 @@ Notification Service
 Manages order notifications for tracking updates
 """
 
-from datetime import datetime
-from typing import Optional
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, case, event, insert, inspect, select
+from sqlalchemy.exc import IntegrityError
 from Config.db import db
-from Config.models.order_tracking import OrderNotification
+from Config.models.order_tracking import NotificationCounter, OrderNotification
 from Config.google_maps_config import GoogleMapsConfig
+from Config.services.cache import TTLCache
+from Config.services.event_broker import event_broker
 
 
 class NotificationService:
-    """Service for managing order notifications"""
+    """
+    Service for managing order notifications
+    
+    Notifications can be queued on the current transaction
+    (queue_notification / queue_notifications): all the rows queued until
+    the commit are written with one multi-row INSERT right before it, so a
+    batch of status changes costs one statement however many users it
+    notifies. Types listed in THROTTLE_SECONDS (e.g. near_delivery, which
+    every ping inside the threshold would trigger) are sent at most once
+    per user and order within their window; the check is one query per
+    batch, backed by an in-process cache of recently sent keys.
+    
+    Unread counts come from notification_counters, which every change
+    (inserts, reads, deletes) adjusts in the same transaction. A user's
+    row is created from one COUNT the first time it is read, and reads
+    are cached in memory for UNREAD_CACHE_TTL seconds (evicted in this
+    process when the count changes).
+    """
+    
+    THROTTLE_SECONDS = {
+        'near_delivery': int(os.getenv('NOTIFY_NEAR_DELIVERY_INTERVAL', 1800)),
+        'driver_arrived': int(os.getenv('NOTIFY_DRIVER_ARRIVED_INTERVAL', 1800)),
+        'location_update': int(os.getenv('NOTIFY_LOCATION_UPDATE_INTERVAL', 300))
+    }
+    
+    UNREAD_CACHE_TTL = int(os.getenv('UNREAD_COUNT_CACHE_TTL', 30))
+    
+    _recent = TTLCache(maxsize=50000, ttl=None)  # (user_id, order_id, type) enviados recientemente
+    _unread = TTLCache(maxsize=50000, ttl=UNREAD_CACHE_TTL)
+    
+    @staticmethod
+    def build_notification(user_id: int, order_id: int, notification_type: str, **kwargs) -> Dict:
+        """
+        Build the row of a notification without writing it
+        
+        Args:
+            user_id: ID of the user to notify
+            order_id: ID of the order
+            notification_type: Type of notification (see GoogleMapsConfig.NOTIFICATION_TEMPLATES)
+            **kwargs: Additional parameters for message template
+        """
+        message = GoogleMapsConfig.get_notification_message(
+            notification_type,
+            order_id=order_id,
+            **kwargs
+        )
+        
+        if not message:
+            message = f"Actualización del pedido #{order_id}"
+        
+        return {
+            'user_id': user_id,
+            'order_id': order_id,
+            'message': message[:500],
+            'type': notification_type,
+            'is_read': False,
+            'created_at': datetime.utcnow()
+        }
+    
+    @staticmethod
+    def _key(row: Dict) -> tuple:
+        return (row['user_id'], row['order_id'], row['type'])
+    
+    @staticmethod
+    def _filter_throttled(rows: List[Dict], pending: List[Dict] = ()) -> List[Dict]:
+        """Drop repeated rows and throttled types sent within their window"""
+        skip = {NotificationService._key(row) for row in pending}
+        unique = {}
+        for row in rows:
+            key = NotificationService._key(row)
+            if key not in skip:
+                unique.setdefault(key, row)
+        
+        throttled = [key for key in unique if NotificationService.THROTTLE_SECONDS.get(key[2])]
+        unknown = [key for key in throttled if not NotificationService._recent.get(key)]
+        skip.update(key for key in throttled if key not in unknown)
+        
+        if unknown:
+            # Una sola consulta para todo el lote: último envío de cada (usuario, pedido, tipo)
+            now = datetime.utcnow()
+            window = max(NotificationService.THROTTLE_SECONDS[key[2]] for key in unknown)
+            sent = db.session.query(
+                OrderNotification.user_id, OrderNotification.order_id,
+                OrderNotification.type, db.func.max(OrderNotification.created_at)
+            ).filter(
+                OrderNotification.order_id.in_({key[1] for key in unknown}),
+                OrderNotification.type.in_({key[2] for key in unknown}),
+                OrderNotification.created_at >= now - timedelta(seconds=window)
+            ).group_by(
+                OrderNotification.user_id, OrderNotification.order_id, OrderNotification.type
+            ).all()
+            for user_id, order_id, notification_type, last_sent in sent:
+                key = (user_id, order_id, notification_type)
+                remaining = NotificationService.THROTTLE_SECONDS[notification_type] - (now - last_sent).total_seconds()
+                if key in unique and remaining > 0:
+                    skip.add(key)
+                    NotificationService._recent.set(key, True, ttl=remaining)
+        
+        return [row for key, row in unique.items() if key not in skip]
+    
+    @staticmethod
+    def queue_notifications(rows: List[Dict]) -> int:
+        """
+        Queue notification rows (see build_notification) on the current transaction
+        
+        They are inserted with one statement when the transaction commits
+        and discarded if it rolls back.
+        
+        Returns:
+            Number of rows queued after deduplication and throttling
+        """
+        if not rows:
+            return 0
+        pending = db.session.info.setdefault('pending_notifications', [])
+        rows = NotificationService._filter_throttled(rows, pending)
+        pending.extend(rows)
+        return len(rows)
+    
+    @staticmethod
+    def queue_notification(user_id: int, order_id: int, notification_type: str, **kwargs) -> bool:
+        """Queue one notification on the current transaction (False if throttled)"""
+        return NotificationService.queue_notifications([
+            NotificationService.build_notification(user_id, order_id, notification_type, **kwargs)
+        ]) == 1
+    
+    @staticmethod
+    def create_notifications(rows: List[Dict]) -> int:
+        """
+        Write a batch of notification rows with one INSERT and commit
+        
+        Returns:
+            Number of notifications created (0 if error)
+        """
+        try:
+            count = NotificationService.queue_notifications(rows)
+            db.session.commit()
+            return count
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error creating notifications: {str(e)}")
+            return 0
     
     @staticmethod
     def create_notification(user_id: int, order_id: int, 
@@ -26,29 +172,20 @@ class NotificationService:
             **kwargs: Additional parameters for message template
             
         Returns:
-            Created notification or None if error
+            Created notification or None if throttled or error
         """
         try:
-            # Get message template
-            message = GoogleMapsConfig.get_notification_message(
-                notification_type,
-                order_id=order_id,
-                **kwargs
-            )
-            
-            if not message:
-                message = f"Actualización del pedido #{order_id}"
+            row = NotificationService.build_notification(user_id, order_id, notification_type, **kwargs)
+            if not NotificationService._filter_throttled([row], db.session.info.get('pending_notifications', ())):
+                return None
             
             # Create notification
-            notification = OrderNotification(
-                user_id=user_id,
-                order_id=order_id,
-                message=message,
-                notification_type=notification_type,
-                is_read=False
-            )
+            notification = OrderNotification(**row)
             
             db.session.add(notification)
+            db.session.flush()
+            event_broker.publish_on_commit(f'user:{user_id}', 'notification', notification.to_dict())
+            db.session.info.setdefault('sent_notifications', []).append(NotificationService._key(row))
             db.session.commit()
             
             return notification
@@ -153,25 +290,29 @@ class NotificationService:
             return []
     
     @staticmethod
-    def mark_as_read(notification_id: int) -> bool:
+    def mark_as_read(notification_id: int, user_id: Optional[int] = None) -> bool:
         """
         Mark a notification as read
         
         Args:
             notification_id: ID of the notification
+            user_id: Owner of the notification, if already known
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            notification = OrderNotification.query.get(notification_id)
-            
-            if notification:
-                notification.is_read = True
-                db.session.commit()
-                return True
+            if user_id is None:
+                user_id = db.session.query(OrderNotification.user_id).filter_by(id=notification_id).scalar()
+                if user_id is None:
+                    return False
             
-            return False
+            updated = OrderNotification.query.filter_by(id=notification_id, is_read=False).update(
+                {'is_read': True}, synchronize_session=False
+            )
+            NotificationService._apply_unread(db.session, {user_id: -updated})
+            db.session.commit()
+            return True
             
         except Exception as e:
             db.session.rollback()
@@ -196,11 +337,9 @@ class NotificationService:
             if order_id:
                 query = query.filter_by(order_id=order_id)
             
-            notifications = query.all()
-            
-            for notification in notifications:
-                notification.is_read = True
-            
+            # Un solo UPDATE, sin cargar las notificaciones
+            updated = query.update({'is_read': True}, synchronize_session=False)
+            NotificationService._apply_unread(db.session, {user_id: -updated})
             db.session.commit()
             return True
             
@@ -214,6 +353,9 @@ class NotificationService:
         """
         Get count of unread notifications for a user
         
+        Served from memory or the user's counter row; the notifications are
+        only counted the first time, to create that row.
+        
         Args:
             user_id: ID of the user
             
@@ -221,17 +363,56 @@ class NotificationService:
             Count of unread notifications
         """
         try:
-            count = OrderNotification.query.filter_by(
-                user_id=user_id,
-                is_read=False
-            ).count()
+            count = NotificationService._unread.get(user_id)
+            if count is not None:
+                return count
+            
+            table = NotificationCounter.__table__
+            with db.engine.begin() as connection:
+                count = connection.execute(
+                    select(table.c.unread).where(table.c.user_id == user_id)
+                ).scalar()
+                if count is None:
+                    notifications = OrderNotification.__table__
+                    connection.execute(table.insert().from_select(
+                        ['user_id', 'unread', 'updated_at'],
+                        select(
+                            db.literal(user_id), db.func.count(), db.literal(datetime.utcnow())
+                        ).where(notifications.c.user_id == user_id, notifications.c.is_read == False)
+                    ))
+                    count = connection.execute(
+                        select(table.c.unread).where(table.c.user_id == user_id)
+                    ).scalar()
             
+            NotificationService._unread.set(user_id, count)
             return count
             
+        except IntegrityError:
+            # Otra petición creó el contador al mismo tiempo
+            return db.session.query(NotificationCounter.unread).filter_by(user_id=user_id).scalar() or 0
         except Exception as e:
             print(f"Error getting unread count: {str(e)}")
             return 0
     
+    @staticmethod
+    def reset_unread_counters() -> int:
+        """
+        Drop every unread counter so each one is rebuilt on its next read
+        
+        Returns:
+            Number of counters removed
+        """
+        try:
+            removed = NotificationCounter.query.delete(synchronize_session=False)
+            db.session.commit()
+            NotificationService._unread.clear()
+            return removed
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error resetting unread counters: {str(e)}")
+            return 0
+    
     @staticmethod
     def delete_notification(notification_id: int) -> bool:
         """
@@ -258,6 +439,96 @@ class NotificationService:
             print(f"Error deleting notification: {str(e)}")
             return False
 
+    
+    @staticmethod
+    def _apply_unread(session, deltas: Dict) -> None:
+        """
+        Adjust the unread counters of some users in the current transaction
+        
+        Users without a counter row are skipped: their row is created from
+        a full count on the next read.
+        """
+        params = [{'uid': user_id, 'delta': delta} for user_id, delta in deltas.items() if delta]
+        if not params:
+            return
+        table = NotificationCounter.__table__
+        unread = table.c.unread + bindparam('delta')
+        session.connection().execute(
+            table.update().where(table.c.user_id == bindparam('uid')).values(
+                unread=case((unread < 0, 0), else_=unread),
+                updated_at=datetime.utcnow()
+            ),
+            params
+        )
+        session.info.setdefault('unread_changed', set()).update(deltas)
+    
+    @staticmethod
+    def on_after_flush(session, flush_context) -> None:
+        """Count unread notifications created, read or deleted through the ORM"""
+        deltas = {}
+        for obj in session.new:
+            if isinstance(obj, OrderNotification) and not obj.is_read:
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) + 1
+        for obj in session.deleted:
+            if isinstance(obj, OrderNotification):
+                history = inspect(obj).attrs.is_read.history
+                was_read = history.deleted[0] if history.deleted else obj.is_read
+                if not was_read:
+                    deltas[obj.user_id] = deltas.get(obj.user_id, 0) - 1
+        for obj in session.dirty:
+            if isinstance(obj, OrderNotification):
+                history = inspect(obj).attrs.is_read.history
+                if history.added and history.deleted and bool(history.added[0]) != bool(history.deleted[0]):
+                    deltas[obj.user_id] = deltas.get(obj.user_id, 0) + (-1 if history.added[0] else 1)
+        NotificationService._apply_unread(session, deltas)
+    
+    @staticmethod
+    def on_before_commit(session) -> None:
+        """Insert the queued notifications with one statement"""
+        rows = session.info.pop('pending_notifications', None)
+        if not rows:
+            return
+        session.execute(insert(OrderNotification), rows)
+        deltas = {}
+        for row in rows:
+            deltas[row['user_id']] = deltas.get(row['user_id'], 0) + 1
+        NotificationService._apply_unread(session, deltas)
+        for row in rows:
+            event_broker.publish_on_commit(f"user:{row['user_id']}", 'notification', {
+                'id': None,
+                'order_id': row['order_id'],
+                'message': row['message'],
+                'type': row['type'],
+                'is_read': False,
+                'created_at': row['created_at'].isoformat()
+            })
+        session.info.setdefault('sent_notifications', []).extend(NotificationService._key(row) for row in rows)
+    
+    @staticmethod
+    def on_after_commit(session) -> None:
+        """Remember throttled types once they are actually stored"""
+        for key in session.info.pop('sent_notifications', ()):
+            ttl = NotificationService.THROTTLE_SECONDS.get(key[2])
+            if ttl:
+                NotificationService._recent.set(key, True, ttl=ttl)
+        NotificationService._unread.delete_many(session.info.pop('unread_changed', ()))
+    
+    @staticmethod
+    def on_after_rollback(session) -> None:
+        session.info.pop('pending_notifications', None)
+        session.info.pop('sent_notifications', None)
+        session.info.pop('unread_changed', None)
+
+
+# active_history: cargar el valor anterior de is_read aunque la instancia esté expirada,
+# para que on_after_flush sepa si la notificación cambió de estado
+event.listen(OrderNotification.is_read, 'set', lambda target, value, oldvalue, initiator: value,
+             active_history=True, retval=True)
+event.listen(db.session, 'after_flush', NotificationService.on_after_flush)
+event.listen(db.session, 'before_commit', NotificationService.on_before_commit)
+event.listen(db.session, 'after_commit', NotificationService.on_after_commit)
+event.listen(db.session, 'after_rollback', NotificationService.on_after_rollback)
+
 
 # Singleton instance
 notification_service = NotificationService()
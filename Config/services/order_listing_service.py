@@ -0,0 +1,239 @@
+"""
+Order Listing Service
+Keyset-paginated, filterable order listings for the admin and employee consoles
+"""
+
+import base64
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload, selectinload
+from Config.db import db
+from Config.models.order import Order
+from Config.models.order_item import OrderItem
+
+
+class OrderListingService:
+    """Service for listing orders with cursor pagination and eager loading"""
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
+    # Columns that can drive the keyset (always paired with Order.id)
+    SORT_COLUMNS = {
+        'created_at': Order.created_at,
+        'updated_at': Order.updated_at
+    }
+
+    FIELD_SETS = ('compact', 'summary', 'full')
+
+    STATUS_DISPLAY = {
+        'pending': 'Pendiente',
+        'processing': 'En Proceso',
+        'shipped': 'Enviado',
+        'in_transit': 'En Tránsito',
+        'delivered': 'Entregado',
+        'cancelled': 'Cancelado'
+    }
+
+    @staticmethod
+    def encode_cursor(sort_value: Optional[datetime], order_id: int) -> str:
+        """Build an opaque cursor from the last row of a page"""
+        raw = f"{sort_value.isoformat() if sort_value else ''}|{order_id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """
+        Parse a cursor produced by encode_cursor
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            sort_value, order_id = raw.rsplit('|', 1)
+            return (datetime.fromisoformat(sort_value) if sort_value else None), int(order_id)
+        except Exception:
+            raise ValueError('Cursor inválido')
+
+    @staticmethod
+    def apply_filters(query, statuses: Optional[List[str]] = None,
+                      date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      customer_id: Optional[int] = None):
+        """Apply status/date/customer filters to an Order query"""
+        if statuses:
+            query = query.filter(Order.status.in_(statuses))
+        if date_from:
+            query = query.filter(Order.created_at >= date_from)
+        if date_to:
+            query = query.filter(Order.created_at < date_to)
+        if customer_id:
+            query = query.filter(Order.user_id == customer_id)
+        return query
+
+    @staticmethod
+    def status_counts(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      customer_id: Optional[int] = None) -> Dict:
+        """
+        Count orders per status with a single GROUP BY
+
+        Returns:
+            Dict of status -> count plus a 'total' key
+        """
+        query = db.session.query(Order.status, func.count(Order.id))
+        query = OrderListingService.apply_filters(
+            query, date_from=date_from, date_to=date_to, customer_id=customer_id
+        )
+        counts = {status: count for status, count in query.group_by(Order.status).all()}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    @staticmethod
+    def _serialize(order: Order, fields: str, items_counts: Dict) -> Dict:
+        if fields == 'full':
+            return order.to_dict()
+
+        data = {
+            'id': order.id,
+            'user_id': order.user_id,
+            'order_number': order.order_number,
+            'status': order.status,
+            'status_display': OrderListingService.STATUS_DISPLAY.get(order.status, (order.status or '').title()),
+            'total_amount': float(order.total_amount) if order.total_amount is not None else 0,
+            'total_amount_cop': int(round(order.total_amount)) if order.total_amount is not None else 0,
+            'created_at': order.created_at.isoformat() if order.created_at else None,
+            'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+            'user_name': order.user.name if order.user else None
+        }
+
+        if fields == 'summary':
+            data.update({
+                'subtotal': order.subtotal,
+                'subtotal_cop': int(round(order.subtotal)) if order.subtotal is not None else 0,
+                'shipping_cost': order.shipping_cost,
+                'shipping_cost_cop': int(round(order.shipping_cost)) if order.shipping_cost is not None else 0,
+                'tax_amount': order.tax_amount,
+                'tax_amount_cop': int(round(order.tax_amount)) if order.tax_amount is not None else 0,
+                'shipping_address': order.shipping_address,
+                'payment_method': order.payment_method,
+                'notes': order.notes,
+                'user_email': order.user.email if order.user else None,
+                'items_count': items_counts.get(order.id, 0)
+            })
+
+        return data
+
+    @staticmethod
+    def list_orders(cursor: Optional[str] = None, limit: int = DEFAULT_LIMIT,
+                    sort: str = 'created_at', fields: str = 'summary',
+                    statuses: Optional[List[str]] = None,
+                    date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                    customer_id: Optional[int] = None) -> Dict:
+        """
+        Get one page of orders, newest first, using keyset pagination
+
+        Args:
+            cursor: Opaque cursor returned as 'next_cursor' by the previous page
+            limit: Page size (capped at MAX_LIMIT)
+            sort: 'created_at' or 'updated_at'
+            fields: 'compact', 'summary' or 'full' (full includes items)
+            statuses: Optional list of statuses to include
+            date_from: Optional lower bound for created_at
+            date_to: Optional exclusive upper bound for created_at
+            customer_id: Optional user ID
+
+        Returns:
+            Dict with 'orders' and 'pagination' ('next_cursor', 'has_more', 'limit')
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        limit = max(1, min(limit, OrderListingService.MAX_LIMIT))
+        if fields not in OrderListingService.FIELD_SETS:
+            fields = 'summary'
+        sort_column = OrderListingService.SORT_COLUMNS.get(sort, Order.created_at)
+
+        query = Order.query.options(joinedload(Order.user))
+        if fields == 'full':
+            query = query.options(selectinload(Order.items).joinedload(OrderItem.product))
+
+        query = OrderListingService.apply_filters(query, statuses, date_from, date_to, customer_id)
+
+        if cursor:
+            last_value, last_id = OrderListingService.decode_cursor(cursor)
+            if last_value is None:
+                query = query.filter(and_(sort_column.is_(None), Order.id < last_id))
+            else:
+                query = query.filter(or_(
+                    sort_column < last_value,
+                    and_(sort_column == last_value, Order.id < last_id),
+                    sort_column.is_(None)
+                ))
+
+        # Fetch one extra row to know whether another page exists
+        orders = query.order_by(sort_column.desc(), Order.id.desc()).limit(limit + 1).all()
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+
+        items_counts = {}
+        if fields == 'summary' and orders:
+            items_counts = dict(
+                db.session.query(OrderItem.order_id, func.count(OrderItem.id)).filter(
+                    OrderItem.order_id.in_([o.id for o in orders])
+                ).group_by(OrderItem.order_id).all()
+            )
+
+        next_cursor = None
+        if has_more:
+            last = orders[-1]
+            next_cursor = OrderListingService.encode_cursor(getattr(last, sort_column.key), last.id)
+
+        return {
+            'orders': [OrderListingService._serialize(o, fields, items_counts) for o in orders],
+            'pagination': {
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'limit': limit
+            }
+        }
+
+    @staticmethod
+    def parse_request_args(args, **defaults) -> Dict:
+        """
+        Translate request query parameters into list_orders keyword arguments
+
+        Supported parameters: cursor, limit, sort, fields, status (comma separated),
+        date_from / date_to (ISO dates) and customer_id.
+
+        Raises:
+            ValueError: If a date is malformed
+        """
+        options = dict(defaults)
+
+        if args.get('cursor'):
+            options['cursor'] = args.get('cursor')
+        if args.get('limit'):
+            options['limit'] = args.get('limit', type=int) or OrderListingService.DEFAULT_LIMIT
+        if args.get('sort'):
+            options['sort'] = args.get('sort')
+        if args.get('fields'):
+            options['fields'] = args.get('fields')
+        if args.get('status'):
+            options['statuses'] = [s.strip() for s in args.get('status').split(',') if s.strip()]
+        if args.get('customer_id'):
+            options['customer_id'] = args.get('customer_id', type=int)
+
+        try:
+            if args.get('date_from'):
+                options['date_from'] = datetime.fromisoformat(args.get('date_from'))
+            if args.get('date_to'):
+                options['date_to'] = datetime.fromisoformat(args.get('date_to'))
+        except ValueError:
+            raise ValueError('Fecha inválida, use el formato YYYY-MM-DD')
+
+        return options
+
+
+# Singleton instance
+order_listing_service = OrderListingService()
@@ -0,0 +1,169 @@
+"""
+Reporting Service
+Computes employee sales reports with grouped SQL aggregates
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import case, func
+from Config.db import db
+from Config.models.order import Order
+from Config.models.order_item import OrderItem
+from Config.models.product import Product
+
+
+class ReportingService:
+    """Service for building sales reports without loading ORM instances"""
+
+    @staticmethod
+    def sales_by_day_and_status(start_date: datetime) -> List[Tuple]:
+        """
+        Aggregate orders per day and status since a date
+
+        Args:
+            start_date: Lower bound for Order.created_at
+
+        Returns:
+            List of (day, status, orders_count, total_amount) tuples
+        """
+        day = func.date(Order.created_at)
+        return db.session.query(
+            day,
+            Order.status,
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_amount), 0)
+        ).filter(
+            Order.created_at >= start_date
+        ).group_by(day, Order.status).order_by(day).all()
+
+    @staticmethod
+    def top_products(start_date: datetime, limit: int = 5) -> List[Tuple]:
+        """
+        Best selling products by revenue since a date
+
+        Args:
+            start_date: Lower bound for Order.created_at
+            limit: Maximum number of products
+
+        Returns:
+            List of (product_id, product_name, quantity, revenue) tuples
+        """
+        revenue = func.sum(OrderItem.total_price)
+        return db.session.query(
+            OrderItem.product_id,
+            Product.name,
+            func.sum(OrderItem.quantity),
+            revenue
+        ).join(
+            Order, Order.id == OrderItem.order_id
+        ).outerjoin(
+            Product, Product.id == OrderItem.product_id
+        ).filter(
+            Order.created_at >= start_date
+        ).group_by(
+            OrderItem.product_id, Product.name
+        ).order_by(revenue.desc()).limit(limit).all()
+
+    @staticmethod
+    def get_period_report(days: int = 30) -> Dict:
+        """
+        Build the data for /employee/reports-data
+
+        Args:
+            days: Size of the reporting window in days
+
+        Returns:
+            Dict with 'stats', 'top_products' and 'sales_timeline'
+        """
+        start_date = datetime.utcnow() - timedelta(days=days)
+
+        timeline = {}
+        status_counts = {}
+        total_orders = 0
+        total_sales = 0.0
+
+        for day, status, count, amount in ReportingService.sales_by_day_and_status(start_date):
+            # SQLite returns 'YYYY-MM-DD' strings, MySQL returns date objects
+            day_key = str(day)[:10]
+            bucket = timeline.setdefault(day_key, {'count': 0, 'total': 0.0})
+            bucket['count'] += count
+            bucket['total'] += float(amount)
+            status_counts[status] = status_counts.get(status, 0) + count
+            total_orders += count
+            total_sales += float(amount)
+
+        top_products = [{
+            'id': product_id,
+            'name': name or 'Producto eliminado',
+            'quantity': int(quantity or 0),
+            'revenue': float(revenue or 0)
+        } for product_id, name, quantity, revenue in ReportingService.top_products(start_date)]
+
+        return {
+            'stats': {
+                'total_orders': total_orders,
+                'total_sales': total_sales,
+                'completed_orders': status_counts.get('delivered', 0),
+                'pending_orders': status_counts.get('pending', 0),
+                'avg_order_value': total_sales / total_orders if total_orders > 0 else 0,
+                'period_days': days
+            },
+            'top_products': top_products,
+            'sales_timeline': [
+                {'date': day_key, 'count': v['count'], 'total': v['total']}
+                for day_key, v in sorted(timeline.items())
+            ]
+        }
+
+    @staticmethod
+    def get_month_over_month(current_date: datetime = None) -> Dict:
+        """
+        Compare sales of the current month with the previous month in one query
+
+        Args:
+            current_date: Reference date (defaults to now)
+
+        Returns:
+            Dict with 'this_month', 'last_month' and 'growth'
+        """
+        if current_date is None:
+            current_date = datetime.utcnow()
+
+        first_day_of_month = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        if first_day_of_month.month == 1:
+            first_day_last_month = first_day_of_month.replace(year=first_day_of_month.year - 1, month=12)
+        else:
+            first_day_last_month = first_day_of_month.replace(month=first_day_of_month.month - 1)
+
+        is_this_month = Order.created_at >= first_day_of_month
+        row = db.session.query(
+            func.coalesce(func.sum(case((is_this_month, Order.total_amount), else_=0)), 0),
+            func.count(case((is_this_month, Order.id))),
+            func.coalesce(func.sum(case((is_this_month, 0), else_=Order.total_amount)), 0),
+            func.count(case((is_this_month, None), else_=Order.id))
+        ).filter(Order.created_at >= first_day_last_month).one()
+
+        this_month_sales, this_month_orders = float(row[0]), int(row[1])
+        last_month_sales, last_month_orders = float(row[2]), int(row[3])
+
+        sales_growth = ((this_month_sales - last_month_sales) / last_month_sales * 100) if last_month_sales > 0 else 0
+        orders_growth = ((this_month_orders - last_month_orders) / last_month_orders * 100) if last_month_orders > 0 else 0
+
+        return {
+            'this_month': {
+                'sales': this_month_sales,
+                'orders': this_month_orders
+            },
+            'last_month': {
+                'sales': last_month_sales,
+                'orders': last_month_orders
+            },
+            'growth': {
+                'sales': sales_growth,
+                'orders': orders_growth
+            }
+        }
+
+
+# Singleton instance
+reporting_service = ReportingService()
@@ -0,0 +1,143 @@
+"""
+Reservation Sweeper
+Background job that returns the stock of abandoned carts to the inventory
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from Config.db import db
+from Config.models.inventory import ReservationSweepRun
+from Config.services.inventory_service import inventory_service
+
+
+class ReservationSweeper:
+    """
+    Periodically releases expired stock reservations
+
+    Each batch is its own short transaction of at most `batch_size` rows, so
+    a large backlog is drained over several batches (and, past `max_batches`,
+    over several runs) without holding long locks on the products or
+    reservations tables. Every run is recorded in reservation_sweep_runs.
+
+    It can run as a daemon thread inside the web process (start()) or as a
+    separate worker process (run_reservation_sweeper.py).
+    """
+
+    DEFAULT_INTERVAL = int(os.getenv('RESERVATION_SWEEP_INTERVAL', 60))  # seconds
+    DEFAULT_BATCH_SIZE = int(os.getenv('RESERVATION_SWEEP_BATCH_SIZE', 500))
+    DEFAULT_MAX_BATCHES = int(os.getenv('RESERVATION_SWEEP_MAX_BATCHES', 20))
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_once(self, batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                 now: Optional[datetime] = None) -> Dict:
+        """
+        Release expired reservations and idle legacy cart lines
+
+        Must be called inside an application context.
+
+        Args:
+            batch_size: Rows released per transaction
+            max_batches: Upper bound of batches per run (the rest waits for the next run)
+            now: Reference time (defaults to the current UTC time)
+
+        Returns:
+            Metrics of the run (see ReservationSweepRun.to_dict)
+        """
+        batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        max_batches = max_batches or self.DEFAULT_MAX_BATCHES
+        now = now or datetime.utcnow()
+        legacy_cutoff = now - timedelta(minutes=inventory_service.RESERVATION_MINUTES)
+
+        run = ReservationSweepRun(
+            started_at=datetime.utcnow(), batches=0, reservations_released=0,
+            legacy_lines_released=0, units_released=0
+        )
+        product_ids = set()
+
+        try:
+            while run.batches < max_batches:
+                result = inventory_service.release_expired(limit=batch_size, now=now)
+                run.batches += 1
+                run.reservations_released += result['reservations']
+                run.units_released += result['units']
+                product_ids.update(result['product_ids'])
+                if result['reservations'] < batch_size:
+                    break
+
+            while run.batches < max_batches:
+                result = inventory_service.release_stale_cart_lines(legacy_cutoff, limit=batch_size)
+                run.batches += 1
+                run.legacy_lines_released += result['lines']
+                run.units_released += result['units']
+                product_ids.update(result['product_ids'])
+                if result['lines'] < batch_size:
+                    break
+
+        except Exception as e:
+            run.error = str(e)
+
+        run.products_affected = len(product_ids)
+        run.finished_at = datetime.utcnow()
+
+        try:
+            db.session.add(run)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving reservation sweep run: {str(e)}")
+
+        return run.to_dict()
+
+    def recent_runs(self, limit: int = 20) -> List[Dict]:
+        """Metrics of the latest runs, newest first"""
+        runs = ReservationSweepRun.query.order_by(ReservationSweepRun.started_at.desc()).limit(limit).all()
+        return [run.to_dict() for run in runs]
+
+    def _loop(self, app, interval: int) -> None:
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Error in reservation sweeper: {str(e)}")
+                finally:
+                    db.session.remove()
+            self._stop.wait(interval)
+
+    def start(self, app, interval: Optional[int] = None) -> bool:
+        """
+        Start the sweeper in a daemon thread
+
+        Args:
+            app: Flask application (used to open an app context per run)
+            interval: Seconds between runs
+
+        Returns:
+            False if it was already running
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return False
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(app, interval or self.DEFAULT_INTERVAL),
+            name='reservation-sweeper', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread after the current run"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Singleton instance
+reservation_sweeper = ReservationSweeper()
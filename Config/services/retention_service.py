@@ -0,0 +1,298 @@
+"""
+Retention Service
+Moves old read notifications and the history of closed orders out of the hot tables into compressed archive chunks
+"""
+
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from Config.db import db
+from Config.models.archive import ArchiveChunk, RetentionRun
+from Config.models.order import Order
+from Config.models.order_tracking import OrderNotification, OrderStatusHistory
+
+
+class RetentionService:
+    """
+    Periodic archival of order_notifications and order_status_history
+
+    Read notifications older than NOTIFICATION_RETENTION_DAYS, and the
+    status history of delivered/cancelled orders closed more than
+    STATUS_HISTORY_RETENTION_DAYS ago, are copied into archive_chunks and
+    deleted from the hot tables. Rows are grouped per order (and recipient)
+    and stored as zlib-compressed JSON Lines, so an archived order takes one
+    small row per batch instead of one row per event.
+
+    Each batch is its own transaction of at most `batch_size` rows (copy and
+    delete commit together), and every run is recorded in retention_runs.
+    Unread notifications are never archived, so the unread counters are not
+    affected. Archived rows can still be read with get_archive().
+
+    It can run as a daemon thread inside the web process (start()) or as a
+    separate worker process (run_retention.py).
+    """
+
+    NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+    STATUS_HISTORY_RETENTION_DAYS = int(os.getenv('STATUS_HISTORY_RETENTION_DAYS', 180))
+    DEFAULT_INTERVAL = int(os.getenv('RETENTION_INTERVAL', 3600))  # seconds
+    DEFAULT_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 1000))
+    DEFAULT_MAX_BATCHES = int(os.getenv('RETENTION_MAX_BATCHES', 50))
+
+    CLOSED_STATUSES = ('delivered', 'cancelled')
+    KINDS = ('notification', 'status_history')
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _pack(rows: List[Dict]) -> bytes:
+        lines = '\n'.join(json.dumps(row, separators=(',', ':'), default=str) for row in rows)
+        return zlib.compress(lines.encode('utf-8'), 9)
+
+    @staticmethod
+    def _unpack(payload: bytes) -> List[Dict]:
+        text = zlib.decompress(payload).decode('utf-8')
+        return [json.loads(line) for line in text.split('\n') if line]
+
+    @staticmethod
+    def _chunk_rows(kind: str, groups: Dict, now: datetime) -> List[Dict]:
+        chunks = []
+        for (order_id, user_id), rows in groups.items():
+            chunks.append({
+                'kind': kind,
+                'order_id': order_id,
+                'user_id': user_id,
+                'row_count': len(rows),
+                'first_created_at': min(row['_created_at'] for row in rows),
+                'last_created_at': max(row['_created_at'] for row in rows),
+                'payload': RetentionService._pack([
+                    {name: value for name, value in row.items() if name != '_created_at'} for row in rows
+                ]),
+                'archived_at': now
+            })
+        return chunks
+
+    @staticmethod
+    def _archive(kind: str, model, columns: List, rows: List, owner_column: Optional[str],
+                 now: datetime) -> Dict:
+        """Copy a batch of rows into archive chunks and delete them (one transaction)"""
+        groups = {}
+        for row in rows:
+            data = {column.key: getattr(row, column.key) for column in columns}
+            data['_created_at'] = data['created_at'] or now
+            if data['created_at'] is not None:
+                data['created_at'] = data['created_at'].isoformat()
+            key = (data['order_id'], data[owner_column] if owner_column else None)
+            groups.setdefault(key, []).append(data)
+
+        chunks = RetentionService._chunk_rows(kind, groups, now)
+        db.session.execute(insert(ArchiveChunk), chunks)
+        model.query.filter(model.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.session.commit()
+        return {'rows': len(rows), 'chunks': len(chunks)}
+
+    @staticmethod
+    def archive_notifications(cutoff: datetime, limit: int, now: Optional[datetime] = None) -> Dict:
+        """
+        Archive up to `limit` read notifications created before `cutoff`
+
+        Returns:
+            Dict with 'rows' and 'chunks'
+        """
+        now = now or datetime.utcnow()
+        columns = [
+            OrderNotification.id, OrderNotification.user_id, OrderNotification.order_id,
+            OrderNotification.message, OrderNotification.type, OrderNotification.is_read,
+            OrderNotification.created_at
+        ]
+        try:
+            rows = db.session.query(*columns).filter(
+                OrderNotification.is_read == True,
+                OrderNotification.created_at < cutoff
+            ).order_by(OrderNotification.id).limit(limit).with_for_update(skip_locked=True).all()
+            if not rows:
+                db.session.rollback()
+                return {'rows': 0, 'chunks': 0}
+            return RetentionService._archive('notification', OrderNotification, columns, rows, 'user_id', now)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def archive_status_history(cutoff: datetime, limit: int, now: Optional[datetime] = None) -> Dict:
+        """
+        Archive up to `limit` history rows of orders closed before `cutoff`
+
+        Returns:
+            Dict with 'rows' and 'chunks'
+        """
+        now = now or datetime.utcnow()
+        columns = [
+            OrderStatusHistory.id, OrderStatusHistory.order_id, OrderStatusHistory.status,
+            OrderStatusHistory.changed_by, OrderStatusHistory.notes, OrderStatusHistory.latitude,
+            OrderStatusHistory.longitude, OrderStatusHistory.address, OrderStatusHistory.created_at
+        ]
+        try:
+            rows = db.session.query(*columns).join(
+                Order, Order.id == OrderStatusHistory.order_id
+            ).filter(
+                Order.status.in_(RetentionService.CLOSED_STATUSES),
+                Order.updated_at < cutoff
+            ).order_by(OrderStatusHistory.id).limit(limit).with_for_update(
+                skip_locked=True, of=OrderStatusHistory
+            ).all()
+            if not rows:
+                db.session.rollback()
+                return {'rows': 0, 'chunks': 0}
+            return RetentionService._archive('status_history', OrderStatusHistory, columns, rows, None, now)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def run_once(self, batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                 now: Optional[datetime] = None) -> Dict:
+        """
+        Archive expired notifications and closed-order history
+
+        Must be called inside an application context.
+
+        Args:
+            batch_size: Rows archived per transaction
+            max_batches: Upper bound of batches per run (the rest waits for the next run)
+            now: Reference time (defaults to the current UTC time)
+
+        Returns:
+            Metrics of the run (see RetentionRun.to_dict)
+        """
+        batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        max_batches = max_batches or self.DEFAULT_MAX_BATCHES
+        now = now or datetime.utcnow()
+        notification_cutoff = now - timedelta(days=self.NOTIFICATION_RETENTION_DAYS)
+        history_cutoff = now - timedelta(days=self.STATUS_HISTORY_RETENTION_DAYS)
+
+        run = RetentionRun(
+            started_at=datetime.utcnow(), batches=0, notifications_archived=0,
+            history_archived=0, chunks_written=0
+        )
+
+        try:
+            while run.batches < max_batches:
+                result = self.archive_notifications(notification_cutoff, batch_size, now)
+                run.batches += 1
+                run.notifications_archived += result['rows']
+                run.chunks_written += result['chunks']
+                if result['rows'] < batch_size:
+                    break
+
+            while run.batches < max_batches:
+                result = self.archive_status_history(history_cutoff, batch_size, now)
+                run.batches += 1
+                run.history_archived += result['rows']
+                run.chunks_written += result['chunks']
+                if result['rows'] < batch_size:
+                    break
+
+        except Exception as e:
+            run.error = str(e)
+
+        run.finished_at = datetime.utcnow()
+
+        try:
+            db.session.add(run)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving retention run: {str(e)}")
+
+        return run.to_dict()
+
+    @staticmethod
+    def get_archive(kind: str, order_id: Optional[int] = None, user_id: Optional[int] = None,
+                    limit: int = 100) -> List[Dict]:
+        """
+        Read archived rows, newest first
+
+        Args:
+            kind: 'notification' or 'status_history'
+            order_id: Only rows of this order
+            user_id: Only notifications of this user
+            limit: Maximum rows returned
+
+        Returns:
+            List of archived rows as they were in the hot table
+        """
+        if kind not in RetentionService.KINDS:
+            raise ValueError(f'Tipo de archivo desconocido: {kind}')
+
+        query = ArchiveChunk.query.filter(ArchiveChunk.kind == kind)
+        if order_id is not None:
+            query = query.filter(ArchiveChunk.order_id == order_id)
+        if user_id is not None:
+            query = query.filter(ArchiveChunk.user_id == user_id)
+
+        rows = []
+        # Bloques más recientes primero: se detiene cuando ningún bloque restante puede entrar en el límite
+        for chunk in query.order_by(ArchiveChunk.last_created_at.desc()).yield_per(50):
+            if len(rows) >= limit and chunk.last_created_at and chunk.last_created_at < rows[-1][0]:
+                break
+            for row in RetentionService._unpack(chunk.payload):
+                created = datetime.fromisoformat(row['created_at']) if row.get('created_at') else datetime.min
+                rows.append((created, row))
+            rows.sort(key=lambda item: item[0], reverse=True)
+            rows = rows[:limit]
+
+        return [row for _, row in rows]
+
+    def recent_runs(self, limit: int = 20) -> List[Dict]:
+        """Metrics of the latest runs, newest first"""
+        runs = RetentionRun.query.order_by(RetentionRun.started_at.desc()).limit(limit).all()
+        return [run.to_dict() for run in runs]
+
+    def _loop(self, app, interval: int) -> None:
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Error in retention job: {str(e)}")
+                finally:
+                    db.session.remove()
+            self._stop.wait(interval)
+
+    def start(self, app, interval: Optional[int] = None) -> bool:
+        """
+        Start the retention job in a daemon thread
+
+        Args:
+            app: Flask application (used to open an app context per run)
+            interval: Seconds between runs
+
+        Returns:
+            False if it was already running
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return False
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(app, interval or self.DEFAULT_INTERVAL),
+            name='retention-job', daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread after the current run"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Singleton instance
+retention_service = RetentionService()
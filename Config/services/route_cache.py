@@ -0,0 +1,270 @@
+"""
+Route Cache
+Reuses Directions API routes for delivery maps while the driver stays within a corridor of the route
+"""
+
+import json
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from Config.google_maps_config import GoogleMapsConfig
+from Config.models.order_tracking import DeliveryTracking
+from Config.services.cache import TTLCache
+from Config.services.google_maps_service import google_maps_service
+
+
+class RouteCache:
+    """
+    Cache of Directions API routes for delivery tracking maps
+
+    The last route of each delivery is stored on its tracking row
+    (route_polyline, route_summary, route_fetched_at), so every worker
+    process can reuse it. While the driver is within ROUTE_CORRIDOR_METERS
+    of that polyline and the route is younger than ROUTE_CACHE_TTL, requests
+    are answered from it: the polyline is cut at the driver's position and
+    the remaining distance/duration are scaled to what is left. Only when
+    the driver leaves the corridor (or the route expires) is a new route
+    needed, which is first looked up in an in-memory cache keyed on the
+    rounded origin, destination and travel mode.
+    """
+
+    METERS_PER_DEGREE = 111320.0
+
+    def __init__(self):
+        self._memory = TTLCache(maxsize=GoogleMapsConfig.ROUTE_CACHE_SIZE, ttl=GoogleMapsConfig.ROUTE_CACHE_TTL)
+        self._lock = threading.Lock()
+        self.corridor_hits = 0
+        self.memory_hits = 0
+        self.api_calls = 0
+        self.stale_served = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # ----- polyline helpers -----
+
+    @staticmethod
+    def decode_polyline(encoded: str) -> List[Tuple[float, float]]:
+        """Decode a Google encoded polyline into (lat, lng) pairs"""
+        points = []
+        index = lat = lng = 0
+        while index < len(encoded):
+            deltas = []
+            for _ in range(2):
+                result = shift = 0
+                while True:
+                    byte = ord(encoded[index]) - 63
+                    index += 1
+                    result |= (byte & 0x1F) << shift
+                    shift += 5
+                    if byte < 0x20:
+                        break
+                deltas.append(~(result >> 1) if result & 1 else result >> 1)
+            lat += deltas[0]
+            lng += deltas[1]
+            points.append((lat / 1e5, lng / 1e5))
+        return points
+
+    @staticmethod
+    def encode_polyline(points: List[Tuple[float, float]]) -> str:
+        """Encode (lat, lng) pairs as a Google encoded polyline"""
+        chunks = []
+        prev_lat = prev_lng = 0
+        for latitude, longitude in points:
+            lat, lng = int(round(latitude * 1e5)), int(round(longitude * 1e5))
+            for delta in (lat - prev_lat, lng - prev_lng):
+                value = ~(delta << 1) if delta < 0 else delta << 1
+                while value >= 0x20:
+                    chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                    value >>= 5
+                chunks.append(chr(value + 63))
+            prev_lat, prev_lng = lat, lng
+        return ''.join(chunks)
+
+    @staticmethod
+    def project(points: List[Tuple[float, float]], latitude: float, longitude: float) -> Dict:
+        """
+        Closest point of a polyline to a position
+
+        Returns:
+            Dict with 'distance_m' (to the polyline), 'segment' (index of the
+            segment start), 'point' (lat, lng), 'remaining_m' and 'total_m'
+        """
+        cos_lat = math.cos(math.radians(latitude))
+        scale = RouteCache.METERS_PER_DEGREE
+
+        def to_xy(point):
+            return ((point[1] - longitude) * scale * cos_lat, (point[0] - latitude) * scale)
+
+        xy = [to_xy(point) for point in points]
+        lengths = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(xy, xy[1:])]
+        total = sum(lengths)
+
+        best = {'distance_m': math.hypot(*xy[0]), 'segment': 0, 'fraction': 0.0}
+        for i, length in enumerate(lengths):
+            (ax, ay), (bx, by) = xy[i], xy[i + 1]
+            fraction = 0.0
+            if length:
+                # El repartidor está en el origen de la proyección (0, 0)
+                fraction = max(0.0, min(1.0, (-ax * (bx - ax) - ay * (by - ay)) / (length * length)))
+            distance = math.hypot(ax + fraction * (bx - ax), ay + fraction * (by - ay))
+            if distance < best['distance_m']:
+                best = {'distance_m': distance, 'segment': i, 'fraction': fraction}
+
+        i, fraction = best['segment'], best['fraction']
+        if len(points) > 1:
+            a, b = points[i], points[i + 1]
+            point = (a[0] + fraction * (b[0] - a[0]), a[1] + fraction * (b[1] - a[1]))
+            remaining = lengths[i] * (1 - fraction) + sum(lengths[i + 1:])
+        else:
+            point, remaining = points[0], 0.0
+        return {
+            'distance_m': best['distance_m'],
+            'segment': i,
+            'point': point,
+            'remaining_m': remaining,
+            'total_m': total
+        }
+
+    @staticmethod
+    def _grid_key(latitude: float, longitude: float) -> str:
+        decimals = GoogleMapsConfig.ROUTE_CACHE_GRID_DECIMALS
+        return f"{round(float(latitude), decimals):.{decimals}f},{round(float(longitude), decimals):.{decimals}f}"
+
+    @staticmethod
+    def _format_distance(meters: float) -> str:
+        return f"{meters / 1000:.1f} km".replace('.', ',') if meters >= 1000 else f"{int(round(meters))} m"
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        minutes = max(1, int(round(seconds / 60)))
+        if minutes < 60:
+            return f"{minutes} min"
+        return f"{minutes // 60} h {minutes % 60} min"
+
+    # ----- cache -----
+
+    def _stored_route(self, tracking: DeliveryTracking, mode: str) -> Optional[Dict]:
+        """Route stored on the tracking row if it still targets the same destination and mode"""
+        if not tracking.route_polyline or not tracking.route_summary:
+            return None
+        try:
+            summary = json.loads(tracking.route_summary)
+        except ValueError:
+            return None
+        if summary.get('mode') != mode or summary.get('destination') != self._grid_key(
+                tracking.destination_latitude, tracking.destination_longitude):
+            return None
+        return summary
+
+    def _from_corridor(self, tracking: DeliveryTracking, summary: Dict) -> Optional[Dict]:
+        """Cut the stored route at the driver's position if the driver is still on it"""
+        points = self.decode_polyline(tracking.route_polyline)
+        if not points:
+            return None
+        projection = self.project(points, tracking.current_latitude, tracking.current_longitude)
+        if projection['distance_m'] > GoogleMapsConfig.ROUTE_CORRIDOR_METERS:
+            return None
+
+        ratio = projection['remaining_m'] / projection['total_m'] if projection['total_m'] else 0.0
+        distance_meters = int(round(summary['distance_meters'] * ratio))
+        duration_seconds = int(round(summary['duration_seconds'] * ratio))
+        remaining = [projection['point']] + points[projection['segment'] + 1:]
+
+        route = dict(summary['route'])
+        route.update({
+            'distance_meters': distance_meters,
+            'distance_km': distance_meters / 1000,
+            'distance_text': self._format_distance(distance_meters),
+            'duration_seconds': duration_seconds,
+            'duration_minutes': duration_seconds / 60,
+            'duration_text': self._format_duration(duration_seconds),
+            'polyline': self.encode_polyline(remaining)
+        })
+        return route
+
+    def _store(self, tracking: DeliveryTracking, key: Tuple, route: Dict, mode: str) -> None:
+        """Keep a fresh route in memory and on the tracking row (not committed)"""
+        self._memory.set(key, route)
+        summary = {
+            'mode': mode,
+            'destination': key[1],
+            'distance_meters': route['distance_meters'],
+            'duration_seconds': route['duration_seconds'],
+            'route': {name: value for name, value in route.items() if name != 'polyline'}
+        }
+        tracking.route_polyline = route['polyline']
+        tracking.route_summary = json.dumps(summary)
+        tracking.route_fetched_at = datetime.utcnow()
+
+    def get_route(self, tracking: DeliveryTracking, mode: str = 'driving') -> Tuple[Optional[Dict], str]:
+        """
+        Route from the driver's current position to the destination
+
+        May set the route columns of the tracking row; the caller commits.
+
+        Args:
+            tracking: Delivery tracking with current and destination coordinates
+            mode: Directions API travel mode
+
+        Returns:
+            (route, source): source is 'corridor', 'memory', 'remote' or
+            'stale' (expired route served because the API call failed)
+        """
+        summary = self._stored_route(tracking, mode)
+        fresh = summary is not None and tracking.route_fetched_at is not None and (
+            datetime.utcnow() - tracking.route_fetched_at < timedelta(seconds=GoogleMapsConfig.ROUTE_CACHE_TTL)
+        )
+        if fresh:
+            route = self._from_corridor(tracking, summary)
+            if route is not None:
+                self._count('corridor_hits')
+                return route, 'corridor'
+
+        key = (
+            self._grid_key(tracking.current_latitude, tracking.current_longitude),
+            self._grid_key(tracking.destination_latitude, tracking.destination_longitude),
+            mode
+        )
+        route = self._memory.get(key)
+        if route is not None:
+            self._count('memory_hits')
+            self._store(tracking, key, route, mode)
+            return dict(route), 'memory'
+
+        route = google_maps_service.calculate_route(
+            tracking.current_latitude, tracking.current_longitude,
+            tracking.destination_latitude, tracking.destination_longitude,
+            mode=mode
+        )
+        self._count('api_calls')
+        if route:
+            self._store(tracking, key, route, mode)
+            return dict(route), 'remote'
+
+        # Si la API falla, una ruta vencida sigue siendo mejor que ninguna
+        if summary is not None:
+            self._count('stale_served')
+            route = dict(summary['route'])
+            route['polyline'] = tracking.route_polyline
+            return route, 'stale'
+        return None, 'remote'
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> Dict:
+        """Counters of the answers served from each source"""
+        return {
+            'corridor_hits': self.corridor_hits,
+            'memory_hits': self.memory_hits,
+            'api_calls': self.api_calls,
+            'stale_served': self.stale_served,
+            'memory': self._memory.stats()
+        }
+
+
+# Singleton instance
+route_cache = RouteCache()
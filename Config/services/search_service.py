@@ -0,0 +1,512 @@
+"""
+Search Service
+In-process inverted index for full-text product search and autocomplete
+"""
+
+import bisect
+import heapq
+import math
+import operator
+import re
+import threading
+import unicodedata
+from collections import Counter
+from itertools import repeat
+from typing import Dict, List, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+from Config.db import db
+from Config.models.product import Product
+from Config.models.category import Category
+from Config.services.catalog_service import catalog_service
+
+
+class SearchService:
+    """
+    Service for searching active products by name, description, brand, SKU
+    and category path
+
+    The index is built lazily on the first query. Product and category
+    changes are recorded by session hooks and reindexed incrementally before
+    the next query, so searches never touch the database otherwise.
+    """
+
+    # Field weights used when counting term frequencies
+    FIELD_WEIGHTS = {
+        'name': 3.0,
+        'sku': 3.0,
+        'brand': 2.0,
+        'category': 1.5,
+        'description': 1.0
+    }
+
+    STOPWORDS = frozenset((
+        'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+        'o', 'para', 'por', 'sin', 'su', 'sus', 'un', 'una', 'unos', 'unas', 'y'
+    ))
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    # Product columns whose changes require reindexing (stock updates do not)
+    INDEXED_FIELDS = ('name', 'description', 'brand', 'sku', 'category_id', 'active')
+
+    MIN_PREFIX_LENGTH = 3
+    MAX_PREFIX_EXPANSIONS = 64
+    # AND matches above this size use MaxScore early termination
+    EARLY_TERMINATION_THRESHOLD = 2000
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    _TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}       # term -> {product_id: BM25 impact}
+        self._ranked = {}         # term -> [(impact, product_id)] sorted desc, built on demand
+        self._doc_terms = {}      # product_id -> indexed terms
+        self._doc_lengths = {}    # product_id -> total weighted length
+        self._vocabulary = []     # sorted terms for prefix lookups
+        self._total_length = 0.0
+        self._built = False
+        self._pending_ids = set()
+        self._pending_rebuild = False
+
+    # ------------------------------------------------------------------
+    # Text analysis
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase and strip accents ('Métrica' -> 'metrica')"""
+        decomposed = unicodedata.normalize('NFKD', text or '')
+        return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+    @staticmethod
+    def stem(token: str) -> str:
+        """Light Spanish plural stemming ('martillos' -> 'martillo', 'interruptores' -> 'interruptor')"""
+        if len(token) > 4 and token.endswith('es') and token[-3] in 'rlndj':
+            return token[:-2]
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            return token[:-1]
+        return token
+
+    @staticmethod
+    def tokenize(text: str, stem: bool = True) -> List[str]:
+        """Split text into normalized search terms"""
+        tokens = SearchService._TOKEN_RE.findall(SearchService.normalize(text))
+        tokens = [t for t in tokens if t not in SearchService.STOPWORDS]
+        return [SearchService.stem(t) for t in tokens] if stem else tokens
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _document_fields(product: Product) -> Dict[str, str]:
+        return {
+            'name': product.name,
+            'sku': product.sku,
+            'brand': product.brand,
+            'category': product.category.get_full_path() if product.category else None,
+            'description': product.description
+        }
+
+    def _remove(self, product_id: int) -> None:
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+
+        self._total_length -= self._doc_lengths.pop(product_id, 0.0)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            self._ranked.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                index = bisect.bisect_left(self._vocabulary, term)
+                if index < len(self._vocabulary) and self._vocabulary[index] == term:
+                    self._vocabulary.pop(index)
+
+    def _analyze(self, product: Product) -> Counter:
+        """Weighted term frequencies of a product"""
+        terms = Counter()
+        for field, text in self._document_fields(product).items():
+            if not text:
+                continue
+            weight = self.FIELD_WEIGHTS[field]
+            for token in self.tokenize(text):
+                terms[token] += weight
+        return terms
+
+    def _add(self, product_id: int, terms: Counter, avg_length: Optional[float] = None) -> None:
+        if not terms:
+            return
+
+        length = sum(terms.values())
+        if avg_length is None:
+            count = len(self._doc_terms)
+            avg_length = (self._total_length + length) / (count + 1)
+
+        self._doc_terms[product_id] = tuple(terms)
+        self._doc_lengths[product_id] = length
+        self._total_length += length
+
+        # BM25 term weight without the IDF factor, precomputed at index time
+        norm = self.K1 * (1 - self.B + self.B * length / avg_length)
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[product_id] = tf * (self.K1 + 1) / (tf + norm)
+            self._ranked.pop(term, None)
+
+    @staticmethod
+    def _load_products(product_ids: Optional[List[int]] = None) -> List[Product]:
+        query = Product.query.options(
+            joinedload(Product.category).joinedload(Category.parent)
+        ).filter(Product.active == True)
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(product_ids))
+        return query.all()
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the whole index from the database
+
+        Returns:
+            Number of indexed products
+        """
+        documents = [(product.id, self._analyze(product)) for product in self._load_products()]
+        documents = [(product_id, terms) for product_id, terms in documents if terms]
+        avg_length = (sum(sum(terms.values()) for _, terms in documents) / len(documents)) if documents else 1.0
+
+        with self._lock:
+            self._postings = {}
+            self._ranked = {}
+            self._doc_terms = {}
+            self._doc_lengths = {}
+            self._vocabulary = []
+            self._total_length = 0.0
+            self._pending_ids.clear()
+            self._pending_rebuild = False
+            for product_id, terms in documents:
+                self._add(product_id, terms, avg_length)
+            self._built = True
+            return len(self._doc_terms)
+
+    def reindex(self, product_ids: List[int]) -> None:
+        """
+        Reindex some products (inactive or deleted products are removed)
+
+        Args:
+            product_ids: IDs of the products to refresh
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        documents = [(product.id, self._analyze(product)) for product in self._load_products(product_ids)]
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+            for product_id, terms in documents:
+                self._add(product_id, terms)
+
+    def mark_dirty(self, product_ids=None, rebuild: bool = False) -> None:
+        """Schedule products (or the whole index) to be refreshed before the next query"""
+        with self._lock:
+            if rebuild:
+                self._pending_rebuild = True
+            elif product_ids:
+                self._pending_ids.update(product_ids)
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            needs_rebuild = not self._built or self._pending_rebuild
+            pending = list(self._pending_ids)
+            self._pending_ids.clear()
+
+        if needs_rebuild:
+            self.rebuild()
+        elif pending:
+            self.reindex(pending)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff')
+        terms = self._vocabulary[start:end]
+        if len(terms) > self.MAX_PREFIX_EXPANSIONS:
+            terms = heapq.nlargest(self.MAX_PREFIX_EXPANSIONS, terms, key=lambda t: len(self._postings[t]))
+        return terms
+
+    def _query_terms(self, query: str) -> List[List[str]]:
+        """
+        Resolve each query token to the index terms it matches
+
+        The last token is treated as a prefix so results update while typing.
+        """
+        raw_tokens = self.tokenize(query, stem=False)
+        groups = []
+        for position, raw in enumerate(raw_tokens):
+            term = self.stem(raw)
+            is_last = position == len(raw_tokens) - 1
+            if is_last and len(raw) >= self.MIN_PREFIX_LENGTH:
+                matches = set(self._expand_prefix(raw))
+                if term in self._postings:
+                    matches.add(term)
+                groups.append(list(matches))
+            else:
+                groups.append([term] if term in self._postings else [])
+        return groups
+
+    def _idf(self, term: str) -> float:
+        doc_count = len(self._doc_terms)
+        df = len(self._postings[term])
+        return math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+    def _ranked_postings(self, term: str) -> List:
+        """Postings of a term ordered by impact (cached until the term changes)"""
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            ranked = sorted(((impact, product_id) for product_id, impact in self._postings[term].items()), reverse=True)
+            self._ranked[term] = ranked
+        return ranked
+
+    def _score_candidates(self, groups: List[List[str]], candidates, top: int) -> List:
+        """
+        Score candidates and keep the best ones
+
+        Scores are accumulated column-wise with map() so the per-document
+        work runs in C rather than in a Python loop.
+        """
+        candidates = list(candidates)
+        scores = [0.0] * len(candidates)
+        for terms in groups:
+            for term in terms:
+                postings = self._postings[term]
+                if len(terms) == 1:
+                    impacts = map(postings.__getitem__, candidates)
+                else:
+                    impacts = map(postings.get, candidates, repeat(0.0))
+                weights = map(self._idf(term).__mul__, impacts)
+                scores = list(map(operator.add, scores, weights))
+
+        ranked = heapq.nlargest(top, zip(scores, candidates))
+        return [(product_id, score) for score, product_id in ranked]
+
+    def _rank(self, groups: List[List[str]], top: int):
+        """
+        Find the best scoring products matching every query token
+
+        Single-token queries read the head of the impact-ordered postings;
+        for prefixes that expand to several terms this ranks the union of
+        each term's head, which is exact for the single-term case.
+
+        Returns:
+            Tuple of (ranked (product_id, score) pairs, total matches)
+        """
+        if len(groups) == 1:
+            terms = groups[0]
+            candidates = set()
+            for term in terms:
+                candidates.update(product_id for _, product_id in self._ranked_postings(term)[:top])
+            if len(terms) == 1:
+                total = len(self._postings[terms[0]])
+            else:
+                total = len(set().union(*(self._postings[term].keys() for term in terms)))
+        else:
+            # Several tokens (AND): intersect starting from the rarest one
+            group_docs = []
+            for terms in groups:
+                if len(terms) == 1:
+                    group_docs.append(self._postings[terms[0]].keys())
+                else:
+                    group_docs.append(set().union(*(self._postings[term].keys() for term in terms)))
+            group_docs.sort(key=len)
+            candidates = group_docs[0] & group_docs[1]
+            for docs in group_docs[2:]:
+                candidates = candidates & docs
+            total = len(candidates)
+
+            if total > self.EARLY_TERMINATION_THRESHOLD:
+                ranked = self._top_by_max_score(groups, candidates, top)
+                if ranked is not None:
+                    return ranked, total
+
+        return self._score_candidates(groups, candidates, top), total
+
+    def _top_by_max_score(self, groups: List[List[str]], candidates, top: int) -> Optional[List]:
+        """
+        Exact top-k for large AND matches without scoring every candidate
+
+        Walks the impact-ordered postings of the rarest single-term token and
+        stops once no remaining document can beat the current k-th score
+        (MaxScore). Returns None when no token qualifies as the lead.
+        """
+        single = [terms[0] for terms in groups if len(terms) == 1]
+        if not single:
+            return None
+        lead = min(single, key=lambda term: len(self._postings[term]))
+
+        others = []
+        rest_max = 0.0
+        for terms in groups:
+            if terms == [lead]:
+                continue
+            parts = [(self._postings[term], self._idf(term)) for term in terms]
+            others.append(parts)
+            rest_max += sum(idf * self._ranked_postings(term)[0][0] for term, (_, idf) in zip(terms, parts))
+
+        lead_idf = self._idf(lead)
+        heap = []
+        threshold = -1.0
+        for impact, product_id in self._ranked_postings(lead):
+            if lead_idf * impact + rest_max <= threshold:
+                break
+            if product_id not in candidates:
+                continue
+            score = lead_idf * impact
+            for parts in others:
+                for postings, idf in parts:
+                    score += idf * postings.get(product_id, 0.0)
+            entry = (score, product_id)
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+                if len(heap) == top:
+                    threshold = heap[0][0]
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+                threshold = heap[0][0]
+
+        return [(product_id, score) for score, product_id in sorted(heap, reverse=True)]
+
+    def search_ids(self, query: str, limit: int = DEFAULT_LIMIT, offset: int = 0) -> Dict:
+        """
+        Rank active products for a query
+
+        Args:
+            query: Free text (accents and case are ignored)
+            limit: Maximum number of results (capped at MAX_LIMIT)
+            offset: Number of ranked results to skip
+
+        Returns:
+            Dict with 'ids' (ranked), 'scores' and 'total'
+        """
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        offset = max(0, offset)
+        self._ensure_fresh()
+
+        with self._lock:
+            groups = self._query_terms(query)
+            if not groups or any(not terms for terms in groups):
+                return {'ids': [], 'scores': [], 'total': 0}
+            ranked, total = self._rank(groups, offset + limit)
+
+        ranked = ranked[offset:]
+        return {
+            'ids': [product_id for product_id, _ in ranked],
+            'scores': [round(score, 4) for _, score in ranked],
+            'total': total
+        }
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, offset: int = 0) -> Dict:
+        """
+        Search products and return catalog projections
+
+        Returns:
+            Dict with 'products' (ranked, each with a 'score'), 'total', 'limit' and 'offset'
+        """
+        result = self.search_ids(query, limit, offset)
+        products = catalog_service.get_products(result['ids'])
+        scores = dict(zip(result['ids'], result['scores']))
+        return {
+            'products': [dict(p, score=scores.get(p['id'])) for p in products],
+            'total': result['total'],
+            'limit': max(1, min(limit, self.MAX_LIMIT)),
+            'offset': max(0, offset)
+        }
+
+    def suggest(self, prefix: str, limit: int = 8) -> Dict:
+        """
+        Autocomplete suggestions for a partial query
+
+        Args:
+            prefix: What the user typed so far
+            limit: Maximum number of term and product suggestions
+
+        Returns:
+            Dict with 'terms' (most frequent completions) and 'products' (id and name)
+        """
+        self._ensure_fresh()
+        tokens = self.tokenize(prefix, stem=False)
+        if not tokens or len(tokens[-1]) < self.MIN_PREFIX_LENGTH:
+            return {'terms': [], 'products': []}
+
+        with self._lock:
+            completions = self._expand_prefix(tokens[-1])
+            terms = heapq.nlargest(limit, completions, key=lambda t: (len(self._postings[t]), t))
+            terms = [{'term': t, 'count': len(self._postings[t])} for t in terms]
+
+        ids = self.search_ids(prefix, limit=limit)['ids']
+        products = [{'id': p['id'], 'name': p['name']} for p in catalog_service.get_products(ids)]
+        return {'terms': terms, 'products': products}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'documents': len(self._doc_terms),
+                'terms': len(self._postings),
+                'built': self._built,
+                'pending': len(self._pending_ids)
+            }
+
+    # ------------------------------------------------------------------
+    # Session hooks
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def on_after_flush(session, flush_context) -> None:
+        """Record products and categories changed in this flush"""
+        pending = session.info.setdefault('search_reindex', {'ids': set(), 'rebuild': False})
+
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, Product):
+                pending['ids'].add(obj.id)
+            elif isinstance(obj, Category):
+                pending['rebuild'] = True
+
+        for obj in session.dirty:
+            if isinstance(obj, Product):
+                state = inspect(obj)
+                if any(state.attrs[field].history.has_changes() for field in SearchService.INDEXED_FIELDS):
+                    pending['ids'].add(obj.id)
+            elif isinstance(obj, Category):
+                state = inspect(obj)
+                if any(state.attrs[field].history.has_changes() for field in ('name', 'parent_id')):
+                    pending['rebuild'] = True
+
+    @staticmethod
+    def on_after_commit(session) -> None:
+        pending = session.info.pop('search_reindex', None)
+        if pending:
+            search_service.mark_dirty(pending['ids'], rebuild=pending['rebuild'])
+
+    @staticmethod
+    def on_after_rollback(session) -> None:
+        session.info.pop('search_reindex', None)
+
+
+# Singleton instance
+search_service = SearchService()
+
+event.listen(db.session, 'after_flush', SearchService.on_after_flush)
+event.listen(db.session, 'after_commit', SearchService.on_after_commit)
+event.listen(db.session, 'after_rollback', SearchService.on_after_rollback)
@@ -0,0 +1,374 @@
+"""
+Spatial Index
+In-memory uniform grid over active deliveries for radius, nearest-driver and geofence queries
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import event
+from Config.db import db
+from Config.models.order_tracking import DeliveryTracking
+from Config.services.eta_estimator import eta_estimator
+from Config.services.route_planner import RoutePlanner
+
+
+class SpatialIndex:
+    """
+    Uniform grid of the current driver positions
+
+    The plane is cut into square cells of CELL_METERS (longitudes scaled by
+    the cosine of REFERENCE_LATITUDE, which is accurate at city scale). Each
+    cell holds the orders whose driver is inside it, so a radius query only
+    visits the cells overlapping the circle and a nearest-driver query
+    visits rings of cells outward until no closer driver can exist; both
+    cost depends on the drivers nearby, not on the number of active
+    deliveries.
+
+    Geofences are circles: every delivery has an arrival fence around its
+    destination (GEOFENCE_ARRIVAL_METERS) and global fences (the depot, or
+    any added with add_geofence) are indexed by the cells they overlap.
+    update() returns the fences a driver entered or left since its previous
+    position; preview() computes them without moving the driver, for
+    callers that apply the move with update_on_commit().
+
+    The index lives in the process memory and is fed by the location
+    ingest of this process; it is rebuilt from delivery_tracking (one
+    query) on first use and every RELOAD_SECONDS, so positions received by
+    other worker processes show up within that delay.
+    """
+
+    CELL_METERS = float(os.getenv('SPATIAL_CELL_METERS', 500))
+    REFERENCE_LATITUDE = float(os.getenv('SPATIAL_REFERENCE_LATITUDE', os.getenv('DEPOT_LATITUDE', 4.6097)))
+    RELOAD_SECONDS = float(os.getenv('SPATIAL_INDEX_RELOAD_SECONDS', 60))
+    GEOFENCE_ARRIVAL_METERS = float(os.getenv('GEOFENCE_ARRIVAL_METERS', 150))
+    GEOFENCE_DEPOT_METERS = float(os.getenv('GEOFENCE_DEPOT_METERS', 200))
+    METERS_PER_DEGREE = 111320.0
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cells = {}  # (ix, iy) -> set of order IDs
+        self._entries = {}  # order_id -> entry dict
+        self._fences = {}  # fence_id -> global fence dict
+        self._fence_cells = {}  # (ix, iy) -> set of global fence IDs
+        self._loaded_at = None
+        self._lng_scale = math.cos(math.radians(self.REFERENCE_LATITUDE))
+        self.updates = 0
+        self.queries = 0
+        self.cells_visited = 0
+        self.add_geofence('depot', RoutePlanner.DEPOT_LATITUDE, RoutePlanner.DEPOT_LONGITUDE,
+                          self.GEOFENCE_DEPOT_METERS, name='Bodega')
+
+    # ----- geometry -----
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        x = longitude * self.METERS_PER_DEGREE * self._lng_scale
+        y = latitude * self.METERS_PER_DEGREE
+        return int(math.floor(x / self.CELL_METERS)), int(math.floor(y / self.CELL_METERS))
+
+    def _cells_around(self, latitude: float, longitude: float, radius_m: float) -> List[Tuple[int, int]]:
+        cx, cy = self._cell(latitude, longitude)
+        reach = int(math.ceil(radius_m / self.CELL_METERS))
+        return [(cx + dx, cy + dy) for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)]
+
+    @staticmethod
+    def _distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        return eta_estimator.haversine_km(lat1, lng1, lat2, lng2) * 1000
+
+    # ----- loading -----
+
+    def ensure_loaded(self) -> None:
+        """Rebuild the index if it was never loaded or RELOAD_SECONDS passed"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.RELOAD_SECONDS:
+            return
+        try:
+            self.reload()
+        except Exception as e:
+            # Sin base de datos se sigue con las posiciones que ya están en memoria
+            print(f"Error loading spatial index: {str(e)}")
+            self._loaded_at = time.monotonic()
+
+    def reload(self) -> int:
+        """
+        Rebuild the index from the active deliveries (one query)
+
+        Must be called inside an application context. Geofence membership
+        is kept for orders already indexed and computed silently for new
+        ones, so a reload never emits events.
+
+        Returns:
+            Number of deliveries indexed
+        """
+        rows = db.session.query(
+            DeliveryTracking.order_id, DeliveryTracking.current_latitude, DeliveryTracking.current_longitude,
+            DeliveryTracking.destination_latitude, DeliveryTracking.destination_longitude,
+            DeliveryTracking.driver_name, DeliveryTracking.driver_phone, DeliveryTracking.vehicle_info
+        ).filter(
+            DeliveryTracking.is_active == True,
+            DeliveryTracking.current_latitude.isnot(None)
+        ).all()
+
+        with self._lock:
+            previous = self._entries
+            self._cells = {}
+            self._entries = {}
+            for row in rows:
+                inside = previous[row.order_id]['inside'] if row.order_id in previous else None
+                self._place(row.order_id, row.current_latitude, row.current_longitude,
+                            row.destination_latitude, row.destination_longitude, {
+                                'driver_name': row.driver_name,
+                                'driver_phone': row.driver_phone,
+                                'vehicle_info': row.vehicle_info
+                            }, inside)
+            self._loaded_at = time.monotonic()
+            return len(self._entries)
+
+    # ----- geofences -----
+
+    def add_geofence(self, fence_id: str, latitude: float, longitude: float, radius_m: float,
+                     name: Optional[str] = None) -> None:
+        """Register a circular geofence that applies to every delivery"""
+        with self._lock:
+            self.remove_geofence(fence_id)
+            fence = {'id': fence_id, 'name': name or fence_id, 'latitude': latitude,
+                     'longitude': longitude, 'radius_m': radius_m, 'cells': self._cells_around(latitude, longitude, radius_m)}
+            self._fences[fence_id] = fence
+            for cell in fence['cells']:
+                self._fence_cells.setdefault(cell, set()).add(fence_id)
+
+    def remove_geofence(self, fence_id: str) -> None:
+        with self._lock:
+            fence = self._fences.pop(fence_id, None)
+            if fence is None:
+                return
+            for cell in fence['cells']:
+                fences = self._fence_cells.get(cell)
+                if fences is not None:
+                    fences.discard(fence_id)
+                    if not fences:
+                        del self._fence_cells[cell]
+
+    def _inside(self, cell: Tuple[int, int], latitude: float, longitude: float,
+                dest_latitude: Optional[float], dest_longitude: Optional[float]) -> Set[str]:
+        inside = set()
+        if dest_latitude is not None and dest_longitude is not None and self._distance_m(
+                latitude, longitude, dest_latitude, dest_longitude) <= self.GEOFENCE_ARRIVAL_METERS:
+            inside.add('arrival')
+        for fence_id in self._fence_cells.get(cell, ()):
+            fence = self._fences[fence_id]
+            if self._distance_m(latitude, longitude, fence['latitude'], fence['longitude']) <= fence['radius_m']:
+                inside.add(fence_id)
+        return inside
+
+    # ----- updates -----
+
+    def _place(self, order_id: int, latitude: float, longitude: float, dest_latitude: Optional[float],
+               dest_longitude: Optional[float], info: Dict, inside: Optional[Set[str]]) -> Set[str]:
+        cell = self._cell(latitude, longitude)
+        entry = self._entries.get(order_id)
+        if entry is not None and entry['cell'] != cell:
+            members = self._cells.get(entry['cell'])
+            if members is not None:
+                members.discard(order_id)
+                if not members:
+                    del self._cells[entry['cell']]
+        self._cells.setdefault(cell, set()).add(order_id)
+
+        current = self._inside(cell, latitude, longitude, dest_latitude, dest_longitude)
+        self._entries[order_id] = {
+            'order_id': order_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'cell': cell,
+            'destination': (dest_latitude, dest_longitude),
+            'info': info,
+            'inside': current if inside is None else inside
+        }
+        return current
+
+    def _resolve(self, entry: Optional[Dict], dest_latitude: Optional[float], dest_longitude: Optional[float],
+                 info: Optional[Dict]) -> Tuple[Optional[float], Optional[float], Dict]:
+        """Fill destination and driver info from the indexed entry when not given"""
+        if info is None:
+            info = entry['info'] if entry is not None else {}
+        if dest_latitude is None and entry is not None:
+            dest_latitude, dest_longitude = entry['destination']
+        return dest_latitude, dest_longitude, info
+
+    def _transitions(self, order_id: int, before: Set[str], after: Set[str]) -> List[Dict]:
+        events = []
+        for fence_id in sorted(after - before):
+            events.append(self._event(order_id, fence_id, 'enter'))
+        for fence_id in sorted(before - after):
+            events.append(self._event(order_id, fence_id, 'exit'))
+        return events
+
+    def update(self, order_id: int, latitude: float, longitude: float,
+               dest_latitude: Optional[float] = None, dest_longitude: Optional[float] = None,
+               info: Optional[Dict] = None) -> List[Dict]:
+        """
+        Move a delivery to its new position
+
+        Returns:
+            Geofence events: dicts with 'order_id', 'fence', 'name' and
+            'event' ('enter' or 'exit')
+        """
+        self.ensure_loaded()
+        return self._move(order_id, latitude, longitude, dest_latitude, dest_longitude, info)
+
+    def _move(self, order_id: int, latitude: float, longitude: float, dest_latitude: Optional[float],
+              dest_longitude: Optional[float], info: Optional[Dict]) -> List[Dict]:
+        with self._lock:
+            entry = self._entries.get(order_id)
+            before = entry['inside'] if entry is not None else set()
+            dest_latitude, dest_longitude, info = self._resolve(entry, dest_latitude, dest_longitude, info)
+            after = self._place(order_id, latitude, longitude, dest_latitude, dest_longitude, info, None)
+            self.updates += 1
+            return self._transitions(order_id, before, after)
+
+    def preview(self, order_id: int, latitude: float, longitude: float,
+                dest_latitude: Optional[float] = None, dest_longitude: Optional[float] = None) -> List[Dict]:
+        """
+        Geofence events that moving a delivery would emit, without moving it
+
+        Used with update_on_commit: the events go into the transaction
+        (notifications, published events) and the index only changes once
+        it commits, so a failed commit leaves the previous position and a
+        later ping emits the same events again. Call ensure_loaded() before
+        changing trackings in the transaction: a reload would otherwise
+        read the uncommitted positions.
+        """
+        with self._lock:
+            entry = self._entries.get(order_id)
+            before = entry['inside'] if entry is not None else set()
+            dest_latitude, dest_longitude, _ = self._resolve(entry, dest_latitude, dest_longitude, {})
+            after = self._inside(self._cell(latitude, longitude), latitude, longitude, dest_latitude, dest_longitude)
+            return self._transitions(order_id, before, after)
+
+    @staticmethod
+    def update_on_commit(order_id: int, latitude: float, longitude: float,
+                         dest_latitude: Optional[float] = None, dest_longitude: Optional[float] = None,
+                         info: Optional[Dict] = None) -> None:
+        """Move a delivery when the current transaction commits (nothing on rollback)"""
+        db.session.info.setdefault('spatial_updates', []).append(
+            (order_id, latitude, longitude, dest_latitude, dest_longitude, info)
+        )
+
+    @staticmethod
+    def on_after_commit(session) -> None:
+        # Sin ensure_loaded: la sesión ya no puede ejecutar SQL en after_commit
+        for args in session.info.pop('spatial_updates', ()):
+            spatial_index._move(*args)
+
+    @staticmethod
+    def on_after_rollback(session) -> None:
+        session.info.pop('spatial_updates', None)
+
+    def _event(self, order_id: int, fence_id: str, kind: str) -> Dict:
+        fence = self._fences.get(fence_id)
+        return {
+            'order_id': order_id,
+            'fence': fence_id,
+            'name': fence['name'] if fence else 'Destino',
+            'event': kind
+        }
+
+    def remove(self, order_id: int) -> None:
+        """Drop a delivery that is no longer active"""
+        with self._lock:
+            entry = self._entries.pop(order_id, None)
+            if entry is None:
+                return
+            members = self._cells.get(entry['cell'])
+            if members is not None:
+                members.discard(order_id)
+                if not members:
+                    del self._cells[entry['cell']]
+
+    # ----- queries -----
+
+    def _result(self, entry: Dict, distance_m: float) -> Dict:
+        return dict(entry['info'], order_id=entry['order_id'], latitude=entry['latitude'],
+                    longitude=entry['longitude'], distance_m=round(distance_m, 1))
+
+    def within(self, latitude: float, longitude: float, radius_m: float, limit: Optional[int] = None) -> List[Dict]:
+        """Active deliveries within radius_m of a point, closest first"""
+        self.ensure_loaded()
+        found = []
+        with self._lock:
+            cells = self._cells_around(latitude, longitude, radius_m)
+            self.queries += 1
+            self.cells_visited += len(cells)
+            for cell in cells:
+                for order_id in self._cells.get(cell, ()):
+                    entry = self._entries[order_id]
+                    distance = self._distance_m(latitude, longitude, entry['latitude'], entry['longitude'])
+                    if distance <= radius_m:
+                        found.append(self._result(entry, distance))
+        found.sort(key=lambda item: item['distance_m'])
+        return found[:limit] if limit else found
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_radius_m: float = 50000) -> List[Dict]:
+        """
+        The k active deliveries closest to a point
+
+        Rings of cells are visited outward from the point's cell; the
+        search stops once the k-th best distance is shorter than anything
+        the next ring could contain, or at max_radius_m. When a ring would
+        have more cells than there are occupied cells (few drivers spread
+        far apart), the remaining occupied cells are scanned directly.
+        """
+        self.ensure_loaded()
+        best = []  # (distance, order_id)
+        with self._lock:
+            self.queries += 1
+            cx, cy = self._cell(latitude, longitude)
+            max_ring = int(math.ceil(max_radius_m / self.CELL_METERS))
+            exhaustive = False
+            for ring in range(max_ring + 1):
+                if len(best) >= k and best[k - 1][0] <= (ring - 1) * self.CELL_METERS:
+                    break
+                if len(best) == len(self._entries):
+                    break
+                if ring == 0:
+                    cells = [(cx, cy)]
+                elif 8 * ring > len(self._cells):
+                    cells = [cell for cell in self._cells
+                             if max(abs(cell[0] - cx), abs(cell[1] - cy)) >= ring]
+                    exhaustive = True
+                else:
+                    cells = [(cx + dx, cy + dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)]
+                    cells += [(cx + dx, cy + dy) for dx in (-ring, ring) for dy in range(-ring + 1, ring)]
+                self.cells_visited += len(cells)
+                for cell in cells:
+                    for order_id in self._cells.get(cell, ()):
+                        entry = self._entries[order_id]
+                        distance = self._distance_m(latitude, longitude, entry['latitude'], entry['longitude'])
+                        if distance <= max_radius_m:
+                            best.append((distance, order_id))
+                best.sort()
+                if exhaustive:
+                    break
+            return [self._result(self._entries[order_id], distance) for distance, order_id in best[:k]]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'deliveries': len(self._entries),
+                'cells': len(self._cells),
+                'geofences': len(self._fences),
+                'updates': self.updates,
+                'queries': self.queries,
+                'cells_visited': self.cells_visited,
+                'loaded_seconds_ago': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None
+            }
+
+
+# Singleton instance
+spatial_index = SpatialIndex()
+
+event.listen(db.session, 'after_commit', SpatialIndex.on_after_commit)
+event.listen(db.session, 'after_rollback', SpatialIndex.on_after_rollback)
@@ -124,7 +124,26 @@ function loadLowStockProducts() {
 }
 
 // Load pending orders data
-function loadPendingOrders() {
+function loadPendingOrders(cursor = null) {
+    // Continuar la lista actual con el cursor de la página anterior
+    if (cursor) {
+        fetch('/admin/pending-orders-data?cursor=' + encodeURIComponent(cursor))
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    data.orders = (window.adminPendingOrders || []).concat(data.orders);
+                    renderPendingOrders(data);
+                } else {
+                    alert('Error al cargar más pedidos: ' + data.error);
+                }
+            })
+            .catch(error => {
+                console.error('Error loading more pending orders:', error);
+                alert('Error al cargar más pedidos: ' + error.message);
+            });
+        return;
+    }
+
     const content = document.getElementById('pending-orders-content');
     content.innerHTML = '<div class="action-section"><p>Cargando pedidos pendientes...</p></div>';
 
@@ -149,7 +168,26 @@ function loadPendingOrders() {
 }
 
 // Load completed orders data
-function loadCompletedOrders() {
+function loadCompletedOrders(cursor = null) {
+    // Continuar la lista actual con el cursor de la página anterior
+    if (cursor) {
+        fetch('/admin/completed-orders-data?cursor=' + encodeURIComponent(cursor))
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    data.orders = (window.adminCompletedOrders || []).concat(data.orders);
+                    renderCompletedOrders(data);
+                } else {
+                    alert('Error al cargar más pedidos: ' + data.error);
+                }
+            })
+            .catch(error => {
+                console.error('Error loading more completed orders:', error);
+                alert('Error al cargar más pedidos: ' + error.message);
+            });
+        return;
+    }
+
     const content = document.getElementById('completed-orders-content');
     content.innerHTML = '<div class="action-section"><p>Cargando pedidos completados...</p></div>';
 
@@ -305,13 +343,15 @@ function renderLowStockProducts(data) {
 
 function renderPendingOrders(data) {
     const content = document.getElementById('pending-orders-content');
+    window.adminPendingOrders = data.orders;
+    const totalOrders = data.status_counts ? (data.status_counts.pending || 0) : data.orders.length;
     let html = `
         <div class="action-section">
             <div class="section-header">
                 <div class="section-icon" style="background: #fff3cd; color: #856404;">
                     <i class="fas fa-clock"></i>
                 </div>
-                <h3 class="section-title">Pedidos Pendientes (${data.orders.length})</h3>
+                <h3 class="section-title">Pedidos Pendientes (${totalOrders})</h3>
             </div>
             <div class="action-buttons">
                 <button class="action-btn secondary" onclick="showSection('dashboard')">
@@ -364,6 +404,20 @@ function renderPendingOrders(data) {
         html += `
                     </tbody>
                 </table>
+        `;
+
+        if (data.pagination && data.pagination.has_more) {
+            html += `
+                <div class="action-buttons">
+                    <button class="action-btn secondary" onclick="loadPendingOrders('${data.pagination.next_cursor}')">
+                        <i class="fas fa-chevron-down"></i>
+                        Cargar más (${data.orders.length} de ${totalOrders})
+                    </button>
+                </div>
+            `;
+        }
+
+        html += `
             </div>
         `;
     }
@@ -373,13 +427,17 @@ function renderPendingOrders(data) {
 
 function renderCompletedOrders(data) {
     const content = document.getElementById('completed-orders-content');
+    window.adminCompletedOrders = data.orders;
+    const totalOrders = data.status_counts
+        ? (data.status_counts.shipped || 0) + (data.status_counts.delivered || 0)
+        : data.orders.length;
     let html = `
         <div class="action-section">
             <div class="section-header">
                 <div class="section-icon" style="background: #d4edda; color: #155724;">
                     <i class="fas fa-check-circle"></i>
                 </div>
-                <h3 class="section-title">Pedidos Completados (${data.orders.length})</h3>
+                <h3 class="section-title">Pedidos Completados (${totalOrders})</h3>
         </div>
         <div class="action-buttons">
             <button class="action-btn secondary" onclick="showSection('dashboard')">
@@ -432,6 +490,20 @@ function renderCompletedOrders(data) {
         html += `
                     </tbody>
                 </table>
+        `;
+
+        if (data.pagination && data.pagination.has_more) {
+            html += `
+                <div class="action-buttons">
+                    <button class="action-btn secondary" onclick="loadCompletedOrders('${data.pagination.next_cursor}')">
+                        <i class="fas fa-chevron-down"></i>
+                        Cargar más (${data.orders.length} de ${totalOrders})
+                    </button>
+                </div>
+            `;
+        }
+
+        html += `
             </div>
         `;
     }
@@ -1628,7 +1700,26 @@ function deleteOrder(orderId, orderNumber) {
     }
 }
 
-function loadOrders() {
+function loadOrders(cursor = null) {
+    // Continuar la lista actual con el cursor de la página anterior
+    if (cursor) {
+        fetch('/admin/orders-data?cursor=' + encodeURIComponent(cursor))
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    data.orders = (window.adminOrders || []).concat(data.orders);
+                    renderOrdersList(data);
+                } else {
+                    alert('Error al cargar más pedidos: ' + data.error);
+                }
+            })
+            .catch(error => {
+                console.error('Error loading more orders:', error);
+                alert('Error al cargar más pedidos: ' + error.message);
+            });
+        return;
+    }
+
     const content = document.getElementById('section-orders');
     // Find the content area within the orders section
     const existingContent = content.querySelector('.orders-list-content');
@@ -1665,13 +1756,15 @@ function loadOrders() {
 
 function renderOrdersList(data) {
     const content = document.getElementById('orders-list-content');
+    window.adminOrders = data.orders;
+    const totalOrders = data.stats ? data.stats.total : data.orders.length;
     let html = `
         <div class="action-section">
             <div class="section-header">
                 <div class="section-icon" style="background: #f0f9ff; color: #0ea5e9;">
                     <i class="fas fa-shopping-cart"></i>
                 </div>
-                <h3 class="section-title">Lista de Pedidos (${data.orders.length})</h3>
+                <h3 class="section-title">Lista de Pedidos (${totalOrders})</h3>
             </div>
             <div class="action-buttons">
                 <button class="action-btn primary" onclick="loadOrders()">
@@ -1761,6 +1854,20 @@ function renderOrdersList(data) {
                         </tbody>
                     </table>
                 </div>
+        `;
+
+        if (data.pagination && data.pagination.has_more) {
+            html += `
+                <div class="action-buttons">
+                    <button class="action-btn secondary" onclick="loadOrders('${data.pagination.next_cursor}')">
+                        <i class="fas fa-chevron-down"></i>
+                        Cargar más (${data.orders.length} de ${totalOrders})
+                    </button>
+                </div>
+            `;
+        }
+
+        html += `
             </div>
         `;
     }
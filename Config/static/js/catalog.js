@@ -73,16 +73,39 @@ function setupEventListeners() {
     });
 }
 
+let searchTimeout = null;
+
 function searchProducts(query) {
+    clearTimeout(searchTimeout);
+    query = (query || '').trim();
     if (!query) {
         allProducts = products;
-    } else {
-        allProducts = products.filter(product =>
-            product.name.toLowerCase().includes(query.toLowerCase()) ||
-            product.description.toLowerCase().includes(query.toLowerCase())
-        );
+        renderProducts();
+        renderPagination();
+        return;
     }
-    renderProducts();
+
+    // Búsqueda en el servidor sobre todo el catálogo (con espera para no consultar en cada tecla)
+    searchTimeout = setTimeout(async () => {
+        try {
+            const resp = await fetch(`/public/search?q=${encodeURIComponent(query)}&limit=50`);
+            const payload = await resp.json();
+            allProducts = (payload.products || []).map(p => ({
+                id: p.id,
+                name: p.name,
+                description: p.description || '',
+                price: p.price || 0,
+                category: p.category_id || null,
+                brand: p.brand || null,
+                image: p.image || null,
+                in_stock: (p.stock_quantity || 0) > 0
+            }));
+        } catch (e) {
+            console.error('Error buscando productos:', e);
+            allProducts = [];
+        }
+        renderProducts();
+    }, 250);
 }
 
 function collectFilters() {
@@ -11,6 +11,7 @@ let markers = {
 let routePolyline = null;
 let trackingData = null;
 let updateInterval = null;
+let eventStream = null;
 let updateCounter = 0;
 
 // Initialize map when page loads
@@ -448,9 +449,44 @@ function showNoTrackingMessage() {
 
 /**
  * Start auto-update
+ * Uses the Server-Sent Events stream; falls back to polling if it is unavailable
  */
 function startAutoUpdate() {
-    // Update every 30 seconds
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    eventStream = new EventSource(`/tracking/stream?order_id=${ORDER_ID}`);
+    
+    eventStream.addEventListener('location', (event) => {
+        const data = JSON.parse(event.data);
+        trackingData = data.tracking;
+        updateMap();
+        updateDriverInfo();
+        updateETA();
+        updateCounter++;
+        updateLastUpdateTime();
+    });
+    
+    // Cambios de estado y eventos perdidos: recargar todo desde la API
+    eventStream.addEventListener('status', () => loadTrackingData());
+    eventStream.addEventListener('resync', () => loadTrackingData());
+    
+    eventStream.onerror = () => {
+        // EventSource reconecta solo; si el servidor rechazó la conexión, volver al polling
+        if (eventStream.readyState === EventSource.CLOSED) {
+            eventStream = null;
+            startPolling();
+        }
+    };
+}
+
+/**
+ * Poll tracking data every 30 seconds
+ */
+function startPolling() {
+    if (updateInterval) return;
     updateInterval = setInterval(() => {
         loadTrackingData();
     }, 30000);
@@ -460,6 +496,10 @@ function startAutoUpdate() {
  * Stop auto-update
  */
 function stopAutoUpdate() {
+    if (eventStream) {
+        eventStream.close();
+        eventStream = null;
+    }
     if (updateInterval) {
         clearInterval(updateInterval);
         updateInterval = null;
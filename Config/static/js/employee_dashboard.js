@@ -394,8 +394,9 @@ document.addEventListener('DOMContentLoaded', function() {
     setInterval(updateSidebarBadges, 30000);
 });
 // Orders Management Functions
-function loadOrders() {
-    fetch('/employee/orders-data')
+function loadOrders(cursor = null) {
+    const url = cursor ? '/employee/orders-data?cursor=' + encodeURIComponent(cursor) : '/employee/orders-data';
+    fetch(url)
         .then(response => {
             if (!response.ok) {
                 throw new Error('HTTP error! status: ' + response.status);
@@ -404,7 +405,9 @@ function loadOrders() {
         })
         .then(data => {
             if (data.success) {
-                window.allOrders = data.orders || [];
+                // Con cursor se agregan los pedidos a la lista ya cargada
+                window.allOrders = cursor ? (window.allOrders || []).concat(data.orders || []) : (data.orders || []);
+                window.ordersPagination = data.pagination || null;
                 updateOrderStats(data.stats);
                 updateOrderList(window.allOrders);
             } else {
@@ -441,7 +444,13 @@ function updateOrderList(orders) {
         }).join('') + 
         '</tbody></table>';
 
-    ordersContainer.innerHTML = tableHTML;
+    let loadMoreHTML = '';
+    const pagination = window.ordersPagination;
+    if (pagination && pagination.has_more && orders === window.allOrders) {
+        loadMoreHTML = '<div style="text-align: center; margin-top: 15px;"><button class="btn btn-secondary" onclick="loadOrders(\'' + pagination.next_cursor + '\')"><i class="fas fa-chevron-down"></i> Cargar más</button></div>';
+    }
+
+    ordersContainer.innerHTML = tableHTML + loadMoreHTML;
 }
 
 function getOrderStatusClass(status) {
@@ -900,8 +909,20 @@ function showInventoryError(message) {
 }
 
 // Customer Management Functions
-function loadCustomers() {
-    fetch('/employee/customers-data')
+function loadCustomers(page = 1) {
+    // Search and status filters are applied server-side (paginated endpoint)
+    const params = new URLSearchParams();
+    params.set('page', page);
+    const searchInput = document.getElementById('customerSearchInput');
+    const statusSelect = document.getElementById('customerFilterStatus');
+    if (searchInput && searchInput.value.trim()) {
+        params.set('q', searchInput.value.trim());
+    }
+    if (statusSelect && (statusSelect.value === 'active' || statusSelect.value === 'inactive')) {
+        params.set('status', statusSelect.value);
+    }
+
+    fetch('/employee/customers-data?' + params.toString())
         .then(response => {
             if (!response.ok) {
                 throw new Error('HTTP error! status: ' + response.status);
@@ -910,7 +931,10 @@ function loadCustomers() {
         })
         .then(data => {
             if (data.success) {
-                window.allCustomers = data.customers || [];
+                // Later pages are appended to the list already shown
+                const customers = data.customers || [];
+                window.allCustomers = page > 1 ? (window.allCustomers || []).concat(customers) : customers;
+                window.customersPagination = data.pagination || null;
                 updateCustomerStats(data.stats);
                 updateCustomerList(window.allCustomers);
             } else {
@@ -947,7 +971,13 @@ function updateCustomerList(customers) {
         }).join('') + 
         '</tbody></table>';
 
-    customersContainer.innerHTML = tableHTML;
+    const pagination = window.customersPagination;
+    let moreHTML = '';
+    if (pagination && pagination.has_next) {
+        moreHTML = '<div class=\"action-buttons\"><button class=\"btn btn-secondary\" onclick=\"loadCustomers(' + (pagination.page + 1) + ')\"><i class=\"fas fa-chevron-down\"></i> Cargar más (' + customers.length + ' de ' + pagination.total + ')</button></div>';
+    }
+
+    customersContainer.innerHTML = tableHTML + moreHTML;
 }
 
 function getCustomerActions(customer) {
@@ -964,34 +994,9 @@ function getCustomerActions(customer) {
 }
 
 function searchCustomers() {
-    const searchTerm = document.getElementById('customerSearchInput').value.toLowerCase();
-    const statusFilter = document.getElementById('customerFilterStatus').value;
-    
-    if (!window.allCustomers) {
-        return;
-    }
-    
-    let filteredCustomers = window.allCustomers.filter(customer => {
-        let matchSearch = true;
-        let matchStatus = true;
-        
-        // Search filter
-        if (searchTerm) {
-            matchSearch = (customer.name && customer.name.toLowerCase().includes(searchTerm)) ||
-                         (customer.email && customer.email.toLowerCase().includes(searchTerm));
-        }
-        
-        // Status filter
-        if (statusFilter === 'active') {
-            matchStatus = customer.is_active === true;
-        } else if (statusFilter === 'inactive') {
-            matchStatus = customer.is_active === false;
-        }
-        
-        return matchSearch && matchStatus;
-    });
-    
-    updateCustomerList(filteredCustomers);
+    // Debounce keystrokes before querying the server
+    clearTimeout(window.customerSearchTimer);
+    window.customerSearchTimer = setTimeout(loadCustomers, 300);
 }
 
 function filterCustomers() {
@@ -1877,7 +1882,7 @@ async function updateSidebarBadges() {
         }
 
         // Cargar datos de pedidos
-        const ordersResponse = await fetch('/employee/orders-data');
+        const ordersResponse = await fetch('/employee/orders-data?fields=compact&limit=1');
         if (ordersResponse.ok) {
             const ordersData = await ordersResponse.json();
             console.log('🛒 Orders data:', ordersData);
@@ -5,12 +5,18 @@
 
 let currentTrackingOrderId = null;
 let locationUpdateInterval = null;
+const GEOCODING_RETRIES = 5;
+const GEOCODING_RETRY_MS = 3000;
 
 // Load tracking data
-async function loadTracking() {
+async function loadTracking(cursor = null) {
     try {
-        // Cargar lista de pedidos que pueden ser rastreados
-        const response = await fetch('/employee/orders-data');
+        // Pedidos por rastrear, por páginas; las entregadas solo se cuentan (stats)
+        let url = '/employee/orders-data?status=shipped,in_transit&sort=updated_at';
+        if (cursor) {
+            url += '&cursor=' + encodeURIComponent(cursor);
+        }
+        const response = await fetch(url);
         
         if (!response.ok) {
             throw new Error('Error al cargar datos de pedidos');
@@ -19,8 +25,12 @@ async function loadTracking() {
         const data = await response.json();
         
         if (data.success) {
-            updateTrackingStats(data.stats, data.orders);
-            updateTrackingList(data.orders);
+            // Continuar la lista actual con el cursor de la página anterior
+            window.trackingOrders = cursor ? (window.trackingOrders || []).concat(data.orders) : data.orders;
+            window.trackingPagination = data.pagination || null;
+            window.trackingStats = data.stats || {};
+            updateTrackingStats(window.trackingStats);
+            updateTrackingList(window.trackingOrders);
         }
     } catch (error) {
         console.error('Error loading tracking:', error);
@@ -28,26 +38,12 @@ async function loadTracking() {
     }
 }
 
-// Update tracking stats
-function updateTrackingStats(stats, orders) {
-    // Count active tracking (orders with in_transit status)
-    const activeCount = orders.filter(o => o.status === 'in_transit').length;
+// Update tracking stats (server-side counts, not the loaded page)
+function updateTrackingStats(stats) {
+    const activeCount = stats.in_transit || 0;
     document.getElementById('tracking-active-count').textContent = activeCount;
-    
-    // Count pending shipments (shipped status)
-    const pendingCount = orders.filter(o => o.status === 'shipped').length;
-    document.getElementById('tracking-pending-count').textContent = pendingCount;
-    
-    // Count completed today (delivered today)
-    const today = new Date().toDateString();
-    const completedCount = orders.filter(o => {
-        if (o.status === 'delivered' && o.updated_at) {
-            const orderDate = new Date(o.updated_at).toDateString();
-            return orderDate === today;
-        }
-        return false;
-    }).length;
-    document.getElementById('tracking-completed-count').textContent = completedCount;
+    document.getElementById('tracking-pending-count').textContent = stats.shipped || 0;
+    document.getElementById('tracking-completed-count').textContent = stats.delivered_today || 0;
     
     // Update tracking badge
     if (typeof updateBadgeById === 'function') {
@@ -138,6 +134,19 @@ function updateTrackingList(orders) {
         </table>
     `;
     
+    const pagination = window.trackingPagination;
+    if (pagination && pagination.has_more) {
+        const stats = window.trackingStats || {};
+        const total = (stats.shipped || 0) + (stats.in_transit || 0);
+        html += `
+            <div class="action-buttons">
+                <button class="btn btn-secondary" onclick="loadTracking('${pagination.next_cursor}')">
+                    <i class="fas fa-chevron-down"></i> Cargar más (${trackableOrders.length} de ${total})
+                </button>
+            </div>
+        `;
+    }
+    
     listContainer.innerHTML = html;
 }
 
@@ -195,21 +204,29 @@ document.addEventListener('DOMContentLoaded', function() {
             const vehicleInfo = document.getElementById('vehicleInfo').value;
             
             try {
-                const response = await fetch(`/tracking/order/${orderId}/start`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': getCSRFToken()
-                    },
-                    body: JSON.stringify({
-                        destination_address: destinationAddress,
-                        driver_name: driverName,
-                        driver_phone: driverPhone,
-                        vehicle_info: vehicleInfo
-                    })
-                });
-                
-                const data = await response.json();
+                let response;
+                let data;
+                // 409 + geocoding 'pending': la dirección del cliente se está geocodificando, reintentar
+                for (let attempt = 0; attempt < GEOCODING_RETRIES; attempt++) {
+                    response = await fetch(`/tracking/order/${orderId}/start`, {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'X-CSRFToken': getCSRFToken()
+                        },
+                        body: JSON.stringify({
+                            destination_address: destinationAddress,
+                            driver_name: driverName,
+                            driver_phone: driverPhone,
+                            vehicle_info: vehicleInfo
+                        })
+                    });
+                    data = await response.json();
+                    if (response.status !== 409 || data.geocoding !== 'pending') {
+                        break;
+                    }
+                    await new Promise(resolve => setTimeout(resolve, GEOCODING_RETRY_MS));
+                }
                 
                 if (response.ok) {
                     showSuccess('Rastreo iniciado correctamente');
@@ -309,7 +326,8 @@ async function confirmUpdateLocation() {
         if (response.ok) {
             showSuccess('Ubicación actualizada correctamente');
             closeUpdateLocationModal();
-            loadTracking();
+            // 202: la ubicación se procesa en segundo plano, recargar cuando ya esté guardada
+            setTimeout(loadTracking, response.status === 202 ? 1500 : 0);
         } else {
             showError(data.error || 'Error al actualizar ubicación');
         }
@@ -420,4 +420,19 @@ def init_db():
 if __name__ == "__main__":
     # Inicializar base de datos al arrancar
     init_db()
+    # Barrido de reservas de stock vencidas en segundo plano (desactivar con RESERVATION_SWEEPER=off
+    # cuando se ejecute run_reservation_sweeper.py como proceso aparte). Con el reloader de debug
+    # solo se inicia en el proceso hijo que atiende las peticiones.
+    if os.getenv('RESERVATION_SWEEPER', 'on') != 'off' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from Config.services.reservation_sweeper import reservation_sweeper
+        reservation_sweeper.start(app)
+    # Archivado de notificaciones leídas e historial de pedidos cerrados (RETENTION_JOB=off cuando
+    # se ejecute run_retention.py como proceso aparte)
+    if os.getenv('RETENTION_JOB', 'on') != 'off' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from Config.services.retention_service import retention_service
+        retention_service.start(app)
+    # Recalculo periódico de ETAs con Distance Matrix por lotes (ETA_REFRESHER=off para desactivarlo)
+    if os.getenv('ETA_REFRESHER', 'on') != 'off' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from Config.services.eta_refresher import eta_refresher
+        eta_refresher.start(app)
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
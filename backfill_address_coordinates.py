@@ -0,0 +1,52 @@
+"""
+Backfill script for address coordinates
+Geocodes every customer address still pending (existing rows and queue entries lost on restart)
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from Config.db import db
+from app import app
+from Config.google_maps_config import GoogleMapsConfig
+from Config.services.address_geocoder import address_geocoder
+
+
+def run_backfill(batch_size=None, limit=None):
+    """Geocode pending addresses in batches"""
+    print("=" * 60)
+    print("DIRECCIONES - GEOCODIFICACIÓN PENDIENTE")
+    print("=" * 60)
+
+    if not GoogleMapsConfig.is_configured():
+        print("❌ ERROR: GOOGLE_MAPS_API_KEY no está configurada")
+        return False
+
+    with app.app_context():
+        db.create_all()
+        print("🔄 Geocodificando direcciones pendientes...")
+        totals = address_geocoder.backfill(batch_size=batch_size, limit=limit)
+        db.session.remove()
+
+    print(f"✅ Geocodificadas: {totals['geocoded']}")
+    print(f"   Sin resultados: {totals['not_found']}")
+    print(f"   Modificadas durante el proceso: {totals['stale']}")
+    if totals['failed']:
+        print(f"⚠️  Fallidas (quedan pendientes): {totals['failed']}")
+    return totals['failed'] == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Geocodifica las direcciones de clientes sin coordenadas')
+    parser.add_argument('--batch-size', type=int, default=address_geocoder.BATCH_SIZE,
+                        help='Direcciones por lote')
+    parser.add_argument('--limit', type=int, default=None, help='Máximo de direcciones a procesar')
+    args = parser.parse_args()
+
+    success = run_backfill(batch_size=args.batch_size, limit=args.limit)
+    sys.exit(0 if success else 1)
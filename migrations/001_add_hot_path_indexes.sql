@@ -0,0 +1,42 @@
+-- Migration 001: composite indexes for the hot query paths
+-- Matches the db.Index declarations in Config/models (__table_args__)
+-- Applied by run_migrations.py, which skips indexes that already exist
+
+-- orders: client history, status listings and keyset pagination
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_status_updated ON orders(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_orders_created_id ON orders(created_at, id);
+
+-- order_items: items per order and sales per product
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
+
+-- cart_items: cart contents and "is this product already in the cart"
+CREATE INDEX IF NOT EXISTS idx_cart_items_cart_product ON cart_items(cart_id, product_id);
+
+-- order_status_history: timeline of an order
+CREATE INDEX IF NOT EXISTS idx_osh_order_created ON order_status_history(order_id, created_at);
+
+-- order_notifications: unread notifications of a user, newest first
+CREATE INDEX IF NOT EXISTS idx_on_user_read_created ON order_notifications(user_id, is_read, created_at);
+
+-- tickets and ticket_messages
+CREATE INDEX IF NOT EXISTS idx_tickets_user_created ON tickets(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_assigned ON tickets(assigned_to);
+CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets(created_at);
+CREATE INDEX IF NOT EXISTS idx_ticket_messages_ticket_created ON ticket_messages(ticket_id, created_at);
+
+-- tasks: tasks of an employee by status and date
+CREATE INDEX IF NOT EXISTS idx_tasks_assigned_status ON tasks(assigned_to, status);
+CREATE INDEX IF NOT EXISTS idx_tasks_assigned_created ON tasks(assigned_to, created_at);
+
+-- products: active catalog ordered by date and related products by category
+CREATE INDEX IF NOT EXISTS idx_products_active_created ON products(active, created_at);
+CREATE INDEX IF NOT EXISTS idx_products_category_active ON products(category_id, active);
+
+-- users: customer listings
+CREATE INDEX IF NOT EXISTS idx_users_role_created ON users(role, created_at);
+
+-- addresses: default address of a user
+CREATE INDEX IF NOT EXISTS idx_addresses_user_default ON addresses(user_id, is_default, created_at);
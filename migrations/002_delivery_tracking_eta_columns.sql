@@ -0,0 +1,14 @@
+-- Migration 002: columns for the local ETA estimator
+-- Matches DeliveryTracking in Config/models/order_tracking.py
+-- Applied by run_migrations.py, which skips columns that already exist
+
+-- Source of the current estimate (local haversine or remote Distance Matrix)
+ALTER TABLE delivery_tracking ADD COLUMN eta_source VARCHAR(10);
+
+-- Point and time of the last Distance Matrix call, used to decide when to call it again
+ALTER TABLE delivery_tracking ADD COLUMN remote_checked_at DATETIME;
+ALTER TABLE delivery_tracking ADD COLUMN remote_latitude FLOAT;
+ALTER TABLE delivery_tracking ADD COLUMN remote_longitude FLOAT;
+
+-- Road distance / straight-line distance measured at that call (calibrates local estimates)
+ALTER TABLE delivery_tracking ADD COLUMN road_factor FLOAT;
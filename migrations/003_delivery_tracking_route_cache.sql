@@ -0,0 +1,12 @@
+-- Migration 003: cached Directions API route per delivery
+-- Matches DeliveryTracking in Config/models/order_tracking.py
+-- Applied by run_migrations.py, which skips columns that already exist
+
+-- Encoded overview polyline of the last route requested for the delivery
+ALTER TABLE delivery_tracking ADD COLUMN route_polyline TEXT;
+
+-- JSON with distance, duration, addresses, steps, destination and travel mode of that route
+ALTER TABLE delivery_tracking ADD COLUMN route_summary TEXT;
+
+-- When the route was requested (ROUTE_CACHE_TTL)
+ALTER TABLE delivery_tracking ADD COLUMN route_fetched_at DATETIME;
@@ -0,0 +1,9 @@
+-- Migration 004: indexes for listing notifications by user and by order
+-- Matches the db.Index declarations of OrderNotification in Config/models/order_tracking.py
+-- Applied by run_migrations.py, which skips indexes that already exist
+
+-- order_notifications: all notifications of a user, newest first (read and unread)
+CREATE INDEX IF NOT EXISTS idx_on_user_created ON order_notifications(user_id, created_at);
+
+-- order_notifications: notifications of an order, newest first
+CREATE INDEX IF NOT EXISTS idx_on_order_created ON order_notifications(order_id, created_at);
@@ -0,0 +1,14 @@
+-- Migration 005: coordinates of customer addresses
+-- Matches Address in Config/models/address.py
+-- Applied by run_migrations.py, which skips columns and indexes that already exist
+
+-- Filled by the background geocoder (Config/services/address_geocoder.py)
+ALTER TABLE addresses ADD COLUMN latitude FLOAT;
+ALTER TABLE addresses ADD COLUMN longitude FLOAT;
+
+-- pending, ok or not_found; existing rows start as pending and are filled by backfill_address_coordinates.py
+ALTER TABLE addresses ADD COLUMN geocode_status VARCHAR(20) NOT NULL DEFAULT 'pending';
+ALTER TABLE addresses ADD COLUMN geocoded_at DATETIME;
+
+-- Backfill and the geocoder worker scan pending rows in id order
+CREATE INDEX IF NOT EXISTS idx_addresses_geocode_status ON addresses(geocode_status, id);
@@ -0,0 +1,37 @@
+"""
+Backfill script for the analytics rollup tables
+Recomputes sales_rollup_* tables from orders, order_items and users
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from Config.db import db
+from app import app
+from Config.services.analytics_service import analytics_service
+
+
+def run_rebuild():
+    """Create the rollup tables if needed and recompute them"""
+    print("=" * 60)
+    print("ANALYTICS - RECONSTRUCCIÓN DE ROLLUPS")
+    print("=" * 60)
+
+    with app.app_context():
+        db.create_all()
+        print("🔄 Recalculando agregados desde pedidos y usuarios...")
+        if analytics_service.rebuild():
+            print("✅ Rollups reconstruidos exitosamente")
+            return True
+
+        print("❌ ERROR al reconstruir los rollups")
+        return False
+
+
+if __name__ == '__main__':
+    success = run_rebuild()
+    sys.exit(0 if success else 1)
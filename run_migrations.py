@@ -0,0 +1,146 @@
+"""
+Versioned migration runner
+Applies migrations/NNN_*.sql files in order and records them in schema_migrations
+"""
+
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import inspect
+from Config.db import db
+from app import app
+
+MIGRATIONS_DIR = project_root / 'migrations'
+VERSION_PATTERN = re.compile(r'^(\d{3})_[\w-]+\.sql$')
+CREATE_INDEX_PATTERN = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)',
+    re.IGNORECASE
+)
+ADD_COLUMN_PATTERN = re.compile(
+    r'ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)',
+    re.IGNORECASE
+)
+
+
+def get_migration_files():
+    """Return (version, path) pairs sorted by version"""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob('*.sql'):
+        match = VERSION_PATTERN.match(path.name)
+        if match:
+            migrations.append((match.group(1), path))
+    return sorted(migrations)
+
+
+def split_statements(sql_script):
+    """Split a SQL script into statements, dropping comment lines"""
+    lines = [line for line in sql_script.splitlines() if not line.strip().startswith('--')]
+    return [stmt.strip() for stmt in '\n'.join(lines).split(';') if stmt.strip()]
+
+
+def ensure_version_table():
+    db.session.execute(db.text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(20) PRIMARY KEY, "
+        "name VARCHAR(200) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+    db.session.commit()
+
+
+def get_applied_versions():
+    rows = db.session.execute(db.text("SELECT version FROM schema_migrations")).fetchall()
+    return {row[0] for row in rows}
+
+
+def apply_statement(statement, dialect):
+    """
+    Execute one statement, skipping indexes and columns that already exist
+
+    Returns:
+        True if executed, False if skipped
+    """
+    match = CREATE_INDEX_PATTERN.search(statement)
+    if match:
+        index_name, table_name = match.group(2), match.group(3)
+        inspector = inspect(db.session.connection())
+        if not inspector.has_table(table_name):
+            print(f"    ⚠️  Tabla {table_name} no existe, se omite {index_name}")
+            return False
+        if index_name in {ix['name'] for ix in inspector.get_indexes(table_name)}:
+            print(f"    ⏭️  {index_name} ya existe")
+            return False
+        # MySQL does not accept IF NOT EXISTS on CREATE INDEX
+        if match.group(1) and dialect == 'mysql':
+            statement = statement.replace(match.group(1), '', 1)
+        print(f"    ➕ {index_name} ON {table_name}")
+
+    match = ADD_COLUMN_PATTERN.search(statement)
+    if match:
+        table_name, column_name = match.group(1), match.group(2)
+        inspector = inspect(db.session.connection())
+        if not inspector.has_table(table_name):
+            print(f"    ⚠️  Tabla {table_name} no existe, se omite {column_name}")
+            return False
+        if column_name in {col['name'] for col in inspector.get_columns(table_name)}:
+            print(f"    ⏭️  {table_name}.{column_name} ya existe")
+            return False
+        print(f"    ➕ {table_name}.{column_name}")
+
+    db.session.execute(db.text(statement))
+    return True
+
+
+def run_migrations(show_status_only=False):
+    """Apply every pending versioned migration"""
+    print("=" * 60)
+    print("MIGRACIONES VERSIONADAS")
+    print("=" * 60)
+
+    with app.app_context():
+        ensure_version_table()
+        applied = get_applied_versions()
+        dialect = db.engine.dialect.name
+
+        pending = [(version, path) for version, path in get_migration_files() if version not in applied]
+
+        for version, path in get_migration_files():
+            state = "✅ aplicada" if version in applied else "⏳ pendiente"
+            print(f"  {version} {path.name}: {state}")
+        print()
+
+        if show_status_only or not pending:
+            if not pending:
+                print("No hay migraciones pendientes")
+            return True
+
+        for version, path in pending:
+            print(f"📄 Aplicando {path.name}...")
+            with open(path, 'r', encoding='utf-8') as f:
+                statements = split_statements(f.read())
+
+            try:
+                executed = sum(1 for stmt in statements if apply_statement(stmt, dialect))
+                db.session.execute(
+                    db.text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {'v': version, 'n': path.name, 't': datetime.utcnow()}
+                )
+                db.session.commit()
+                print(f"✅ {path.name}: {executed}/{len(statements)} declaraciones ejecutadas")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ ERROR en {path.name}: {str(e)}")
+                return False
+
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migrations(show_status_only='--status' in sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,52 @@
+"""
+Worker process for the stock reservation sweeper
+Returns the stock held by expired cart reservations to the inventory
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from Config.db import db
+from app import app
+from Config.services.reservation_sweeper import reservation_sweeper
+
+
+def print_run(run):
+    status = f"ERROR: {run['error']}" if run['error'] else 'OK'
+    print(f"[{run['started_at']}] lotes={run['batches']} reservas={run['reservations_released']} "
+          f"lineas_legado={run['legacy_lines_released']} unidades={run['units_released']} "
+          f"productos={run['products_affected']} {run['duration_ms']}ms {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Libera el stock de reservas de carrito vencidas')
+    parser.add_argument('--once', action='store_true', help='Ejecutar un solo barrido y salir')
+    parser.add_argument('--interval', type=int, default=reservation_sweeper.DEFAULT_INTERVAL,
+                        help='Segundos entre barridos')
+    parser.add_argument('--batch-size', type=int, default=reservation_sweeper.DEFAULT_BATCH_SIZE,
+                        help='Filas liberadas por transacción')
+    parser.add_argument('--max-batches', type=int, default=reservation_sweeper.DEFAULT_MAX_BATCHES,
+                        help='Máximo de lotes por barrido')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+
+    while True:
+        with app.app_context():
+            run = reservation_sweeper.run_once(batch_size=args.batch_size, max_batches=args.max_batches)
+            db.session.remove()
+        print_run(run)
+        if args.once:
+            return 0 if not run['error'] else 1
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Worker process for the retention job
+Archives old read notifications and the history of closed orders
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from Config.db import db
+from app import app
+from Config.services.retention_service import retention_service
+
+
+def print_run(run):
+    status = f"ERROR: {run['error']}" if run['error'] else 'OK'
+    print(f"[{run['started_at']}] lotes={run['batches']} notificaciones={run['notifications_archived']} "
+          f"historial={run['history_archived']} bloques={run['chunks_written']} "
+          f"{run['duration_ms']}ms {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archiva notificaciones leídas e historial de pedidos cerrados')
+    parser.add_argument('--once', action='store_true', help='Ejecutar una sola pasada y salir')
+    parser.add_argument('--interval', type=int, default=retention_service.DEFAULT_INTERVAL,
+                        help='Segundos entre pasadas')
+    parser.add_argument('--batch-size', type=int, default=retention_service.DEFAULT_BATCH_SIZE,
+                        help='Filas archivadas por transacción')
+    parser.add_argument('--max-batches', type=int, default=retention_service.DEFAULT_MAX_BATCHES,
+                        help='Máximo de lotes por pasada')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+
+    while True:
+        with app.app_context():
+            run = retention_service.run_once(batch_size=args.batch_size, max_batches=args.max_batches)
+            db.session.remove()
+        print_run(run)
+        if args.once:
+            return 0 if not run['error'] else 1
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Index advisor
+Replays the query shapes used by the blueprints with EXPLAIN (SQLite or MySQL)
+and reports full table scans and sorts that are not served by an index.
+
+Usage:
+    python scripts/index_advisor.py            # report every query
+    python scripts/index_advisor.py --problems # only queries with findings
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import func
+from Config.db import db
+from Config.models import (
+    User, Product, Order, OrderItem, Address, CartItem, Ticket, TicketMessage,
+    Task, OrderStatusHistory, OrderNotification
+)
+from app import app
+
+
+def get_query_shapes():
+    """(name, statement) pairs mirroring the filters/sorts of the routes"""
+    return [
+        ('admin/employee orders (keyset)',
+         Order.query.order_by(Order.created_at.desc(), Order.id.desc()).limit(51)),
+        ('orders by status',
+         Order.query.filter(Order.status.in_(['pending'])).order_by(Order.created_at.desc(), Order.id.desc()).limit(51)),
+        ('completed orders',
+         Order.query.filter(Order.status.in_(['shipped', 'delivered'])).order_by(Order.updated_at.desc(), Order.id.desc()).limit(51)),
+        ('order status counters',
+         db.session.query(Order.status, func.count(Order.id)).group_by(Order.status)),
+        ('client orders',
+         Order.query.filter_by(user_id=1).order_by(Order.created_at.desc())),
+        ('client delivered orders',
+         db.session.query(func.sum(Order.total_amount)).filter_by(user_id=1, status='delivered')),
+        ('items of orders',
+         OrderItem.query.filter(OrderItem.order_id.in_([1, 2, 3]))),
+        ('sales per product',
+         db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity)).filter(OrderItem.product_id == 1)),
+        ('cart item lookup',
+         CartItem.query.filter_by(cart_id=1, product_id=1)),
+        ('unread notifications',
+         OrderNotification.query.filter_by(user_id=1, is_read=False).order_by(OrderNotification.created_at.desc())),
+        ('order status history',
+         OrderStatusHistory.query.filter_by(order_id=1).order_by(OrderStatusHistory.created_at.desc())),
+        ('client tickets',
+         Ticket.query.filter_by(user_id=1).order_by(Ticket.created_at.desc())),
+        ('all tickets',
+         Ticket.query.order_by(Ticket.created_at.desc()).limit(50)),
+        ('ticket messages',
+         TicketMessage.query.filter_by(ticket_id=1).order_by(TicketMessage.created_at.asc())),
+        ('employee tasks',
+         Task.query.filter_by(assigned_to=1).order_by(Task.created_at.desc())),
+        ('pending tasks count',
+         db.session.query(func.count(Task.id)).filter_by(assigned_to=1, status='pending')),
+        ('active catalog',
+         Product.query.filter_by(active=True).order_by(Product.created_at.desc()).limit(12)),
+        ('related products',
+         Product.query.filter(Product.category_id == 1, Product.active == True).limit(4)),
+        ('customers',
+         User.query.filter_by(role='cliente').order_by(User.created_at.desc()).limit(50)),
+        ('client addresses',
+         Address.query.filter_by(user_id=1).order_by(Address.is_default.desc(), Address.created_at.desc())),
+    ]
+
+
+def explain(query, dialect):
+    """
+    Run EXPLAIN for a query
+
+    Returns:
+        List of (plan_line, findings) tuples
+    """
+    statement = query.statement if hasattr(query, 'statement') else query
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    connection = db.session.connection()
+    results = []
+
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).fetchall()
+        for row in rows:
+            detail = row[-1]
+            findings = []
+            if detail.startswith('SCAN') and 'USING' not in detail:
+                findings.append('FULL SCAN')
+            if 'TEMP B-TREE' in detail:
+                findings.append('SORT SIN ÍNDICE')
+            results.append((detail, findings))
+    else:
+        result = connection.exec_driver_sql('EXPLAIN ' + str(compiled), params)
+        columns = list(result.keys())
+        for row in result.fetchall():
+            data = dict(zip(columns, row))
+            extra = data.get('Extra') or ''
+            findings = []
+            if data.get('type') == 'ALL':
+                findings.append('FULL SCAN')
+            if 'filesort' in extra:
+                findings.append('SORT SIN ÍNDICE')
+            detail = f"{data.get('table')}: type={data.get('type')} key={data.get('key')} rows={data.get('rows')} {extra}"
+            results.append((detail, findings))
+
+    return results
+
+
+def run_advisor(problems_only=False):
+    """Print the plan of every query shape and return the number of findings"""
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        print("=" * 60)
+        print(f"INDEX ADVISOR ({dialect})")
+        print("=" * 60)
+
+        total_findings = 0
+        for name, query in get_query_shapes():
+            try:
+                plan = explain(query, dialect)
+            except Exception as e:
+                print(f"❌ {name}: error al ejecutar EXPLAIN: {str(e)}")
+                continue
+
+            findings = sorted({f for _, lines in plan for f in lines})
+            total_findings += len(findings)
+            if problems_only and not findings:
+                continue
+
+            status = '⚠️ ' + ', '.join(findings) if findings else '✅ usa índices'
+            print(f"\n{name}: {status}")
+            for detail, _ in plan:
+                print(f"    {detail}")
+
+        print()
+        print(f"Hallazgos: {total_findings}")
+        return total_findings
+
+
+if __name__ == '__main__':
+    findings = run_advisor(problems_only='--problems' in sys.argv)
+    sys.exit(1 if findings else 0)
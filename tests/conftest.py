@@ -0,0 +1,59 @@
+"""
+Shared fixtures: the Flask app bound to a throwaway SQLite database
+"""
+
+import importlib
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# Antes de importar Config.db: la app lee la URI al importarse
+_DB_FILE = os.path.join(tempfile.mkdtemp(prefix='ferrejunior-tests-'), 'test.db')
+os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{_DB_FILE}'
+
+
+@pytest.fixture
+def database():
+    """Empty schema with every model and session hook registered"""
+    importlib.import_module('app')
+    from Config.db import app, db
+
+    with app.app_context():
+        db.create_all()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+@pytest.fixture
+def customer(database):
+    from Config.models.user import User
+
+    user = User(email='cliente@test.com', name='Cliente', role='cliente')
+    user.set_password('secret')
+    database.session.add(user)
+    database.session.commit()
+    return user
+
+
+@pytest.fixture
+def make_order(database, customer):
+    """Factory of committed orders of the test customer"""
+    from Config.models.order import Order
+
+    counter = iter(range(1, 100000))
+
+    def make(status='pending', total_amount=100.0, **fields):
+        order = Order(
+            user_id=customer.id, order_number=f'T{next(counter):06d}', status=status,
+            total_amount=total_amount, created_at=fields.pop('created_at', datetime.utcnow()), **fields
+        )
+        database.session.add(order)
+        database.session.commit()
+        return order
+
+    return make
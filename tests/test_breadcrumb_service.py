@@ -0,0 +1,99 @@
+"""
+Tests for the packed breadcrumb trails and their simplification
+"""
+
+import math
+from datetime import datetime
+
+import pytest
+
+from Config.models.order_tracking import DeliveryBreadcrumbSegment
+from Config.services.breadcrumb_service import BreadcrumbService
+
+
+@pytest.mark.parametrize('value', [0, 1, -1, 63, -64, 64, 8191, -8192, 10 ** 6, -(10 ** 9), 2 ** 40])
+def test_varint_round_trip(value):
+    out = bytearray()
+    BreadcrumbService._write_varint(out, value)
+
+    assert BreadcrumbService._read_varints(bytes(out)) == [value]
+
+
+def test_small_deltas_take_one_byte():
+    out = bytearray()
+    for value in (-64, 0, 63):
+        BreadcrumbService._write_varint(out, value)
+
+    assert len(out) == 3
+
+
+def _zigzag_trail(count, start=1767225600):
+    """Points every 10 s drifting north-east with a sideways wobble"""
+    return [
+        (start + 10 * i, 460000 + 7 * i + (3 if i % 3 else -2), -7408000 + 5 * i + (i % 5))
+        for i in range(count)
+    ]
+
+
+def test_segment_round_trip():
+    points = _zigzag_trail(40)
+    segment = BreadcrumbService._new_segment(1, 0, points[0])
+    for point in points[1:]:
+        BreadcrumbService._append_point(segment, point)
+
+    assert segment.point_count == 40
+    assert BreadcrumbService._segment_points(segment) == points
+
+
+def _projected(points):
+    scale = BreadcrumbService.METERS_PER_DEGREE / BreadcrumbService.SCALE
+    cos_lat = math.cos(math.radians(points[0][1] / BreadcrumbService.SCALE))
+    return [((p[2] - points[0][2]) * scale * cos_lat, (p[1] - points[0][1]) * scale) for p in points]
+
+
+def _distance_to_segment(point, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length = math.hypot(dx, dy)
+    if not length:
+        return math.hypot(point[0] - a[0], point[1] - a[1])
+    return abs(dy * (point[0] - a[0]) - dx * (point[1] - a[1])) / length
+
+
+@pytest.mark.parametrize('tolerance', [5.0, 25.0, 100.0])
+def test_simplify_stays_within_tolerance(tolerance):
+    points = _zigzag_trail(200)
+
+    simplified = BreadcrumbService.simplify(points, tolerance)
+
+    assert simplified[0] == points[0] and simplified[-1] == points[-1]
+    assert len(simplified) < len(points)
+    # Cada punto descartado queda a menos de la tolerancia de la cuerda que lo reemplaza
+    xy = dict(zip(points, _projected(points)))
+    kept = [points.index(point) for point in simplified]
+    for first, last in zip(kept, kept[1:]):
+        for point in points[first + 1:last]:
+            assert _distance_to_segment(xy[point], xy[points[first]], xy[points[last]]) <= tolerance
+
+
+def test_simplify_collapses_a_straight_line():
+    points = [(1767225600 + i, 460000 + 10 * i, -7408000 + 10 * i) for i in range(50)]
+
+    assert BreadcrumbService.simplify(points, 1.0) == [points[0], points[-1]]
+    assert BreadcrumbService.simplify(points[:2], 1.0) == points[:2]
+
+
+def test_get_path_never_exceeds_max_points(database, make_order):
+    order = make_order(status='in_transit')
+    points = _zigzag_trail(BreadcrumbService.SEGMENT_POINTS + 50)
+    BreadcrumbService._rewrite(order.id, [], points)
+    database.session.commit()
+
+    assert DeliveryBreadcrumbSegment.query.filter_by(order_id=order.id).count() == 2
+    assert BreadcrumbService.get_points(order.id) == points
+
+    path = BreadcrumbService.get_path(order.id, max_points=10)
+
+    assert path['total_points'] == len(points)
+    assert 2 <= len(path['points']) <= 10
+    assert path['points'][0][2] == points[0][0] and path['points'][-1][2] == points[-1][0]
+    assert path['started_at'] == datetime.utcfromtimestamp(points[0][0]).isoformat()
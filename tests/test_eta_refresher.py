@@ -0,0 +1,87 @@
+"""
+Tests for the packed Distance Matrix ETA refresher
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from Config.google_maps_config import GoogleMapsConfig
+from Config.models.order_tracking import DeliveryTracking
+from Config.services import eta_refresher as eta_refresher_module
+from Config.services.eta_refresher import EtaRefresher
+from Config.services.event_broker import event_broker
+
+
+@pytest.fixture
+def trackings(database, make_order):
+    rows = []
+    for offset in range(2):
+        order = make_order(status='in_transit')
+        tracking = DeliveryTracking(
+            order_id=order.id, is_active=True,
+            current_latitude=4.60 + offset * 0.05, current_longitude=-74.08,
+            destination_latitude=4.70, destination_longitude=-74.05 + offset * 0.05
+        )
+        database.session.add(tracking)
+        rows.append(tracking)
+    database.session.commit()
+    return [(tracking.id, tracking.order_id) for tracking in rows]
+
+
+@pytest.fixture
+def stream():
+    subscription, _ = event_broker.subscribe(['orders'])
+    yield subscription
+    event_broker.unsubscribe(subscription)
+
+
+def _matrix(origins, destinations):
+    return [[{'distance_km': 5.0, 'duration_minutes': 12.0} for _ in destinations] for _ in origins]
+
+
+def _eta_events(subscription):
+    return [json.loads(item[3]) for item in subscription.wait(0) if item[2] == 'eta']
+
+
+def test_refresh_updates_rows_and_publishes(database, trackings, stream, monkeypatch):
+    monkeypatch.setattr(GoogleMapsConfig, 'is_configured', classmethod(lambda cls: True))
+    monkeypatch.setattr(eta_refresher_module.google_maps_service, 'distance_matrix', _matrix)
+
+    result = EtaRefresher().run_once()
+
+    assert result['updated'] == 2
+    assert len(_eta_events(stream)) == 2
+    sources = {row.eta_source for row in DeliveryTracking.query.all()}
+    assert sources == {'remote'}
+
+
+def test_rows_moved_during_the_request_are_skipped_and_not_published(database, trackings, stream, monkeypatch):
+    (moved_id, _), (kept_id, kept_order_id) = trackings
+    monkeypatch.setattr(GoogleMapsConfig, 'is_configured', classmethod(lambda cls: True))
+
+    def matrix_while_a_ping_arrives(origins, destinations):
+        # Otro proceso guarda una posición nueva entre la lectura y la escritura
+        with database.engine.begin() as connection:
+            table = DeliveryTracking.__table__
+            connection.execute(
+                table.update().where(table.c.id == moved_id).values(
+                    last_updated=datetime.now() + timedelta(seconds=1),
+                    estimated_time_minutes=3
+                )
+            )
+        return _matrix(origins, destinations)
+
+    monkeypatch.setattr(eta_refresher_module.google_maps_service, 'distance_matrix', matrix_while_a_ping_arrives)
+
+    result = EtaRefresher().run_once()
+
+    assert result['updated'] == 1
+    assert [event['order_id'] for event in _eta_events(stream)] == [kept_order_id]
+
+    database.session.expire_all()
+    moved = database.session.get(DeliveryTracking, moved_id)
+    assert moved.estimated_time_minutes == 3
+    assert moved.eta_source != 'remote'
+    assert database.session.get(DeliveryTracking, kept_id).eta_source == 'remote'
@@ -0,0 +1,231 @@
+"""
+Tests for the shared outbound HTTP client against a local stub server
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from Config.services import http_client as http_client_module
+from Config.services.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers with the next scripted status (200 once the script runs out)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+            server.peers.add(self.client_address)
+            status = server.script.pop(0) if server.script else 200
+        if server.delay:
+            time.sleep(server.delay)
+        body = b'{"status": "OK"}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _answer
+    do_POST = _answer
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.script = []
+    server.hits = 0
+    server.peers = set()
+    server.delay = 0
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/maps/api/geocode/json'
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HttpClient()
+    client.BACKOFF_BASE = 0.001
+    client.BACKOFF_MAX = 0.005
+    client.BREAKER_FAILURES = 3
+    client.BREAKER_RESET_SECONDS = 0.2
+    yield client
+    client.reset()
+
+
+def test_retries_server_errors_until_success(stub, client):
+    stub.script = [503, 500]
+
+    response = client.get('google_geocoding', stub.url, retries=2)
+
+    assert response.status_code == 200
+    assert stub.hits == 3
+    metrics = client.stats()['google_geocoding']
+    assert metrics['calls'] == 3
+    assert metrics['errors'] == 2
+    assert metrics['retries'] == 2
+    assert metrics['status_codes'] == {'503': 1, '500': 1, '200': 1}
+    assert metrics['circuit'] == 'closed'
+
+
+def test_returns_last_response_when_retries_run_out(stub, client):
+    stub.script = [503, 503, 503]
+
+    response = client.get('google_geocoding', stub.url, retries=1)
+
+    assert response.status_code == 503
+    assert stub.hits == 2
+
+
+def test_client_errors_are_not_retried(stub, client):
+    stub.script = [404]
+
+    response = client.get('google_geocoding', stub.url)
+
+    assert response.status_code == 404
+    assert stub.hits == 1
+    assert client.stats()['google_geocoding']['errors'] == 0
+
+
+def test_post_is_not_retried_by_default(stub, client):
+    stub.script = [503]
+
+    response = client.post('facebook_oauth', stub.url)
+
+    assert response.status_code == 503
+    assert stub.hits == 1
+
+
+def test_timeouts_are_retried_then_raised(stub, client):
+    stub.delay = 0.3
+
+    with pytest.raises(requests.Timeout):
+        client.get('google_geocoding', stub.url, retries=1, timeout=(1, 0.05))
+
+    assert stub.hits == 2
+    assert client.stats()['google_geocoding']['status_codes'] == {'network': 2}
+
+
+def test_backoff_uses_full_jitter_with_a_cap(stub, client, monkeypatch):
+    bounds = []
+    monkeypatch.setattr(http_client_module.random, 'uniform', lambda low, high: bounds.append((low, high)) or low)
+    client.BACKOFF_BASE = 0.2
+    client.BACKOFF_MAX = 0.5
+    stub.script = [503, 503, 503]
+
+    client.get('google_geocoding', stub.url, retries=2)
+
+    assert bounds == [(0, 0.4), (0, 0.5)]
+
+
+def test_backoff_is_random_within_bounds(client):
+    client.BACKOFF_BASE = 0.2
+    client.BACKOFF_MAX = 1.0
+    delays = [client._backoff(1) for _ in range(200)]
+
+    assert all(0 <= delay <= 0.4 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_circuit_opens_after_consecutive_failures(stub, client):
+    stub.script = [503] * 3
+
+    for _ in range(3):
+        client.get('google_geocoding', stub.url, retries=0)
+
+    assert client.stats()['google_geocoding']['circuit'] == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.get('google_geocoding', stub.url)
+    assert stub.hits == 3
+    metrics = client.stats()['google_geocoding']
+    assert metrics['short_circuited'] == 1
+    assert metrics['circuit_opened'] == 1
+
+
+def test_half_open_trial_success_closes_the_circuit(stub, client):
+    stub.script = [503] * 3
+    for _ in range(3):
+        client.get('google_geocoding', stub.url, retries=0)
+
+    time.sleep(0.25)
+    assert client.stats()['google_geocoding']['circuit'] == 'half_open'
+
+    response = client.get('google_geocoding', stub.url, retries=0)
+
+    assert response.status_code == 200
+    assert client.stats()['google_geocoding']['circuit'] == 'closed'
+
+
+def test_half_open_trial_failure_reopens_the_circuit(stub, client):
+    stub.script = [503] * 4
+    for _ in range(3):
+        client.get('google_geocoding', stub.url, retries=0)
+
+    time.sleep(0.25)
+    client.get('google_geocoding', stub.url, retries=0)
+
+    assert client.stats()['google_geocoding']['circuit'] == 'open'
+    assert client.stats()['google_geocoding']['circuit_opened'] == 2
+    with pytest.raises(CircuitOpenError):
+        client.get('google_geocoding', stub.url)
+
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = CircuitBreaker(failures=1, reset_seconds=0)
+    breaker.record(False)
+
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record(True)
+    assert breaker.state == 'closed'
+    assert breaker.allow() is True
+
+
+def test_breakers_are_per_api(stub, client):
+    stub.script = [503] * 3
+    for _ in range(3):
+        client.get('google_geocoding', stub.url, retries=0)
+
+    response = client.get('google_directions', stub.url, retries=0)
+
+    assert response.status_code == 200
+    assert client.stats()['google_directions']['circuit'] == 'closed'
+
+
+def test_connections_are_reused(stub, client):
+    for _ in range(5):
+        client.get('google_geocoding', stub.url)
+
+    assert stub.hits == 5
+    assert len(stub.peers) == 1
+
+
+def test_latency_metrics(stub, client):
+    for _ in range(10):
+        client.get('google_geocoding', stub.url)
+
+    latency = client.stats()['google_geocoding']['latency_ms']
+    assert latency['p50'] is not None
+    assert latency['p50'] <= latency['p95'] <= latency['max']
+
+
+def test_reset_drops_state(stub, client):
+    client.get('google_geocoding', stub.url)
+
+    client.reset()
+
+    assert client.stats() == {}
@@ -0,0 +1,216 @@
+"""
+Tests for the cart stock reservations (conditional UPDATE engine)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from Config.models.cart import Cart, CartItem
+from Config.models.inventory import StockReservation
+from Config.models.product import Product
+from Config.models.user import User
+from Config.services.inventory_service import InventoryService
+
+
+@pytest.fixture
+def make_product(database):
+    counter = iter(range(1, 100000))
+
+    def make(stock, active=True):
+        number = next(counter)
+        product = Product(name=f'Producto {number}', sku=f'SKU-{number}', price=10.0,
+                          stock_quantity=stock, active=active)
+        database.session.add(product)
+        database.session.commit()
+        return product.id
+
+    return make
+
+
+@pytest.fixture
+def make_cart(database, customer):
+    counter = iter(range(1, 100000))
+
+    def make():
+        number = next(counter)
+        if number == 1:
+            user = customer
+        else:
+            user = User(email=f'cliente{number}@test.com', name=f'Cliente {number}', role='cliente')
+            user.set_password('secret')
+            database.session.add(user)
+        cart = Cart(user=user)
+        database.session.add(cart)
+        database.session.commit()
+        return cart.id
+
+    return make
+
+
+def _stock(database, product_id):
+    return database.session.query(Product.stock_quantity).filter(Product.id == product_id).scalar()
+
+
+def _reservations(cart_id):
+    return {r.product_id: (r.quantity, r.status) for r in StockReservation.query.filter_by(cart_id=cart_id)}
+
+
+def test_try_decrement_takes_stock_only_when_enough(database, make_product):
+    product_id = make_product(stock=5)
+    inactive_id = make_product(stock=5, active=False)
+
+    assert InventoryService.try_decrement(product_id, 3)
+    assert not InventoryService.try_decrement(product_id, 3)
+    assert not InventoryService.try_decrement(inactive_id, 1)
+    database.session.commit()
+
+    assert _stock(database, product_id) == 2
+    assert _stock(database, inactive_id) == 5
+
+
+def test_try_decrement_ignores_a_stale_loaded_stock(database, make_product):
+    product_id = make_product(stock=3)
+    product = database.session.get(Product, product_id)
+    assert product.stock_quantity == 3
+
+    # Otra transacción se lleva dos unidades después de la lectura
+    with database.engine.begin() as connection:
+        connection.execute(Product.__table__.update().where(Product.__table__.c.id == product_id).values(
+            stock_quantity=Product.__table__.c.stock_quantity - 2
+        ))
+
+    assert not InventoryService.try_decrement(product_id, 3)
+    assert product.stock_quantity == 1
+
+
+def test_set_line_quantities_gives_back_partially_taken_stock(database, make_product, make_cart):
+    plenty_id = make_product(stock=5)
+    scarce_id = make_product(stock=1)
+    cart_id = make_cart()
+
+    failed = InventoryService.set_line_quantities({plenty_id: 3, scarce_id: 2}, cart_id=cart_id)
+    database.session.commit()
+
+    assert failed == scarce_id
+    assert _stock(database, plenty_id) == 5
+    assert _stock(database, scarce_id) == 1
+    assert _reservations(cart_id) == {}
+
+
+def test_set_line_quantities_moves_only_the_difference(database, make_product, make_cart):
+    product_id = make_product(stock=10)
+    cart_id = make_cart()
+
+    assert InventoryService.set_line_quantities({product_id: 4}, cart_id=cart_id) is None
+    database.session.commit()
+    assert InventoryService.set_line_quantities({product_id: 1}, cart_id=cart_id) is None
+    database.session.commit()
+    assert _stock(database, product_id) == 9
+
+    assert InventoryService.set_line_quantities({product_id: 0}, cart_id=cart_id) is None
+    database.session.commit()
+    assert _stock(database, product_id) == 10
+    assert _reservations(cart_id) == {}
+
+
+def test_two_carts_racing_for_the_last_units(database, make_product, make_cart):
+    product_id = make_product(stock=3)
+    first_cart, second_cart = make_cart(), make_cart()
+
+    assert InventoryService.set_line_quantity(product_id, 2, cart_id=first_cart)
+    database.session.commit()
+    assert not InventoryService.set_line_quantity(product_id, 2, cart_id=second_cart)
+    database.session.commit()
+    assert InventoryService.set_line_quantity(product_id, 1, cart_id=second_cart)
+    database.session.commit()
+
+    assert _stock(database, product_id) == 0
+    assert _reservations(first_cart) == {product_id: (2, 'active')}
+    assert _reservations(second_cart) == {product_id: (1, 'active')}
+
+
+def test_release_expired_gives_stock_back_once(database, make_product, make_cart):
+    product_id = make_product(stock=10)
+    cart_id = make_cart()
+    InventoryService.set_line_quantities({product_id: 3}, cart_id=cart_id)
+    InventoryService.set_line_quantities({product_id: 2}, guest_token='invitado')
+    database.session.commit()
+    later = datetime.utcnow() + timedelta(minutes=InventoryService.RESERVATION_MINUTES + 1)
+
+    first = InventoryService.release_expired(now=later)
+    second = InventoryService.release_expired(now=later)
+
+    assert (first['reservations'], first['units']) == (2, 5)
+    assert (second['reservations'], second['units']) == (0, 0)
+    assert _stock(database, product_id) == 10
+    # La línea del carrito de usuario queda vencida; la del invitado se borra
+    assert _reservations(cart_id) == {product_id: (3, 'expired')}
+    assert StockReservation.query.filter_by(guest_token='invitado').count() == 0
+
+
+def test_consume_cart_takes_an_expired_reservation_again(database, make_product, make_cart):
+    product_id = make_product(stock=5)
+    cart_id = make_cart()
+    InventoryService.set_line_quantities({product_id: 3}, cart_id=cart_id)
+    database.session.commit()
+    InventoryService.release_expired(now=datetime.utcnow() + timedelta(days=1))
+    assert _stock(database, product_id) == 5
+
+    assert InventoryService.consume_cart(cart_id, {product_id: 3}) is None
+    database.session.commit()
+
+    assert _stock(database, product_id) == 2
+    assert _reservations(cart_id) == {}
+    assert InventoryService.release_expired(now=datetime.utcnow() + timedelta(days=1))['units'] == 0
+    assert _stock(database, product_id) == 2
+
+
+def test_consume_cart_fails_when_expired_stock_was_sold(database, make_product, make_cart):
+    product_id = make_product(stock=3)
+    cart_id, other_cart = make_cart(), make_cart()
+    InventoryService.set_line_quantities({product_id: 3}, cart_id=cart_id)
+    database.session.commit()
+    InventoryService.release_expired(now=datetime.utcnow() + timedelta(days=1))
+    assert InventoryService.set_line_quantity(product_id, 2, cart_id=other_cart)
+    database.session.commit()
+
+    assert InventoryService.consume_cart(cart_id, {product_id: 3}) == product_id
+    database.session.rollback()
+
+    assert _stock(database, product_id) == 1
+    assert _reservations(cart_id) == {product_id: (3, 'expired')}
+
+
+def test_consume_cart_keeps_active_reservations_without_moving_stock(database, make_product, make_cart):
+    product_id = make_product(stock=5)
+    cart_id = make_cart()
+    InventoryService.set_line_quantities({product_id: 2}, cart_id=cart_id)
+    database.session.commit()
+
+    assert InventoryService.consume_cart(cart_id, {product_id: 2}) is None
+    database.session.commit()
+
+    assert _stock(database, product_id) == 3
+    assert _reservations(cart_id) == {}
+
+
+def test_release_stale_cart_lines_records_the_release(database, make_product, make_cart):
+    product_id = make_product(stock=4)
+    cart_id = make_cart()
+    # Línea creada antes de las reservas: su stock ya se había descontado
+    database.session.add(CartItem(cart_id=cart_id, product_id=product_id, quantity=2))
+    database.session.commit()
+    cutoff = datetime.utcnow() + timedelta(minutes=1)
+
+    first = InventoryService.release_stale_cart_lines(cutoff)
+    second = InventoryService.release_stale_cart_lines(cutoff)
+
+    assert (first['lines'], first['units']) == (1, 2)
+    assert (second['lines'], second['units']) == (0, 0)
+    assert _stock(database, product_id) == 6
+    assert _reservations(cart_id) == {product_id: (2, 'expired')}
+
+    assert InventoryService.consume_cart(cart_id, {product_id: 2}) is None
+    database.session.commit()
+    assert _stock(database, product_id) == 4
@@ -0,0 +1,72 @@
+"""
+Tests for the batched driver location ingest
+"""
+
+from datetime import datetime
+
+import pytest
+
+from Config.google_maps_config import GoogleMapsConfig
+from Config.models.order_tracking import DeliveryTracking
+from Config.services import location_ingest as location_ingest_module
+from Config.services.location_ingest import LocationIngest
+
+
+@pytest.fixture
+def order_ids(database, make_order):
+    ids = []
+    for offset in range(3):
+        order = make_order(status='in_transit')
+        database.session.add(DeliveryTracking(
+            order_id=order.id, is_active=True,
+            current_latitude=4.60, current_longitude=-74.08,
+            destination_latitude=4.70 + offset * 0.01, destination_longitude=-74.05
+        ))
+        ids.append(order.id)
+    database.session.commit()
+    return ids
+
+
+def _pings(order_ids, latitude=4.65):
+    return [{'order_id': order_id, 'latitude': latitude, 'longitude': -74.07,
+             'user_id': None, 'received_at': datetime.utcnow()} for order_id in order_ids]
+
+
+def _no_remote(*args, **kwargs):
+    raise AssertionError('the ingest batch must not call Google Maps')
+
+
+def test_batch_makes_no_remote_calls(database, order_ids, monkeypatch):
+    monkeypatch.setattr(GoogleMapsConfig, 'is_configured', classmethod(lambda cls: True))
+    google_maps = location_ingest_module.google_maps_service
+    for name in ('reverse_geocode', 'calculate_distance_and_time', 'distance_matrix'):
+        monkeypatch.setattr(google_maps, name, _no_remote)
+    location_ingest_module.geocode_cache.set_reverse(4.65, -74.07, 'Calle 45 # 10-20')
+
+    written, failed = LocationIngest().process(_pings(order_ids))
+
+    assert (written, failed) == (3, 0)
+    for tracking in DeliveryTracking.query.all():
+        assert tracking.current_latitude == 4.65
+        assert tracking.current_address == 'Calle 45 # 10-20'
+        assert tracking.eta_source != 'remote'
+
+
+def test_failed_ping_only_loses_its_own_position(database, order_ids, monkeypatch):
+    estimator = location_ingest_module.eta_estimator
+    update_tracking = estimator.update_tracking
+    broken = order_ids[1]
+
+    def failing_update(tracking, *args, **kwargs):
+        if tracking.order_id == broken:
+            raise ValueError('bad row')
+        return update_tracking(tracking, *args, **kwargs)
+
+    monkeypatch.setattr(estimator, 'update_tracking', failing_update)
+
+    written, failed = LocationIngest().process(_pings(order_ids))
+
+    assert (written, failed) == (2, 1)
+    database.session.expire_all()
+    latitudes = {tracking.order_id: tracking.current_latitude for tracking in DeliveryTracking.query.all()}
+    assert latitudes == {order_ids[0]: 4.65, broken: 4.60, order_ids[2]: 4.65}
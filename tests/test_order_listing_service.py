@@ -0,0 +1,69 @@
+"""
+Tests for the keyset-paginated order listing
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from Config.services.order_listing_service import OrderListingService
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 4, 15, 30, 12, 250000)
+
+    assert OrderListingService.decode_cursor(OrderListingService.encode_cursor(created_at, 42)) == (created_at, 42)
+    assert OrderListingService.decode_cursor(OrderListingService.encode_cursor(None, 7)) == (None, 7)
+
+
+@pytest.mark.parametrize('cursor', ['no-es-base64!', 'c2luLXNlcGFyYWRvcg==', ''])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        OrderListingService.decode_cursor(cursor)
+
+
+def _walk(limit, **options):
+    pages, cursor = [], None
+    while True:
+        result = OrderListingService.list_orders(cursor=cursor, limit=limit, **options)
+        pages.append([order['id'] for order in result['orders']])
+        if not result['pagination']['has_more']:
+            assert result['pagination']['next_cursor'] is None
+            return pages
+        cursor = result['pagination']['next_cursor']
+
+
+def test_pages_cover_every_order_once(database, make_order):
+    start = datetime(2026, 1, 1)
+    # Pedidos con la misma fecha: el desempate por ID no debe repetir ni saltar filas
+    orders = [make_order(created_at=start + timedelta(minutes=index // 2)) for index in range(7)]
+
+    pages = _walk(limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    newest_first = sorted(orders, key=lambda order: (order.created_at, order.id), reverse=True)
+    assert [order_id for page in pages for order_id in page] == [order.id for order in newest_first]
+
+
+def test_exact_multiple_of_the_page_size_has_no_empty_page(database, make_order):
+    for _ in range(4):
+        make_order()
+
+    assert [len(page) for page in _walk(limit=2)] == [2, 2]
+
+
+def test_pages_respect_the_status_filter(database, make_order):
+    shipped = {make_order(status='shipped').id for _ in range(3)}
+    make_order(status='delivered')
+
+    pages = _walk(limit=2, statuses=['shipped'])
+
+    assert {order_id for page in pages for order_id in page} == shipped
+
+
+def test_limit_is_capped(database, make_order):
+    make_order()
+
+    result = OrderListingService.list_orders(limit=OrderListingService.MAX_LIMIT + 50)
+
+    assert result['pagination']['limit'] == OrderListingService.MAX_LIMIT
@@ -0,0 +1,78 @@
+"""
+Tests for the delivery route planner
+"""
+
+import numpy as np
+import pytest
+
+from Config.models.address import Address
+from Config.services.route_planner import RoutePlanner
+
+
+def _city(stops, seed):
+    """Depot plus random stops within ~10 km of it"""
+    rng = np.random.default_rng(seed)
+    depot = [RoutePlanner.DEPOT_LATITUDE, RoutePlanner.DEPOT_LONGITUDE]
+    coords = np.vstack([depot, depot + rng.uniform(-0.09, 0.09, size=(stops, 2))])
+    demands = np.concatenate([[0], rng.integers(1, 6, size=stops)])
+    return coords, demands
+
+
+@pytest.mark.parametrize('stops, vehicles, max_stops, max_units', [
+    (1, 1, 30, 0),
+    (25, 1, 30, 0),
+    (60, 4, 30, 0),
+    (60, 0, 12, 0),
+    (80, 3, 30, 40),
+])
+def test_every_stop_is_planned_exactly_once_within_capacity(stops, vehicles, max_stops, max_units):
+    coords, demands = _city(stops, seed=stops + vehicles)
+
+    runs = RoutePlanner().solve(coords, demands, vehicles=vehicles, max_stops=max_stops, max_units=max_units)
+
+    visited = [stop for run in runs for stop in run]
+    assert sorted(visited) == list(range(1, stops + 1))
+    for run in runs:
+        assert 0 < len(run) <= max_stops
+        if max_units:
+            assert demands[run].sum() <= max_units
+
+
+@pytest.mark.parametrize('closed', [True, False])
+def test_local_search_never_lengthens_the_tour(closed):
+    coords, _ = _city(40, seed=7)
+    dist = RoutePlanner.distance_matrix(coords)
+    planner = RoutePlanner()
+
+    tour = planner.nearest_neighbor(list(range(1, 41)), dist)
+    improved = planner.or_opt(planner.two_opt(tour, dist, closed), dist, closed)
+
+    def length(path):
+        return planner.tour_length(path + [0] if closed else path, dist)
+
+    assert improved[0] == 0
+    assert sorted(improved) == sorted(tour)
+    assert length(improved) <= length(tour) + 1e-9
+
+
+def test_plan_reports_every_order_once(database, customer, make_order):
+    coords, _ = _city(6, seed=3)
+    located = []
+    for index, (latitude, longitude) in enumerate(coords[1:]):
+        address = Address(user_id=customer.id, name='Cliente', street=f'Calle {index + 1}', city='Bogotá',
+                          state='Cundinamarca', zip_code='110111', latitude=float(latitude),
+                          longitude=float(longitude), geocode_status='ok')
+        database.session.add(address)
+        database.session.flush()
+        located.append(make_order(status='shipped', shipping_address=address.get_full_address()).id)
+    unknown = make_order(status='shipped', shipping_address='Dirección sin geocodificar').id
+
+    result = RoutePlanner().plan(vehicles=2, max_stops=2)
+
+    planned = [stop['order_id'] for run in result['runs'] for stop in run['stops']]
+    unplanned = {entry['order_id']: entry['reason'] for entry in result['unplanned']}
+    assert len(result['runs']) == 2
+    assert all(len(run['stops']) <= 2 for run in result['runs'])
+    assert sorted(planned + list(unplanned)) == sorted(located + [unknown])
+    assert unplanned[unknown] == 'sin_coordenadas'
+    assert set(unplanned.values()) == {'sin_coordenadas', 'sin_capacidad'}